@@ -0,0 +1,124 @@
+"""
+Background-refreshed snapshots for dashboard analytics
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from campaigns.models import Campaign
+from clients.models import Client
+
+logger = logging.getLogger(__name__)
+
+# How long a summary snapshot is served before a background refresh is triggered
+SUMMARY_CACHE_TTL = float(os.environ.get("ANALYTICS_SUMMARY_TTL_SECONDS", 10))
+
+CAMPAIGN_STATUSES = ["draft", "active", "completed", "cancelled"]
+
+class SnapshotCache:
+    """
+    Stale-while-revalidate cache around an async loader
+
+    Readers always get the current in-memory snapshot without waiting. When
+    the snapshot is older than ``ttl`` a single refresh task is scheduled,
+    so any number of concurrent readers trigger at most one recomputation.
+    Only the very first read (no snapshot yet) waits for the loader.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float):
+        self._loader = loader
+        self.ttl = ttl
+        self._value: Optional[Any] = None
+        self._updated_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._interval_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the snapshot is missing or older than the TTL"""
+        return self._updated_at is None or time.monotonic() - self._updated_at >= self.ttl
+
+    async def get(self) -> Any:
+        """Return the current snapshot, scheduling a refresh if it is stale"""
+        if self._value is None:
+            # Cold start: let one caller compute while the others wait for it
+            async with self._lock:
+                if self._value is None:
+                    await self.refresh()
+            return self._value
+
+        if self.is_stale:
+            self._schedule_refresh()
+        return self._value
+
+    async def refresh(self) -> Any:
+        """Recompute the snapshot now"""
+        value = await self._loader()
+        self._value = value
+        self._updated_at = time.monotonic()
+        return value
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self):
+        # Keep serving the previous snapshot if the refresh fails
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Failed to refresh analytics snapshot")
+
+    def start(self, interval: Optional[float] = None):
+        """Start a background task that refreshes the snapshot every ``interval`` seconds"""
+        if self._interval_task is not None and not self._interval_task.done():
+            return
+        self._interval_task = asyncio.create_task(self._refresh_forever(interval or self.ttl))
+
+    async def _refresh_forever(self, interval: float):
+        while True:
+            await self._refresh_quietly()
+            await asyncio.sleep(interval)
+
+    async def stop(self):
+        """Cancel any background refresh tasks"""
+        for task in (self._interval_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._interval_task = None
+        self._refresh_task = None
+
+async def compute_summary_counters() -> Dict[str, Any]:
+    """Compute the campaign and client counters shown on dashboards"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+
+    status_counts, total_clients, recent_campaigns = await asyncio.gather(
+        Campaign.find({"isActive": True}).aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(),
+        Client.find({"isActive": True}).count(),
+        Campaign.find({"createdAt": {"$gte": thirty_days_ago}, "isActive": True}).count()
+    )
+
+    counts_by_status = {row["_id"]: row["count"] for row in status_counts}
+    campaigns_by_status = {status: counts_by_status.get(status, 0) for status in CAMPAIGN_STATUSES}
+
+    return {
+        "totalCampaigns": sum(counts_by_status.values()),
+        "totalClients": total_clients,
+        "activeCampaigns": campaigns_by_status["active"],
+        "recentCampaigns": recent_campaigns,
+        "campaignsByStatus": campaigns_by_status,
+        "generatedAt": datetime.utcnow()
+    }
+
+# Shared snapshot used by the analytics endpoints
+summary_cache = SnapshotCache(compute_summary_counters, ttl=SUMMARY_CACHE_TTL)
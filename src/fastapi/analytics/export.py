@@ -0,0 +1,153 @@
+"""
+Columnar (Arrow IPC / Parquet) export of campaign metrics for modeling
+"""
+import io
+from datetime import datetime
+from typing import AsyncIterator, Dict, Any, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+from campaigns.models import Campaign
+
+# Typed schema shared by both export formats so the modeling side never has
+# to infer column types
+CAMPAIGN_METRICS_SCHEMA = pa.schema([
+    ("campaignId", pa.string()),
+    ("clientId", pa.string()),
+    ("name", pa.string()),
+    ("status", pa.string()),
+    ("channels", pa.list_(pa.string())),
+    ("startDate", pa.timestamp("ms")),
+    ("endDate", pa.timestamp("ms")),
+    ("budget", pa.float64()),
+    ("impressions", pa.int64()),
+    ("clicks", pa.int64()),
+    ("conversions", pa.int64()),
+    ("roi", pa.float64()),
+])
+
+# Supported export formats and their media types
+EXPORT_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COMPRESSION = "zstd"
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that buffers the encoded bytes until drained"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        """Return and clear everything written since the last drain"""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def build_export_pipeline(
+    client_id: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Build the aggregation pipeline that flattens campaigns into export rows"""
+    match: Dict[str, Any] = {"isActive": True}
+    if client_id:
+        match["client.$id"] = ObjectId(client_id)
+    if status:
+        match["status"] = status
+    if start_date or end_date:
+        match["startDate"] = {}
+        if start_date:
+            match["startDate"]["$gte"] = start_date
+        if end_date:
+            match["startDate"]["$lte"] = end_date
+
+    return [
+        {"$match": match},
+        {"$sort": {"startDate": 1}},
+        {"$project": {
+            "_id": 0,
+            "campaignId": {"$toString": "$_id"},
+            "client": 1,
+            "name": 1,
+            "status": 1,
+            "channels": {"$ifNull": ["$channels", []]},
+            "startDate": 1,
+            "endDate": 1,
+            "budget": 1,
+            "impressions": "$metrics.impressions",
+            "clicks": "$metrics.clicks",
+            "conversions": "$metrics.conversions",
+            "roi": "$metrics.roi",
+        }},
+    ]
+
+def _to_record_batch(docs: List[Dict[str, Any]]) -> pa.RecordBatch:
+    """Convert a batch of flattened campaign documents into a typed record batch"""
+    for doc in docs:
+        # Links are stored as DBRefs; keep only the referenced id
+        client = doc.pop("client", None)
+        doc["clientId"] = str(getattr(client, "id", client)) if client is not None else None
+    return pa.RecordBatch.from_pylist(docs, schema=CAMPAIGN_METRICS_SCHEMA)
+
+async def stream_campaign_metrics(
+    export_format: str = "parquet",
+    batch_size: int = 10000,
+    **filters
+) -> AsyncIterator[bytes]:
+    """
+    Stream campaign metrics as Arrow IPC or Parquet bytes
+
+    Documents are pulled from a Motor cursor ``batch_size`` at a time and each
+    batch is encoded as one record batch (Arrow) or row group (Parquet), so
+    memory stays bounded by a single batch regardless of the result size.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format. Must be one of {list(EXPORT_FORMATS)}")
+
+    collection = Campaign.get_motor_collection()
+    cursor = collection.aggregate(build_export_pipeline(**filters), batchSize=batch_size)
+
+    sink = _ChunkSink()
+    if export_format == "arrow":
+        writer = pa.ipc.new_stream(
+            sink,
+            CAMPAIGN_METRICS_SCHEMA,
+            options=pa.ipc.IpcWriteOptions(compression=EXPORT_COMPRESSION)
+        )
+    else:
+        writer = pq.ParquetWriter(sink, CAMPAIGN_METRICS_SCHEMA, compression=EXPORT_COMPRESSION)
+
+    try:
+        while True:
+            docs = await cursor.to_list(length=batch_size)
+            if not docs:
+                break
+            writer.write_batch(_to_record_batch(docs))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+
+    # Flush the stream terminator / Parquet footer
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
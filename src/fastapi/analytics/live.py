@@ -0,0 +1,183 @@
+"""
+Live campaign metric updates fanned out to server-sent event subscribers
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from campaigns.models import Campaign
+
+logger = logging.getLogger(__name__)
+
+# Polling interval used when change streams are unavailable (standalone MongoDB)
+LIVE_POLL_INTERVAL = float(os.environ.get("ANALYTICS_LIVE_POLL_SECONDS", 5))
+
+# Events buffered per subscriber before the oldest ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+METRIC_FIELDS = ["impressions", "clicks", "conversions", "roi"]
+
+def compute_metrics_delta(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the change of every metric that differs between two snapshots"""
+    previous = previous or {}
+    delta = {}
+    for field in METRIC_FIELDS:
+        old, new = previous.get(field), current.get(field)
+        if old != new:
+            delta[field] = (new or 0) - (old or 0)
+    return delta
+
+class CampaignMetricsHub:
+    """
+    Fan-out of campaign metric changes to many subscribers
+
+    Each campaign with at least one subscriber gets exactly one upstream
+    watcher task. The watcher follows a MongoDB change stream on the
+    campaign document and falls back to polling when change streams are
+    not supported (e.g. a standalone test server). A watcher that ends
+    while subscribers remain, because its change stream closed or it
+    failed, is restarted after one poll interval. Every subscriber owns a
+    bounded queue; slow subscribers lose their oldest events instead of
+    holding up the others.
+    """
+
+    def __init__(self, poll_interval: float = LIVE_POLL_INTERVAL, use_change_streams: bool = True):
+        self.poll_interval = poll_interval
+        self.use_change_streams = use_change_streams
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._watchers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def subscribe(self, campaign_id: str) -> asyncio.Queue:
+        """Register a subscriber, starting the campaign watcher if needed"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(campaign_id, set()).add(queue)
+
+        # New subscribers start from the latest known snapshot
+        if campaign_id in self._latest:
+            queue.put_nowait(self._event(campaign_id, self._latest[campaign_id], {}))
+
+        self._ensure_watcher(campaign_id)
+        return queue
+
+    def _ensure_watcher(self, campaign_id: str):
+        """Start the campaign watcher unless a live one exists or nobody listens"""
+        if not self._subscribers.get(campaign_id):
+            return
+        watcher = self._watchers.get(campaign_id)
+        if watcher is not None and not watcher.done():
+            return
+
+        watcher = asyncio.create_task(self._watch(campaign_id))
+        watcher.add_done_callback(lambda task: self._watcher_done(campaign_id, task))
+        self._watchers[campaign_id] = watcher
+
+    def _watcher_done(self, campaign_id: str, task: asyncio.Task):
+        """Forget a finished watcher and restart it for remaining subscribers"""
+        if self._watchers.get(campaign_id) is not task:
+            return
+        del self._watchers[campaign_id]
+        if not task.cancelled() and self._subscribers.get(campaign_id):
+            asyncio.get_running_loop().call_later(self.poll_interval, self._ensure_watcher, campaign_id)
+
+    def unsubscribe(self, campaign_id: str, queue: asyncio.Queue):
+        """Remove a subscriber, stopping the watcher after the last one leaves"""
+        subscribers = self._subscribers.get(campaign_id)
+        if not subscribers:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[campaign_id]
+            self._latest.pop(campaign_id, None)
+            watcher = self._watchers.pop(campaign_id, None)
+            if watcher is not None:
+                watcher.cancel()
+
+    def subscriber_count(self, campaign_id: str) -> int:
+        return len(self._subscribers.get(campaign_id, ()))
+
+    async def close(self):
+        """Stop all watchers"""
+        watchers = list(self._watchers.values())
+        self._watchers.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+
+    async def fetch_metrics(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Read the current metrics of a campaign"""
+        document = await Campaign.get_motor_collection().find_one(
+            {"_id": ObjectId(campaign_id)}, {"metrics": 1}
+        )
+        if document is None:
+            return None
+        return document.get("metrics") or {}
+
+    def publish(self, campaign_id: str, metrics: Dict[str, Any]):
+        """Send a metrics snapshot to all subscribers if anything changed"""
+        previous = self._latest.get(campaign_id)
+        delta = compute_metrics_delta(previous, metrics)
+        if previous is not None and not delta:
+            return
+
+        self._latest[campaign_id] = metrics
+        event = self._event(campaign_id, metrics, delta)
+        for queue in self._subscribers.get(campaign_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _event(self, campaign_id: str, metrics: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "campaignId": campaign_id,
+            "metrics": {field: metrics.get(field) for field in METRIC_FIELDS},
+            "delta": delta,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    async def _watch(self, campaign_id: str):
+        try:
+            metrics = await self.fetch_metrics(campaign_id)
+            if metrics is not None:
+                self.publish(campaign_id, metrics)
+
+            if self.use_change_streams:
+                try:
+                    await self._follow_change_stream(campaign_id)
+                    return
+                except PyMongoError as e:
+                    logger.info("Change streams unavailable (%s), polling campaign %s", e, campaign_id)
+
+            await self._poll(campaign_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Live metrics watcher for campaign %s failed", campaign_id)
+
+    async def _follow_change_stream(self, campaign_id: str):
+        pipeline = [{"$match": {
+            "documentKey._id": ObjectId(campaign_id),
+            "operationType": {"$in": ["update", "replace"]}
+        }}]
+        collection = Campaign.get_motor_collection()
+        async with collection.watch(pipeline, full_document="updateLookup") as stream:
+            async for change in stream:
+                document = change.get("fullDocument") or {}
+                self.publish(campaign_id, document.get("metrics") or {})
+
+    async def _poll(self, campaign_id: str):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            metrics = await self.fetch_metrics(campaign_id)
+            if metrics is not None:
+                self.publish(campaign_id, metrics)
+
+# Shared hub used by the analytics endpoints
+metrics_hub = CampaignMetricsHub()
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
+import asyncio
+import json
 from datetime import datetime, timedelta
 from auth.jwt import get_current_user, role_required
 from auth.models import User
 from campaigns.models import Campaign
 from clients.models import Client
+from .cache import summary_cache
+from .export import EXPORT_FORMATS, stream_campaign_metrics
+from .live import metrics_hub
+
+# Seconds between SSE keep-alive comments when no metrics change
+SSE_KEEPALIVE_SECONDS = 15
 
 router = APIRouter()
 
@@ -16,13 +25,16 @@ async def get_analytics(
     current_user: User = Depends(get_current_user)
 ):
     """Get analytics data with optional campaign filtering"""
+    # Counters come from the background-refreshed snapshot
+    snapshot = await summary_cache.get()
+    
     response = {
         "success": True,
         "data": {
             "summary": {
-                "totalCampaigns": await Campaign.find({"isActive": True}).count(),
-                "totalClients": await Client.find({"isActive": True}).count(),
-                "dateGenerated": datetime.utcnow()
+                "totalCampaigns": snapshot["totalCampaigns"],
+                "totalClients": snapshot["totalClients"],
+                "dateGenerated": snapshot["generatedAt"]
             }
         },
         "message": "Analytics retrieved successfully"
@@ -109,6 +121,41 @@ async def get_campaign_performance(
     
     return response
 
+@router.get("/campaign/{campaign_id}/stream")
+async def stream_campaign_performance(
+    campaign_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream live metric updates for a campaign as server-sent events"""
+    campaign = await Campaign.get(campaign_id)
+    if not campaign or not campaign.isActive:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    campaign_key = str(campaign.id)
+    
+    async def event_stream():
+        queue = metrics_hub.subscribe(campaign_key)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: metrics\ndata: {json.dumps(event)}\n\n"
+        finally:
+            metrics_hub.unsubscribe(campaign_key, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/client/{client_id}", response_model=Dict[str, Any])
 async def get_client_analytics(
     client_id: str,
@@ -182,44 +229,62 @@ async def get_summary_stats(
     current_user: User = Depends(role_required(["admin"]))
 ):
     """Get summary statistics across all campaigns (admin only)"""
-    # Get counts
-    total_campaigns = await Campaign.count_documents({"isActive": True})
-    total_clients = await Client.count_documents({"isActive": True})
-    
-    # Get active campaigns
-    active_campaigns = await Campaign.find({"status": "active", "isActive": True}).count()
-    
-    # Get campaigns by status
-    campaigns_by_status = {
-        "draft": await Campaign.count_documents({"status": "draft", "isActive": True}),
-        "active": active_campaigns,
-        "completed": await Campaign.count_documents({"status": "completed", "isActive": True}),
-        "cancelled": await Campaign.count_documents({"status": "cancelled", "isActive": True})
-    }
-    
-    # Calculate today's date and dates for last 30 days
-    today = datetime.utcnow().date()
-    thirty_days_ago = (today - timedelta(days=30))
-    
-    # Get campaigns created in the last 30 days
-    recent_campaigns = await Campaign.count_documents({
-        "createdAt": {"$gte": thirty_days_ago},
-        "isActive": True
-    })
+    # Served from the in-memory snapshot; refreshed in the background when stale
+    snapshot = await summary_cache.get()
     
     response = {
         "success": True,
         "data": {
             "counts": {
-                "totalCampaigns": total_campaigns,
-                "totalClients": total_clients,
-                "activeCampaigns": active_campaigns,
-                "recentCampaigns": recent_campaigns
+                "totalCampaigns": snapshot["totalCampaigns"],
+                "totalClients": snapshot["totalClients"],
+                "activeCampaigns": snapshot["activeCampaigns"],
+                "recentCampaigns": snapshot["recentCampaigns"]
             },
-            "campaignsByStatus": campaigns_by_status,
-            "generatedAt": datetime.utcnow()
+            "campaignsByStatus": snapshot["campaignsByStatus"],
+            "generatedAt": snapshot["generatedAt"]
         },
         "message": "Summary statistics retrieved successfully"
     }
     
-    return response
\ No newline at end of file
+    return response
+
+@router.get("/export")
+async def export_campaign_metrics(
+    format: str = Query("parquet", description="Export format: parquet or arrow"),
+    client_id: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    batch_size: int = Query(10000, ge=1, le=100000, description="Rows per record batch"),
+    current_user: User = Depends(role_required(["admin", "manager"]))
+):
+    """Stream campaign spend and metrics as Parquet or Arrow IPC for modeling (admin/manager only)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Must be one of {list(EXPORT_FORMATS)}"
+        )
+    
+    if client_id:
+        client = await Client.get(client_id)
+        if not client or not client.isActive:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Client not found"
+            )
+    
+    extension = "parquet" if format == "parquet" else "arrows"
+    
+    return StreamingResponse(
+        stream_campaign_metrics(
+            export_format=format,
+            batch_size=batch_size,
+            client_id=client_id,
+            status=status_filter,
+            start_date=start_date,
+            end_date=end_date
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=campaign_metrics.{extension}"}
+    )
@@ -13,6 +13,8 @@ from auth.router import router as auth_router
 from clients.router import router as clients_router
 from campaigns.router import router as campaigns_router
 from analytics.router import router as analytics_router
+from analytics.cache import summary_cache
+from analytics.live import metrics_hub
 
 # Create FastAPI app
 app = FastAPI(
@@ -42,6 +44,15 @@ async def startup_event():
     print("Initializing database connection...")
     await init_db()
     print("Database initialized successfully!")
+    
+    # Keep dashboard counters warm in the background
+    summary_cache.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks when the application stops"""
+    await summary_cache.stop()
+    await metrics_hub.close()
 
 @app.get("/")
 async def root():
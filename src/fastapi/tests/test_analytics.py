@@ -1,9 +1,16 @@
 import pytest
 from httpx import AsyncClient
+import asyncio
+import io
 import json
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
 from beanie.odm.fields import PydanticObjectId
 
+from analytics.cache import SnapshotCache
+from analytics.live import CampaignMetricsHub, compute_metrics_delta
+
 # Tests for analytics endpoints
 class TestAnalytics:
     
@@ -111,4 +118,194 @@ class TestAnalytics:
             assert "Not enough permissions" in data.get("detail", "")
         else:
             # The endpoint might not be implemented yet, so it might return 404 or 501
-            assert response.status_code in [403, 404, 501]
\ No newline at end of file
+            assert response.status_code in [403, 404, 501]
+    
+    @pytest.mark.asyncio
+    async def test_export_campaign_metrics_parquet(self, test_client: AsyncClient, admin_token, test_campaign_data):
+        """Test exporting campaign metrics as Parquet"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = await test_client.get("/api/analytics/export?format=parquet", headers=headers)
+        
+        # Assert response
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.num_rows >= 1
+        assert "campaignId" in table.column_names
+        assert "budget" in table.column_names
+        assert test_campaign_data["id"] in table.column("campaignId").to_pylist()
+    
+    @pytest.mark.asyncio
+    async def test_export_campaign_metrics_arrow(self, test_client: AsyncClient, admin_token, test_campaign_data):
+        """Test exporting campaign metrics as an Arrow IPC stream filtered by client"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = await test_client.get(
+            f"/api/analytics/export?format=arrow&client_id={test_campaign_data['client_id']}",
+            headers=headers
+        )
+        
+        # Assert response
+        assert response.status_code == 200
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert set(table.column("clientId").to_pylist()) == {test_campaign_data["client_id"]}
+    
+    @pytest.mark.asyncio
+    async def test_export_invalid_format(self, test_client: AsyncClient, admin_token):
+        """Test exporting with an unsupported format"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        
+        response = await test_client.get("/api/analytics/export?format=csv", headers=headers)
+        
+        # Assert response
+        assert response.status_code == 400
+
+# Tests for the stale-while-revalidate summary snapshot
+class TestSnapshotCache:
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_cold_reads_load_once(self):
+        """Test that concurrent first reads share a single loader call"""
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": len(calls)}
+        
+        cache = SnapshotCache(loader, ttl=60)
+        results = await asyncio.gather(*[cache.get() for _ in range(20)])
+        
+        assert len(calls) == 1
+        assert all(result == {"value": 1} for result in results)
+    
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_served_while_refreshing(self):
+        """Test that stale reads return immediately and trigger one refresh"""
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+        
+        cache = SnapshotCache(loader, ttl=0)
+        assert await cache.get() == 1
+        
+        # Snapshot is immediately stale; readers still get the old value
+        results = await asyncio.gather(*[cache.get() for _ in range(20)])
+        assert all(result == 1 for result in results)
+        
+        await asyncio.sleep(0.05)
+        assert len(calls) == 2
+        assert await cache.get() == 2
+        await cache.stop()
+    
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_snapshot(self):
+        """Test that a failing background refresh keeps serving the last snapshot"""
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError("database unavailable")
+            return "ok"
+        
+        cache = SnapshotCache(loader, ttl=0)
+        assert await cache.get() == "ok"
+        assert await cache.get() == "ok"
+        
+        await asyncio.sleep(0.01)
+        assert await cache.get() == "ok"
+        await cache.stop()
+
+# Tests for the live campaign metrics hub
+class StubMetricsHub(CampaignMetricsHub):
+    """Hub reading metrics from an in-memory dict instead of MongoDB"""
+    
+    def __init__(self, metrics):
+        super().__init__(poll_interval=0.01, use_change_streams=False)
+        self.metrics = metrics
+        self.fetches = 0
+    
+    async def fetch_metrics(self, campaign_id):
+        self.fetches += 1
+        return dict(self.metrics)
+
+class TestCampaignMetricsHub:
+    
+    def test_compute_metrics_delta(self):
+        """Test that only changed metrics appear in the delta"""
+        delta = compute_metrics_delta(
+            {"impressions": 100, "clicks": 10, "conversions": 1, "roi": 1.5},
+            {"impressions": 150, "clicks": 10, "conversions": 2, "roi": 1.5}
+        )
+        
+        assert delta == {"impressions": 50, "conversions": 1}
+    
+    @pytest.mark.asyncio
+    async def test_fan_out_from_single_watcher(self):
+        """Test that many subscribers share one upstream watcher"""
+        hub = StubMetricsHub({"impressions": 100, "clicks": 10})
+        queues = [hub.subscribe("campaign-1") for _ in range(5)]
+        
+        # Every subscriber receives the initial snapshot
+        initial = await asyncio.gather(*[asyncio.wait_for(q.get(), 1) for q in queues])
+        assert all(event["metrics"]["impressions"] == 100 for event in initial)
+        
+        # A change is pushed once as a delta to all subscribers
+        hub.metrics["impressions"] = 120
+        updates = await asyncio.gather(*[asyncio.wait_for(q.get(), 1) for q in queues])
+        assert all(event["delta"] == {"impressions": 20} for event in updates)
+        
+        # One watcher polls on behalf of all subscribers
+        assert len(hub._watchers) == 1
+        await hub.close()
+    
+    @pytest.mark.asyncio
+    async def test_watcher_stops_after_last_unsubscribe(self):
+        """Test that the watcher is cancelled when the last subscriber leaves"""
+        hub = StubMetricsHub({"impressions": 1})
+        first = hub.subscribe("campaign-1")
+        second = hub.subscribe("campaign-1")
+        watcher = hub._watchers["campaign-1"]
+        
+        hub.unsubscribe("campaign-1", first)
+        assert not watcher.done()
+        
+        hub.unsubscribe("campaign-1", second)
+        await asyncio.sleep(0)
+        assert watcher.cancelled() or watcher.done()
+        assert hub.subscriber_count("campaign-1") == 0
+    
+    @pytest.mark.asyncio
+    async def test_finished_watcher_is_replaced(self):
+        """Test that a watcher which ends is dropped and restarted"""
+        hub = StubMetricsHub({"impressions": 1})
+        failures = []
+        
+        async def failing_poll(campaign_id):
+            failures.append(campaign_id)
+            raise RuntimeError("upstream closed")
+        
+        hub._poll = failing_poll
+        queue = hub.subscribe("campaign-1")
+        watcher = hub._watchers["campaign-1"]
+        await asyncio.wait_for(queue.get(), 1)
+        
+        # The failed watcher is forgotten, then restarted for the subscriber
+        await asyncio.gather(watcher, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert hub._watchers.get("campaign-1") is not watcher
+        await asyncio.sleep(0.05)
+        assert len(failures) >= 2
+        
+        # Later subscribers get a live watcher rather than the finished one
+        del hub._poll
+        hub.subscribe("campaign-1")
+        assert not hub._watchers["campaign-1"].done()
+        hub.metrics["impressions"] = 5
+        event = await asyncio.wait_for(queue.get(), 1)
+        assert event["metrics"]["impressions"] == 5
+        await hub.close()
@@ -0,0 +1,113 @@
+"""
+Compare approximate inference methods against NUTS on the sample datasets
+
+Usage (from src/gradio):
+    python -m benchmarks.inference_benchmark [--methods map advi pathfinder]
+        [--nuts-sampler nutpie] [--use-trace-cache] [--output results.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from marketing_models.clv import CustomerLifetimeValue
+from marketing_models.config import TRACE_CACHE_CONFIG
+from marketing_models.gradio_interface import generate_sample_mmm_data, generate_sample_clv_data
+from marketing_models.inference import INFERENCE_METHODS, NUTS_SAMPLERS
+from marketing_models.media_mix import MediaMixModel
+
+MMM_CHANNELS = ['tv', 'radio', 'social', 'search', 'email']
+
+# Posterior attributes recorded by sample_posterior for every run
+RUN_ATTRIBUTES = ['nuts_sampler', 'chains', 'cores', 'inference_seconds']
+
+def fit_mmm(method, nuts_sampler=None):
+    data = generate_sample_mmm_data()
+    return MediaMixModel().fit(
+        data, MMM_CHANNELS, 'sales', date_col='date', method=method, nuts_sampler=nuts_sampler
+    )
+
+def fit_clv(method, nuts_sampler=None):
+    data = generate_sample_clv_data()
+    return CustomerLifetimeValue().fit(
+        data, 'frequency', 'recency', 'T', monetary_col='monetary_value',
+        method=method, nuts_sampler=nuts_sampler
+    )
+
+MODELS = {
+    'mmm': fit_mmm,
+    'clv': fit_clv
+}
+
+def posterior_moments(trace):
+    """Posterior mean and standard deviation of every variable"""
+    moments = {}
+    for name, values in trace.posterior.data_vars.items():
+        draws = values.values.reshape((-1,) + values.shape[2:])
+        moments[name] = (draws.mean(axis=0), draws.std(axis=0))
+    return moments
+
+def agreement(moments, reference):
+    """Largest difference in posterior means, in units of the NUTS posterior sd"""
+    errors = [
+        np.max(np.abs(moments[name][0] - mean) / np.maximum(sd, 1e-12))
+        for name, (mean, sd) in reference.items() if name in moments
+    ]
+    return float(max(errors)) if errors else None
+
+def run(models, methods, nuts_sampler=None):
+    results = []
+    for model_name in models:
+        reference = None
+        for method in ['nuts'] + [m for m in methods if m != 'nuts']:
+            start = time.perf_counter()
+            try:
+                fitted = MODELS[model_name](method, nuts_sampler)
+            except Exception as e:
+                results.append({'model': model_name, 'method': method, 'error': str(e)})
+                continue
+            elapsed = time.perf_counter() - start
+
+            moments = posterior_moments(fitted.trace)
+            if method == 'nuts':
+                reference = moments
+            row = {
+                'model': model_name,
+                'method': method,
+                'seconds': elapsed,
+                'max_mean_error_sd': agreement(moments, reference) if reference else None
+            }
+            attrs = fitted.trace.posterior.attrs
+            row.update({key: attrs[key] for key in RUN_ATTRIBUTES if key in attrs})
+            results.append(row)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+    parser.add_argument('--methods', nargs='+', choices=INFERENCE_METHODS, default=INFERENCE_METHODS)
+    parser.add_argument('--nuts-sampler', choices=list(NUTS_SAMPLERS), help="NUTS backend for the reference fits")
+    parser.add_argument('--use-trace-cache', action='store_true',
+                        help="Reuse cached traces, which times cache reads instead of fits")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # The sample data are seeded, so repeated runs would otherwise time cache reads
+    TRACE_CACHE_CONFIG['enabled'] = args.use_trace_cache
+    results = run(args.models, args.methods, args.nuts_sampler)
+
+    for row in results:
+        if 'error' in row:
+            print(f"{row['model']:>4} {row['method']:>14}  failed: {row['error']}")
+        else:
+            error = row['max_mean_error_sd']
+            error = '-' if error is None else f'{error:.2f} sd'
+            print(f"{row['model']:>4} {row['method']:>14} {row['seconds']:9.2f}s  mean error {error}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
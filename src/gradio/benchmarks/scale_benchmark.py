@@ -0,0 +1,274 @@
+"""
+Time model fitting, prediction, ROI, budget optimization and segmentation at several data scales
+
+Usage (from src/gradio):
+    python -m benchmarks.scale_benchmark [--models mmm clv customer]
+        [--scales small medium large] [--method map] [--repeat 3]
+        [--output results.json] [--compare baseline.json --tolerance 1.25]
+
+Exits with status 1 when an operation is slower than the baseline by more
+than the tolerance ratio.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+from marketing_models.clv import CustomerLifetimeValue
+from marketing_models.config import TRACE_CACHE_CONFIG
+from marketing_models.customer import CustomerAnalysis
+from marketing_models.gradio_interface import (
+    generate_sample_mmm_data, generate_sample_clv_data, generate_sample_customer_data
+)
+from marketing_models.inference import INFERENCE_METHODS, available_cpus
+from marketing_models.media_mix import MediaMixModel
+
+# Data sizes per model: (periods, channels) for MMM, customers otherwise
+SCALES = {
+    'mmm': {'small': (90, 5), 'medium': (365, 10), 'large': (1095, 20)},
+    'clv': {'small': 500, 'medium': 10_000, 'large': 100_000},
+    'customer': {'small': 500, 'medium': 10_000, 'large': 100_000}
+}
+
+CUSTOMER_FEATURES = [
+    'age', 'income', 'tenure', 'purchases_last_year', 'avg_order_value', 'website_visits_last_month'
+]
+
+# Packages whose versions are recorded with the results
+PACKAGES = ['numpy', 'pandas', 'scipy', 'scikit-learn', 'pymc', 'pymc-marketing', 'arviz']
+
+def scale_mmm_data(periods, channels, seed=0):
+    """
+    Daily MMM data with the given shape, built from the sample data
+
+    Channel spend is resampled from the sample channels, cycling through
+    them for additional channels, and sales follow the same structure as
+    generate_sample_mmm_data: baseline, linear channel effects, weekly
+    seasonality and noise.
+    """
+    sample = generate_sample_mmm_data()
+    sample_channels = [col for col in sample.columns if col not in ('date', 'sales')]
+    rng = np.random.default_rng(seed)
+
+    dates = pd.date_range(sample['date'].iloc[0], periods=periods, freq='D')
+    data = pd.DataFrame({'date': dates})
+    effects = np.zeros(periods)
+    for j in range(channels):
+        source = sample_channels[j % len(sample_channels)]
+        name = source if j < len(sample_channels) else f'{source}_{j // len(sample_channels)}'
+        data[name] = rng.choice(sample[source].values, size=periods) * rng.lognormal(0, 0.2)
+        effects += rng.uniform(0.2, 0.9) * data[name].values
+
+    weekday_effect = 20000 * np.sin(2 * np.pi * dates.dayofweek.values / 7)
+    noise = rng.normal(0, 5000, size=periods)
+    data['sales'] = np.clip(100000 + effects + weekday_effect + noise, 0, None)
+    return data
+
+def scale_customers(sample, n_customers, seed=0):
+    """Resample customers of a sample dataset to n_customers with fresh IDs"""
+    rng = np.random.default_rng(seed)
+    data = sample.iloc[rng.integers(0, len(sample), size=n_customers)].reset_index(drop=True)
+    data['customer_id'] = [f'C{i:07d}' for i in range(n_customers)]
+    return data
+
+def timed(fn, repeat=1, reset=None):
+    """
+    Run fn repeat times and return its last result with the first and best time
+
+    reset runs untimed before every call, so operations that memoize their
+    results are timed computing them rather than returning the memo.
+    """
+    times = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, times[0], min(times)
+
+def clear_mmm_memos(model):
+    """Drop the stacked posterior draws and ROI a MediaMixModel keeps per trace"""
+    model._samples_trace = None
+
+def clear_clv_memos(model):
+    """Drop the customer predictions a CustomerLifetimeValue model memoizes"""
+    model._predictions.clear()
+
+def mmm_operations(size, method):
+    periods, channels = size
+    data = scale_mmm_data(periods, channels)
+    channel_cols = [col for col in data.columns if col not in ('date', 'sales')]
+    model = MediaMixModel()
+    total_budget = data[channel_cols].sum().sum() / len(data) * 30
+
+    reset = lambda: clear_mmm_memos(model)
+
+    return [
+        ('fit', lambda: model.fit(data, channel_cols, 'sales', date_col='date', method=method), None),
+        ('predict', lambda: model.predict(hdi_prob=0.94), reset),
+        ('roi', model.get_roi_estimates, reset),
+        ('optimize', lambda: model.optimize_budget(total_budget), reset)
+    ]
+
+def clv_operations(size, method):
+    data = scale_customers(generate_sample_clv_data(), size)
+    model = CustomerLifetimeValue()
+
+    reset = lambda: clear_clv_memos(model)
+
+    return [
+        ('fit', lambda: model.fit(data, 'frequency', 'recency', 'T', 'monetary_value', method=method), None),
+        ('predict', lambda: model.predict_expected_purchases(30), reset),
+        ('segment', model.segment_customers, reset)
+    ]
+
+def customer_operations(size, method):
+    data = scale_customers(generate_sample_customer_data(), size)
+    model = CustomerAnalysis(n_clusters=4)
+
+    return [
+        ('fit', lambda: model.fit(data, CUSTOMER_FEATURES), None),
+        ('segment', model.get_customer_segments, None),
+        ('profiles', model.get_cluster_profiles, None)
+    ]
+
+MODELS = {
+    'mmm': mmm_operations,
+    'clv': clv_operations,
+    'customer': customer_operations
+}
+
+def run(models, scales, method=None, repeat=3):
+    """
+    Time every operation of every model at every scale
+
+    Fits run once, the other operations repeat times with the model's
+    memoized draws and predictions cleared before each run, so later runs
+    do not just time memo lookups. Operations after a failed one are
+    reported as skipped, since they need the fitted model.
+    """
+    results = []
+    for model_name in models:
+        for scale in scales:
+            size = SCALES[model_name][scale]
+            failed = None
+            for operation, fn, reset in MODELS[model_name](size, method):
+                row = {'model': model_name, 'scale': scale, 'size': size, 'operation': operation}
+                if failed:
+                    row['error'] = f"skipped after failed {failed}"
+                    results.append(row)
+                    continue
+                try:
+                    _, first, best = timed(fn, 1 if operation == 'fit' else repeat, reset)
+                except Exception as e:
+                    failed = operation
+                    row['error'] = str(e)
+                else:
+                    row.update({'first_seconds': first, 'best_seconds': best})
+                results.append(row)
+    return results
+
+def environment():
+    """Versions and hardware the results were measured with"""
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': available_cpus(),
+        'packages': versions
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Ratio of best times to a baseline run for matching operations
+
+    Returns:
+    --------
+    list of dict
+        model, scale, operation, ratio and whether the ratio exceeds tolerance
+    """
+    reference = {
+        (row['model'], row['scale'], row['operation']): row['best_seconds']
+        for row in baseline['results'] if 'best_seconds' in row
+    }
+    comparison = []
+    for row in results:
+        key = (row['model'], row['scale'], row['operation'])
+        if 'best_seconds' in row and reference.get(key):
+            ratio = row['best_seconds'] / reference[key]
+            comparison.append({
+                'model': key[0], 'scale': key[1], 'operation': key[2],
+                'ratio': ratio, 'regression': ratio > tolerance
+            })
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+    parser.add_argument('--scales', nargs='+', choices=['small', 'medium', 'large'], default=['small', 'medium'])
+    parser.add_argument('--method', choices=INFERENCE_METHODS, default='map',
+                        help="Inference method of the Bayesian fits, MAP keeps large scales fast")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of every non-fit operation")
+    parser.add_argument('--use-trace-cache', action='store_true',
+                        help="Reuse cached traces, which times cache reads instead of fits")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON written by an earlier run")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="Slowdown ratio against the baseline reported as a regression")
+    args = parser.parse_args()
+
+    TRACE_CACHE_CONFIG['enabled'] = args.use_trace_cache
+    results = run(args.models, args.scales, args.method, args.repeat)
+    report = {
+        'environment': environment(),
+        'method': args.method,
+        'trace_cache': args.use_trace_cache,
+        'results': results
+    }
+
+    for row in results:
+        label = f"{row['model']:>8} {row['scale']:>6} {row['operation']:>9}"
+        if 'error' in row:
+            print(f"{label}  failed: {row['error']}")
+        else:
+            print(f"{label} {row['best_seconds']:9.3f}s  (first {row['first_seconds']:.3f}s)")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(results, json.load(f), args.tolerance)
+        for row in report['comparison']:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['model']:>8} {row['scale']:>6} {row['operation']:>9} {row['ratio']:6.2f}x{flag}")
+        regressions = [row for row in report['comparison'] if row['regression']]
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Rolling-origin backtesting of media mix models
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .config import EVALUATION_METRICS
+from .inference import available_cpus, sampling_resources
+from .media_mix import MediaMixModel
+from .seasonality import fourier_features
+
+def rolling_origin_folds(n_periods, horizon, initial=None, step=None, window=None, max_folds=None):
+    """
+    Train/test splits that move the forecast origin forward through time
+
+    Parameters:
+    -----------
+    n_periods : int
+        Number of periods in the data
+    horizon : int
+        Number of periods forecast after each origin
+    initial : int, optional
+        Training periods of the first fold, defaults to half of the data
+    step : int, optional
+        Periods the origin moves between folds, defaults to the horizon
+    window : int, optional
+        Train on only the last window periods before each origin instead
+        of the full history
+    max_folds : int, optional
+        Keep only the most recent folds
+
+    Returns:
+    --------
+    list of tuple
+        (train_start, train_end, test_end) row positions per fold; the test
+        periods of a fold are rows train_end to test_end
+    """
+    initial = initial or max(n_periods // 2, 1)
+    step = step or horizon
+    if initial + horizon > n_periods:
+        raise ValueError(
+            f"Not enough periods for a fold: {initial} training + {horizon} test > {n_periods}"
+        )
+
+    folds = []
+    for train_end in range(initial, n_periods - horizon + 1, step):
+        train_start = max(0, train_end - window) if window else 0
+        folds.append((train_start, train_end, train_end + horizon))
+    return folds[-max_folds:] if max_folds else folds
+
+def evaluation_metrics(actual, predicted, metrics=None):
+    """
+    Forecast accuracy metrics along the last axis
+
+    Parameters:
+    -----------
+    actual, predicted : array-like
+        Observed and predicted values with shape (..., periods), e.g. one
+        row per fold
+    metrics : list, optional
+        Metric names, defaults to EVALUATION_METRICS
+
+    Returns:
+    --------
+    dict
+        Metric name to value, or array of values for stacked inputs. MAPE
+        is in percent and skips periods where the actual value is zero
+    """
+    metrics = metrics or EVALUATION_METRICS
+    actual = np.asarray(actual, dtype=float)
+    errors = np.asarray(predicted, dtype=float) - actual
+
+    results = {}
+    for metric in metrics:
+        if metric == 'mae':
+            results[metric] = np.abs(errors).mean(axis=-1)
+        elif metric == 'rmse':
+            results[metric] = np.sqrt(np.square(errors).mean(axis=-1))
+        elif metric == 'mape':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                relative = np.where(actual != 0, np.abs(errors / actual), np.nan)
+            results[metric] = 100 * np.nanmean(relative, axis=-1)
+        elif metric == 'r_squared':
+            residual = np.square(errors).sum(axis=-1)
+            total = np.square(actual - actual.mean(axis=-1, keepdims=True)).sum(axis=-1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                results[metric] = 1 - residual / total
+        else:
+            raise ValueError(f"Unknown metric '{metric}'")
+    return results
+
+def _fit_fold(data, channels, target, date_col, fold, method, priors, model_class):
+    """Fit one fold and forecast its test periods, timing both steps"""
+    train_start, train_end, test_end = fold
+
+    # Seasonality of every fold is a slice of the full calendar, which the
+    # feature cache then computes once per worker
+    if date_col:
+        fourier_features(data[date_col])
+
+    start = time.perf_counter()
+    model = model_class(priors=priors).fit(
+        data.iloc[train_start:train_end], channels, target, date_col, method=method
+    )
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = model.predict(data.iloc[train_end:test_end])
+    predict_seconds = time.perf_counter() - start
+
+    return np.asarray(predicted, dtype=float), fit_seconds, predict_seconds
+
+def backtest(data, channels, target, horizon, date_col=None, initial=None, step=None,
+             window=None, max_folds=None, method=None, metrics=None, n_jobs=1,
+             priors=None, model_class=MediaMixModel):
+    """
+    Out-of-sample accuracy of a media mix model over rolling forecast origins
+
+    Folds are independent fits, so with n_jobs > 1 they run in separate
+    worker processes. Refits of an unchanged fold reuse the on-disk trace
+    cache, so repeated backtests only pay for new folds.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        The dataset containing marketing channel and target variables
+    channels : list
+        List of column names for marketing channels
+    target : str
+        Column name for the target variable (e.g., sales)
+    horizon : int
+        Number of periods forecast after each origin
+    date_col : str, optional
+        Name of the date column; data is ordered by it
+    initial, step, window, max_folds : int, optional
+        Fold layout, see rolling_origin_folds
+    method : str, optional
+        Inference method, defaults to INFERENCE_CONFIG['method']
+    metrics : list, optional
+        Metric names, defaults to EVALUATION_METRICS
+    n_jobs : int, optional
+        Number of worker processes, default is 1 (fit in this process).
+        None uses as many workers as the CPU budget allows for the
+        sampling_resources() cores each fit uses
+    priors : dict, optional
+        Priors passed to every fold's model
+    model_class : type, optional
+        Model with the MediaMixModel fit/predict interface
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per fold with its train and test range, the last training
+        date as 'origin' when date_col is given, 'fit_seconds',
+        'predict_seconds' and one column per metric
+    """
+    if date_col:
+        data = data.sort_values(date_col, kind='stable')
+    data = data.reset_index(drop=True)
+
+    folds = rolling_origin_folds(len(data), horizon, initial, step, window, max_folds)
+    args = (channels, target, date_col)
+    if n_jobs is None:
+        n_jobs = max(1, available_cpus() // sampling_resources()[1])
+
+    if n_jobs > 1 and len(folds) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(folds))) as executor:
+            futures = [
+                executor.submit(_fit_fold, data, *args, fold, method, priors, model_class)
+                for fold in folds
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [_fit_fold(data, *args, fold, method, priors, model_class) for fold in folds]
+
+    # Every fold forecasts the same horizon, so metrics are one stacked pass
+    actual = np.stack([data[target].values[train_end:test_end] for _, train_end, test_end in folds])
+    predicted = np.stack([result[0] for result in results])
+
+    report = pd.DataFrame(folds, columns=['train_start', 'train_end', 'test_end'])
+    report.insert(0, 'fold', np.arange(len(folds)))
+    if date_col:
+        report['origin'] = data[date_col].values[report['train_end'] - 1]
+    report['fit_seconds'] = [result[1] for result in results]
+    report['predict_seconds'] = [result[2] for result in results]
+    for metric, values in evaluation_metrics(actual, predicted, metrics).items():
+        report[metric] = values
+    return report
@@ -0,0 +1,242 @@
+"""
+Budget allocation over saturating channel response curves
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.optimize as optimize
+
+from .config import TRANSFORMATIONS
+from .transforms import SATURATION_FUNCTIONS, DEFAULT_SATURATION_PARAMS
+
+# Spend ratios are floored here so curves with an infinite slope at zero stay finite
+MIN_SPEND_RATIO = 1e-9
+
+def channel_response(spend, coefficients, scale, saturation=None, saturation_params=None):
+    """
+    Expected response and marginal response of every channel at a spend level
+
+    Each channel follows coefficient * s(x / scale), where s is the
+    saturation curve. MediaMixModel passes its fitted coefficients, saturation
+    parameters and spend scale, so the curve is the model's own response.
+
+    Parameters:
+    -----------
+    spend : array-like
+        Spend per channel with shape (channels,)
+    coefficients : array-like
+        Channel coefficients, shape (channels,) or posterior draws (draws, channels)
+    scale : array-like
+        Spend scale per channel, shape (channels,) or (draws, channels)
+    saturation : str, optional
+        Saturation curve, defaults to TRANSFORMATIONS['diminishing_returns']['method']
+    saturation_params : dict, optional
+        Curve parameters; values may be scalars, per channel or per (draw, channel)
+
+    Returns:
+    --------
+    tuple
+        (response, marginal) arrays with shape (channels,), averaged over draws
+    """
+    saturation = saturation or TRANSFORMATIONS['diminishing_returns']['method']
+    if saturation not in SATURATION_FUNCTIONS:
+        raise ValueError(f"Unknown saturation method '{saturation}'. Must be one of {list(SATURATION_FUNCTIONS)}")
+    curve, curve_grad = SATURATION_FUNCTIONS[saturation]
+    params = saturation_params or DEFAULT_SATURATION_PARAMS[saturation]
+
+    coefficients = np.atleast_2d(np.asarray(coefficients, dtype=float))
+    scale = np.asarray(scale, dtype=float)
+    ratio = np.maximum(np.asarray(spend, dtype=float) / scale, MIN_SPEND_RATIO)
+
+    # One broadcast over (draws, channels), then a mean over draws
+    response = (coefficients * curve(ratio, **params)).mean(axis=0)
+    marginal = (coefficients * curve_grad(ratio, **params) / scale).mean(axis=0)
+    return response, marginal
+
+def _feasible_start(total_budget, lower, upper):
+    """
+    Split the budget above the minimums in proportion to each channel's headroom
+
+    Raises ValueError when the bounds cannot add up to total_budget. When
+    every channel is pinned (lower == upper) the minimums are the only
+    feasible allocation.
+    """
+    if np.any(lower > upper):
+        raise ValueError("Budget constraints are infeasible: a channel minimum exceeds its maximum")
+    tolerance = 1e-9 * max(abs(total_budget), 1.0)
+    if not lower.sum() - tolerance <= total_budget <= upper.sum() + tolerance:
+        raise ValueError(
+            f"Total budget {total_budget:g} is outside the range allowed by the channel bounds "
+            f"[{lower.sum():g}, {upper.sum():g}]"
+        )
+
+    headroom = upper - lower
+    if headroom.sum() <= 0:
+        return lower.copy()
+    return lower + (total_budget - lower.sum()) * headroom / headroom.sum()
+
+def optimize_allocation(total_budget, coefficients, scale, lower=None, upper=None,
+                        saturation=None, saturation_params=None, x0=None):
+    """
+    Maximize expected response subject to a total budget and per-channel bounds
+
+    Solved with SLSQP on budget shares using the analytic gradient of the
+    response curves, so it converges in a few iterations even for many channels.
+
+    Parameters:
+    -----------
+    total_budget : float
+        Total budget to allocate
+    coefficients : array-like
+        Channel coefficients, shape (channels,) or posterior draws (draws, channels)
+    scale : array-like
+        Spend scale per channel, see channel_response
+    lower, upper : array-like, optional
+        Minimum and maximum spend per channel, default 0 and total_budget
+    saturation : str, optional
+        Saturation curve, defaults to TRANSFORMATIONS['diminishing_returns']['method']
+    saturation_params : dict, optional
+        Curve parameters, see channel_response
+    x0 : array-like, optional
+        Starting allocation, e.g. the solution for a nearby budget
+
+    Returns:
+    --------
+    dict
+        'allocation', 'response' (expected total), 'marginal_roi' per channel
+        and 'success'
+    """
+    scale = np.asarray(scale, dtype=float)
+    n_channels = scale.shape[-1]
+    lower = np.zeros(n_channels) if lower is None else np.asarray(lower, dtype=float)
+    upper = np.full(n_channels, float(total_budget)) if upper is None else np.asarray(upper, dtype=float)
+    upper = np.minimum(upper, total_budget)
+
+    start = _feasible_start(total_budget, lower, upper)
+    if np.all(upper - lower <= 0):
+        # Nothing to optimize when every channel is pinned to a fixed spend
+        response, marginal = channel_response(start, coefficients, scale, saturation, saturation_params)
+        return {'allocation': start, 'response': response.sum(), 'marginal_roi': marginal, 'success': True}
+
+    def evaluate(shares):
+        return channel_response(shares * total_budget, coefficients, scale, saturation, saturation_params)
+
+    # Work on budget shares scaled to a unit objective for a well-conditioned problem
+    if x0 is not None:
+        start = np.clip(x0, lower, upper)
+    start = start / total_budget
+    reference = max(abs(evaluate(start)[0].sum()), 1e-12)
+
+    def objective(shares):
+        response, marginal = evaluate(shares)
+        return -response.sum() / reference, -marginal * total_budget / reference
+
+    result = optimize.minimize(
+        objective,
+        start,
+        jac=True,
+        method='SLSQP',
+        bounds=list(zip(lower / total_budget, upper / total_budget)),
+        constraints=[{
+            'type': 'eq',
+            'fun': lambda shares: shares.sum() - 1.0,
+            'jac': lambda shares: np.ones_like(shares)
+        }],
+        options={'ftol': 1e-12, 'maxiter': 500}
+    )
+
+    allocation = result.x * total_budget
+    response, marginal = channel_response(allocation, coefficients, scale, saturation, saturation_params)
+
+    return {
+        'allocation': allocation,
+        'response': response.sum(),
+        'marginal_roi': marginal,
+        'success': bool(result.success)
+    }
+
+def _solve_block(budgets, coefficients, scale, lower, upper, saturation, saturation_params):
+    """Solve increasing budgets in order, starting each from the previous solution"""
+    solutions = []
+    previous = None
+    for total_budget in budgets:
+        # Start from the previous optimum scaled up to this budget
+        x0 = None if previous is None else previous['allocation'] * total_budget / previous['allocation'].sum()
+        solution = optimize_allocation(
+            total_budget, coefficients, scale, lower, upper,
+            saturation, saturation_params, x0=x0
+        )
+        if x0 is not None and not solution['success']:
+            # A poor warm start can stall SLSQP; retry from the neutral split
+            solution = optimize_allocation(
+                total_budget, coefficients, scale, lower, upper,
+                saturation, saturation_params
+            )
+        solutions.append(solution)
+        previous = solution
+    return solutions
+
+def sweep_budgets(budgets, coefficients, scale, lower=None, upper=None, saturation=None,
+                  saturation_params=None, channels=None, n_jobs=1):
+    """
+    Optimal allocations and response over a grid of total budgets
+
+    Budgets are solved in increasing order, each warm-started from the
+    previous optimum. With n_jobs > 1 the grid is split into contiguous
+    blocks solved in parallel worker processes.
+
+    Parameters:
+    -----------
+    budgets : array-like
+        Total budgets to evaluate
+    coefficients : array-like
+        Channel coefficients, shape (channels,) or posterior draws (draws, channels)
+    scale : array-like
+        Spend scale per channel, see channel_response
+    lower, upper : array-like, optional
+        Minimum and maximum spend per channel, shared by all budgets
+    saturation : str, optional
+        Saturation curve, defaults to TRANSFORMATIONS['diminishing_returns']['method']
+    saturation_params : dict, optional
+        Curve parameters, see channel_response
+    channels : list, optional
+        Channel names used for the output columns
+    n_jobs : int, optional
+        Number of worker processes, default is 1 (solve in this process)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Efficient frontier with one row per budget: 'Total_Budget', 'Response',
+        'Incremental_Response', 'Marginal_Return' (response per extra $ between
+        budgets), then the allocation and '<channel>_Marginal_ROI' per channel
+    """
+    budgets = np.sort(np.asarray(budgets, dtype=float))
+    channels = channels or [f'channel_{i}' for i in range(np.shape(scale)[-1])]
+    upper = None if upper is None else np.asarray(upper, dtype=float)
+    args = (coefficients, scale, lower, upper, saturation, saturation_params)
+
+    if n_jobs > 1 and len(budgets) > 1:
+        blocks = [block for block in np.array_split(budgets, n_jobs) if len(block)]
+        with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+            futures = [executor.submit(_solve_block, block, *args) for block in blocks]
+            solutions = [solution for future in futures for solution in future.result()]
+    else:
+        solutions = _solve_block(budgets, *args)
+
+    frontier = pd.DataFrame({
+        'Total_Budget': budgets,
+        'Response': [solution['response'] for solution in solutions]
+    })
+    frontier['Incremental_Response'] = frontier['Response'].diff()
+    frontier['Marginal_Return'] = frontier['Incremental_Response'] / frontier['Total_Budget'].diff()
+
+    allocations = np.array([solution['allocation'] for solution in solutions])
+    marginal = np.array([solution['marginal_roi'] for solution in solutions])
+    for i, channel in enumerate(channels):
+        frontier[channel] = allocations[:, i]
+    for i, channel in enumerate(channels):
+        frontier[f'{channel}_Marginal_ROI'] = marginal[:, i]
+
+    return frontier
@@ -7,12 +7,33 @@ import matplotlib.pyplot as plt
 import pymc as pm
 import arviz as az
 import warnings
+from collections import OrderedDict
 from pymc_marketing.clv import ParetoNBDModel
+from pymc_marketing.prior import Prior
 
-from .config import DEFAULT_PRIORS, SAMPLING_CONFIG
+from .config import DEFAULT_PRIORS, COMPACTION_CONFIG
+from .inference import sample_posterior, inference_settings, available_cpus
+from . import pareto_nbd
+from .posterior import compact_trace, summarize_chunks
+from .scoring import save_artifact
+from .trace_cache import cached_trace, fingerprint
+from .rfm import summarize_transactions, summarize_transactions_chunked
 
 warnings.filterwarnings("ignore")
 
+# Version of the Pareto/NBD model built in fit, part of the trace cache key;
+# bump it whenever the model changes
+MODEL_VERSION = 2
+
+# Values of one (draws, customers) block in the customer predictions, about 16 MB
+CLV_CHUNK_VALUES = 2 ** 21
+
+# Pareto/NBD parameters needed to score customers
+PARAMETERS = ('r', 'alpha', 's', 'beta')
+
+# Number of memoized per-customer predictions kept per model
+CLV_PREDICTION_CACHE_SIZE = 8
+
 class CustomerLifetimeValue:
     """Customer Lifetime Value modeling with PyMC Marketing"""
     
@@ -29,6 +50,8 @@ class CustomerLifetimeValue:
         self.model = None
         self.trace = None
         self.summary = None
+        self._posterior = None
+        self._predictions = OrderedDict()
         
     def prepare_data(self, data, frequency_col, recency_col, T_col, monetary_col=None):
         """
@@ -64,7 +87,8 @@ class CustomerLifetimeValue:
         
         return self.data
     
-    def fit(self, data, frequency_col, recency_col, T_col, monetary_col=None):
+    def fit(self, data, frequency_col, recency_col, T_col, monetary_col=None, method=None,
+            nuts_sampler=None):
         """
         Fit the CLV model to the data
         
@@ -80,6 +104,12 @@ class CustomerLifetimeValue:
             Column name with the time since first transaction
         monetary_col : str, optional
             Column name with average transaction value
+        method : str, optional
+            Inference method ('nuts', 'map', 'advi', 'fullrank_advi' or
+            'pathfinder'), defaults to INFERENCE_CONFIG['method']
+        nuts_sampler : str, optional
+            NUTS backend ('pymc', 'nutpie', 'numpyro' or 'blackjax'),
+            defaults to SAMPLING_CONFIG['nuts_sampler']
             
         Returns:
         --------
@@ -89,40 +119,169 @@ class CustomerLifetimeValue:
         # Prepare data
         self.prepare_data(data, frequency_col, recency_col, T_col, monetary_col)
         
-        # Build Pareto/NBD model using PyMC Marketing
-        with pm.Model() as self.model:
-            # Create the ParetoNBDModel with our data
-            self.pnbd_model = ParetoNBDModel(
-                data={
-                    'frequency': self.data[frequency_col].values,
-                    'recency': self.data[recency_col].values,
-                    'T': self.data[T_col].values
-                },
-                # Use the correct parameter names expected by ParetoNBDModel
-                r_mean=self.priors['r_prior_alpha'],
-                r_sd=self.priors['r_prior_beta'],
-                alpha_mean=self.priors['alpha_prior_alpha'],
-                alpha_sd=self.priors['alpha_prior_beta']
-            )
-            
-            # Sample from the model
-            self.trace = pm.sample(
-                draws=SAMPLING_CONFIG['draws'],
-                tune=SAMPLING_CONFIG['tune'],
-                chains=SAMPLING_CONFIG['chains'],
-                target_accept=SAMPLING_CONFIG['target_accept'],
-                return_inferencedata=SAMPLING_CONFIG['return_inferencedata']
-            )
+        # Build the Pareto/NBD model with PyMC Marketing
+        self.pnbd_model = ParetoNBDModel(
+            data=pd.DataFrame({
+                'customer_id': np.arange(len(self.data)),
+                'frequency': self.data[frequency_col].values,
+                'recency': self.data[recency_col].values,
+                'T': self.data[T_col].values
+            }),
+            model_config=self._model_config()
+        )
+        self.pnbd_model.build_model()
+        self.model = self.pnbd_model.model
+        
+        # Sample from the model, reusing the trace of an identical earlier fit
+        self.trace = cached_trace(
+            ['clv', MODEL_VERSION, self.data[[frequency_col, recency_col, T_col]], self.priors,
+             inference_settings(method, nuts_sampler)],
+            lambda: sample_posterior(self.model, method, nuts_sampler=nuts_sampler)
+        )
         
         # Generate summary statistics
         self.summary = az.summary(self.trace)
+        self._extract_posterior()
+        
+        return self
+    
+    def _model_config(self):
+        """
+        PyMC Marketing priors of the Pareto/NBD parameters
+        
+        '<name>_prior_alpha' and '<name>_prior_beta' in self.priors are the
+        shape and rate of a Gamma prior on r, alpha, s or beta; parameters
+        without them keep the PyMC Marketing default priors.
+        """
+        config = {}
+        for name in PARAMETERS:
+            shape = self.priors.get(f'{name}_prior_alpha')
+            rate = self.priors.get(f'{name}_prior_beta')
+            if shape is not None and rate is not None:
+                config[name] = Prior('Gamma', alpha=shape, beta=rate)
+        return config
+    
+    def fit_from_transactions(self, transactions, customer_col, date_col, value_col=None,
+                              observation_end=None, freq='D', chunksize=None, ordered=False):
+        """
+        Fit the CLV model starting from a raw transaction log
+        
+        Parameters:
+        -----------
+        transactions : pandas.DataFrame, str or iterable of pandas.DataFrame
+            Transaction log, a path to a transaction CSV, or an iterable of chunks
+        customer_col : str
+            Column name with the customer identifier
+        date_col : str
+            Column name with the transaction date
+        value_col : str, optional
+            Column name with the transaction value
+        observation_end : datetime-like, optional
+            End of the observation window; later transactions are ignored.
+            Defaults to the last transaction date
+        freq : str, optional
+            Period length ('D', 'W' or 'M'), default is 'D'
+        chunksize : int, optional
+            Process the log in chunks of this many rows. Paths and iterables
+            are always processed in chunks
+        ordered : bool, optional
+            The log is ordered by date, so chunks fold into a per-customer
+            state; see summarize_transactions_chunked. Default is False
+            
+        Returns:
+        --------
+        self
+            The fitted model object
+        """
+        if isinstance(transactions, pd.DataFrame) and chunksize is None:
+            summary = summarize_transactions(
+                transactions, customer_col, date_col, value_col,
+                observation_end=observation_end, freq=freq
+            )
+        else:
+            source = transactions
+            if isinstance(transactions, pd.DataFrame):
+                source = (
+                    transactions.iloc[start:start + chunksize]
+                    for start in range(0, len(transactions), chunksize)
+                )
+            summary = summarize_transactions_chunked(
+                source, customer_col, date_col, value_col,
+                observation_end=observation_end, freq=freq,
+                chunksize=chunksize or 1_000_000, ordered=ordered
+            )
+        
+        return self.fit(
+            summary,
+            frequency_col='frequency',
+            recency_col='recency',
+            T_col='T',
+            monetary_col='monetary_value' if value_col else None
+        )
+    
+    def compact(self, target_ess=None, dtype=None):
+        """
+        Shrink the fitted trace kept for predictions
+        
+        Only the r, alpha, s and beta posteriors are needed to score
+        customers, so the rest of the trace is dropped and the draws are
+        stored as float32.
+        
+        Parameters:
+        -----------
+        target_ess : float, optional
+            Thin draws down to this bulk effective sample size. None uses
+            COMPACTION_CONFIG['target_ess'], which keeps every draw unless set
+        dtype : str, optional
+            Floating point type of the posterior, defaults to COMPACTION_CONFIG['dtype']
+            
+        Returns:
+        --------
+        self
+            The model object with the compacted trace
+        """
+        if self.trace is None:
+            raise ValueError("Model has not been fitted yet")
         
+        self.trace = compact_trace(self.trace, target_ess=target_ess, dtype=dtype)
+        self._extract_posterior()
         return self
     
-    def predict_probability_alive(self, frequency=None, recency=None, T=None):
+    def export_artifact(self, path, dtype=None):
+        """
+        Export the posterior for scoring with scoring.CLVScorer
+        
+        Parameters:
+        -----------
+        path : str
+            Destination .npz file
+        dtype : str, optional
+            Floating point type of the stored draws, defaults to COMPACTION_CONFIG['dtype']
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
+        
+        arrays = dict(zip(PARAMETERS, (values.ravel() for values in self._parameter_columns())))
+        metadata = {
+            'frequency_col': self.frequency_col,
+            'recency_col': self.recency_col,
+            'T_col': self.T_col
+        }
+        save_artifact(path, 'clv', arrays, metadata, dtype=dtype or COMPACTION_CONFIG['dtype'])
+    
+    def predict_probability_alive(self, frequency=None, recency=None, T=None, quantiles=None,
+                                  chunk_size=None, n_jobs=None):
         """
         Predict the probability that customers are still "alive"
         
+        Evaluates the Pareto/NBD P(alive | x, t_x, T) in log space, see
+        pareto_nbd.log_probability_alive. Customers are processed in chunks
+        on a thread pool, broadcasting each chunk against all posterior
+        draws, so memory is bounded by CLV_CHUNK_VALUES values per thread
+        instead of draws x customers. Results are memoized by the content of
+        the inputs, so repeated calls for the same customers, e.g.
+        segmenting and then plotting, are free.
+        
         Parameters:
         -----------
         frequency : array-like, optional
@@ -131,51 +290,36 @@ class CustomerLifetimeValue:
             Time between first and last transaction. If None, uses training data
         T : array-like, optional
             Time since first transaction. If None, uses training data
+        quantiles : list of float, optional
+            Posterior quantiles to report besides the mean, e.g. [0.05, 0.95]
+        chunk_size : int, optional
+            Customers per chunk, derived from CLV_CHUNK_VALUES by default
+        n_jobs : int, optional
+            Number of threads, defaults to the available CPUs
             
         Returns:
         --------
-        numpy.ndarray
-            Probability that each customer is still active
+        numpy.ndarray or pandas.DataFrame
+            Probability that each customer is still active, or a DataFrame
+            with 'mean' and 'Q<q>' columns when quantiles are given
         """
         if self.model is None:
             raise ValueError("Model has not been fitted yet")
             
-        # Use training data if not provided
-        if frequency is None:
-            frequency = self.data[self.frequency_col].values
-        if recency is None:
-            recency = self.data[self.recency_col].values
-        if T is None:
-            T = self.data[self.T_col].values
-            
-        # Extract parameters from trace
-        r_samples = self.trace.posterior['r'].values.flatten()
-        alpha_samples = self.trace.posterior['alpha'].values.flatten()
-        beta_samples = self.trace.posterior['beta'].values.flatten()
-        
-        # Calculate probability alive for each customer and each parameter sample
-        n_samples = len(r_samples)
-        n_customers = len(frequency)
-        prob_alive = np.zeros((n_samples, n_customers))
-        
-        for i in range(n_samples):
-            r = r_samples[i]
-            alpha = alpha_samples[i]
-            beta = beta_samples[i]
-            
-            # Apply the Pareto/NBD formula for probability alive
-            # P(alive) = (1 + x / (beta + x))^(-r)
-            # where x = alpha + frequency
-            x = alpha + frequency
-            prob_alive[i] = np.power(1 + x / (beta + T - recency), -r)
-            
-        # Return mean probability across all samples
-        return prob_alive.mean(axis=0)
+        inputs = self._customer_inputs(frequency, recency, T)
+        return self._predict(
+            ('probability_alive',), pareto_nbd.probability_alive, inputs, quantiles, chunk_size, n_jobs
+        )
     
-    def predict_expected_purchases(self, t, frequency=None, recency=None, T=None):
+    def predict_expected_purchases(self, t, frequency=None, recency=None, T=None, quantiles=None,
+                                   chunk_size=None, n_jobs=None):
         """
         Predict the expected number of purchases in time period t
         
+        Uses the Pareto/NBD conditional expectation, which depends on each
+        customer's history through x, t_x and T, evaluated in chunks and
+        memoized like predict_probability_alive.
+        
         Parameters:
         -----------
         t : float
@@ -186,46 +330,98 @@ class CustomerLifetimeValue:
             Time between first and last transaction. If None, uses training data
         T : array-like, optional
             Time since first transaction. If None, uses training data
+        quantiles : list of float, optional
+            Posterior quantiles to report besides the mean
+        chunk_size : int, optional
+            Customers per chunk, derived from CLV_CHUNK_VALUES by default
+        n_jobs : int, optional
+            Number of threads, defaults to the available CPUs
             
         Returns:
         --------
-        numpy.ndarray
-            Expected number of purchases for each customer
+        numpy.ndarray or pandas.DataFrame
+            Expected number of purchases for each customer, or a DataFrame
+            with 'mean' and 'Q<q>' columns when quantiles are given
         """
         if self.model is None:
             raise ValueError("Model has not been fitted yet")
-            
-        # Use training data if not provided
+        
+        def expected(*args):
+            return pareto_nbd.expected_purchases(t, *args)
+        
+        inputs = self._customer_inputs(frequency, recency, T)
+        return self._predict(('expected_purchases', float(t)), expected, inputs, quantiles, chunk_size, n_jobs)
+    
+    def _customer_inputs(self, frequency, recency, T):
+        """Customer histories as float arrays, using training data for missing inputs"""
         if frequency is None:
             frequency = self.data[self.frequency_col].values
         if recency is None:
             recency = self.data[self.recency_col].values
         if T is None:
             T = self.data[self.T_col].values
-            
-        # Extract parameters from trace
-        r_samples = self.trace.posterior['r'].values.flatten()
-        alpha_samples = self.trace.posterior['alpha'].values.flatten()
-        
-        # Calculate probability alive
-        prob_alive = self.predict_probability_alive(frequency, recency, T)
-        
-        # Calculate expected purchases for alive customers
-        # E[X(t) | alive] = r/alpha * t
-        n_samples = len(r_samples)
-        n_customers = len(frequency)
-        expected_alive = np.zeros((n_samples, n_customers))
+        return tuple(np.asarray(values, dtype=float) for values in (frequency, recency, T))
+    
+    def _extract_posterior(self):
+        """Flatten the parameter draws of the current trace and drop stale predictions"""
+        columns = tuple(
+            self.trace.posterior[name].values.reshape(-1, 1).astype(float)
+            for name in PARAMETERS
+        )
+        self._posterior = (self.trace, columns)
+        self._predictions.clear()
+    
+    def _parameter_columns(self):
+        """Posterior draws of r, alpha, s and beta as (draws, 1) columns for broadcasting"""
+        # The trace may also be replaced directly, e.g. after loading a model
+        if self._posterior is None or self._posterior[0] is not self.trace:
+            self._extract_posterior()
+        return self._posterior[1]
+    
+    def _predict(self, key, fn, inputs, quantiles, chunk_size, n_jobs):
+        """
+        Posterior summary of fn(r, alpha, s, beta, x, t_x, T) per customer, memoized
         
-        for i in range(n_samples):
-            r = r_samples[i]
-            alpha = alpha_samples[i]
-            expected_alive[i] = r / alpha * t
+        Parameters:
+        -----------
+        key : tuple
+            Identifies the prediction and its settings, e.g. ('expected_purchases', t)
+        fn : callable
+            Pareto/NBD expression evaluated on (draws, customers) blocks
+        inputs : tuple of numpy.ndarray
+            frequency, recency and T per customer
+        """
+        r, alpha, s, beta = self._parameter_columns()
+        key = key + (tuple(quantiles) if quantiles is not None else None, fingerprint(*inputs))
         
-        # Mean across samples
-        expected_alive = expected_alive.mean(axis=0)
+        if key in self._predictions:
+            self._predictions.move_to_end(key)
+        else:
+            frequency, recency, T = inputs
+            
+            def evaluate(start, stop):
+                return fn(r, alpha, s, beta, frequency[start:stop], recency[start:stop], T[start:stop])
+            
+            mean, values = summarize_chunks(
+                evaluate, len(frequency), len(r), quantiles,
+                chunk_size=chunk_size, max_values=CLV_CHUNK_VALUES, n_jobs=n_jobs or available_cpus()
+            )
+            self._predictions[key] = self._prediction_summary(mean, values, quantiles)
+            while len(self._predictions) > CLV_PREDICTION_CACHE_SIZE:
+                self._predictions.popitem(last=False)
         
-        # Final expected purchases = P(alive) * E[X(t) | alive]
-        return prob_alive * expected_alive
+        # Copies keep callers from modifying the memoized result
+        return self._predictions[key].copy()
+    
+    @staticmethod
+    def _prediction_summary(mean, values, quantiles):
+        if quantiles is None:
+            return mean
+        
+        summary = pd.DataFrame({'mean': mean})
+        for q, q_values in zip(quantiles, values):
+            summary[f'Q{q:g}'] = q_values
+        return summary
     
     def segment_customers(self, t=30):
         """
@@ -1,6 +1,7 @@
 """
 Configuration settings for PyMC Marketing models
 """
+import os
 
 # Default priors configuration
 DEFAULT_PRIORS = {
@@ -27,9 +28,39 @@ DEFAULT_PRIORS = {
 SAMPLING_CONFIG = {
     'draws': 1000,
     'tune': 1000,
-    'chains': 2,
+    'update_tune': 300,  # Tuning steps for warm-started refits (MediaMixModel.update)
+    'chains': 'auto',  # Number of chains, or 'auto' for one per available CPU
+    'min_chains': 2,   # Lower bound for 'auto', keeps R-hat diagnostics meaningful
+    'max_chains': 8,   # Upper bound for 'auto'
+    'cores': 'auto',   # Parallel chains, or 'auto' for min(chains, available CPUs)
     'target_accept': 0.8,
-    'return_inferencedata': True
+    'return_inferencedata': True,
+    'nuts_sampler': 'pymc'  # Options: 'pymc', 'nutpie', 'numpyro', 'blackjax'
+}
+
+# Posterior inference settings
+INFERENCE_CONFIG = {
+    'method': 'nuts',  # Options: 'nuts', 'map', 'advi', 'fullrank_advi', 'pathfinder'
+    'advi_iterations': 30000,
+    'approx_draws': 1000,  # Draws taken from variational approximations
+    'pathfinder_paths': 4
+}
+
+# On-disk cache of fitted traces, keyed by a hash of the model inputs
+TRACE_CACHE_CONFIG = {
+    'enabled': True,
+    'directory': os.environ.get(
+        'MARKETING_MODELS_CACHE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'dmc-propaganda', 'traces')
+    ),
+    'max_bytes': 2 * 1024 ** 3  # Least recently used traces are evicted above this size
+}
+
+# In-memory compaction of fitted traces, see posterior.compact_trace
+COMPACTION_CONFIG = {
+    'dtype': 'float32',
+    'groups': ['posterior'],  # Groups kept, summaries are computed before compaction
+    'target_ess': None  # Thin draws down to this bulk ESS, None keeps every draw
 }
 
 # Model evaluation metrics to track
@@ -43,6 +74,7 @@ EVALUATION_METRICS = [
 # Feature transformation settings
 TRANSFORMATIONS = {
     'adstock': {
+        'method': 'geometric',  # Options: 'geometric', 'weibull'
         'max_lag': 8,
         'normalize': True
     },
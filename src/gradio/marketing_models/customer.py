@@ -8,6 +8,7 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import seaborn as sns
 from .config import SAMPLING_CONFIG
+from .inference import report_progress
 
 class CustomerAnalysis:
     """Customer analysis and segmentation using K-means clustering"""
@@ -86,9 +87,11 @@ class CustomerAnalysis:
         self.scaler = StandardScaler()
         scaled_features = self.scaler.fit_transform(features)
         
-        # Apply KMeans clustering
+        # Apply KMeans clustering; the reports let a background job cancel
+        report_progress('fitting', 0, 1)
         self.model = KMeans(n_clusters=self.n_clusters, random_state=42)
         cluster_labels = self.model.fit_predict(scaled_features)
+        report_progress('fitting', 1, 1)
         
         # Store cluster assignments and centers
         self.clusters = cluster_labels
@@ -5,15 +5,20 @@ import os
 import pandas as pd
 import numpy as np
 import gradio as gr
+import pyarrow as pa
 import matplotlib.pyplot as plt
 from tempfile import NamedTemporaryFile
 import json
+import asyncio
 import base64
 from io import BytesIO
 
 from .media_mix import MediaMixModel
 from .clv import CustomerLifetimeValue
 from .customer import CustomerAnalysis
+from .config import INFERENCE_CONFIG
+from .inference import INFERENCE_METHODS
+from .jobs import JobManager, job_manager, format_job_status
 
 # Sample data generation functions for demo purposes
 def generate_sample_mmm_data():
@@ -106,6 +111,215 @@ def generate_sample_customer_data():
     
     return data
 
+# Model runs, at module level so the job queue can pickle them for worker processes
+def run_mmm(data_csv, target_col, date_col, channel_cols_str, inference_method=None):
+    """Run media mix modeling analysis"""
+    try:
+        # Parse inputs
+        if data_csv is None:
+            return "No data available. Please upload a file or use sample data.", None, None, None, None
+            
+        # Validate column names
+        try:
+            # Parse channel columns
+            channel_cols = [col.strip() for col in channel_cols_str.split(',')]
+            
+            # Check if target column exists
+            if target_col not in data_csv.columns:
+                return f"Error: Target column '{target_col}' not found in data.", None, None, None, None
+                
+            # Check if date column exists
+            if date_col not in data_csv.columns:
+                return f"Error: Date column '{date_col}' not found in data.", None, None, None, None
+                
+            # Check if all channel columns exist
+            missing_channels = [col for col in channel_cols if col not in data_csv.columns]
+            if missing_channels:
+                return f"Error: Channel columns not found: {', '.join(missing_channels)}", None, None, None, None
+        except Exception as e:
+            return f"Error validating columns: {str(e)}", None, None, None, None
+            
+        # Initialize model
+        mmm = MediaMixModel()
+        
+        # Fit model
+        mmm.fit(data_csv, channels=channel_cols, target=target_col, date_col=date_col, method=inference_method)
+        
+        # Generate ROI estimates
+        roi_df = mmm.get_roi_estimates()
+        roi_html = roi_df.to_html(index=False)
+        
+        # Generate plot
+        fig = mmm.plot_channel_contributions()
+        
+        # Save plot to buffer
+        buf = BytesIO()
+        fig.savefig(buf, format='png')
+        buf.seek(0)
+        plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)
+        
+        # Per-period decomposition into baseline and channel contributions
+        fig = mmm.plot_contributions()
+        buf = BytesIO()
+        fig.savefig(buf, format='png')
+        buf.seek(0)
+        decomposition_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)
+        
+        # Get budget optimization with even budget split
+        total_budget = data_csv[channel_cols].sum().sum() / len(data_csv) * 30  # Monthly budget estimate
+        optimal_budget = mmm.optimize_budget(total_budget)
+        budget_html = pd.DataFrame({
+            'Channel': list(optimal_budget.keys()),
+            'Optimal Budget': list(optimal_budget.values())
+        }).to_html(index=False)
+        
+        return "Media Mix Model successfully fitted!", roi_html, plot_base64, decomposition_base64, budget_html
+        
+    except Exception as e:
+        return f"Error running model: {str(e)}", None, None, None, None
+
+def run_clv(data_csv, freq_col, recency_col, t_col, monetary_col, inference_method=None):
+    """Run CLV analysis"""
+    try:
+        # Parse inputs
+        if data_csv is None:
+            return "No data available. Please upload a file or use sample data.", None, None
+            
+        # Initialize model
+        clv = CustomerLifetimeValue()
+        
+        # Fit model
+        clv.fit(
+            data=data_csv, 
+            frequency_col=freq_col, 
+            recency_col=recency_col, 
+            T_col=t_col, 
+            monetary_col=monetary_col,
+            method=inference_method
+        )
+        
+        # Get customer segments
+        segments_df = clv.segment_customers()
+        
+        # Create segment distribution DataFrame
+        segment_counts = segments_df['segment'].value_counts().reset_index()
+        segment_counts.columns = ['Segment', 'Count']
+        segment_counts['Percentage'] = segment_counts['Count'] / segment_counts['Count'].sum() * 100
+        segments_html = segment_counts.to_html(index=False)
+        
+        # Generate plot
+        fig = clv.plot_segments()
+        
+        # Save plot to buffer
+        buf = BytesIO()
+        fig.savefig(buf, format='png')
+        buf.seek(0)
+        plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)
+        
+        return "CLV Model successfully fitted!", segments_html, plot_base64
+        
+    except Exception as e:
+        return f"Error running model: {str(e)}", None, None
+
+def run_customer_analysis(data_csv, feature_cols_str, n_clusters):
+    """Run customer segmentation analysis"""
+    try:
+        # Parse inputs
+        if data_csv is None:
+            return "No data available. Please upload a file or use sample data.", None, None, None
+            
+        # Parse feature columns
+        feature_cols = [col.strip() for col in feature_cols_str.split(',')]
+        
+        # Initialize model
+        customer_model = CustomerAnalysis(n_clusters=n_clusters)
+        
+        # Fit model
+        customer_model.fit(data_csv, feature_cols=feature_cols)
+        
+        # Get cluster profiles
+        profiles = customer_model.get_cluster_profiles()
+        
+        # Format profile data for display
+        profile_display = pd.DataFrame({
+            'Segment': profiles['name'],
+            'Count': profiles['count'],
+            'Percentage': profiles['percentage'].round(2)
+        })
+        
+        # Add key stats for each feature
+        for feature in feature_cols:
+            profile_display[f'{feature} (avg)'] = profiles[f'{feature}_mean'].round(2)
+        
+        profile_html = profile_display.to_html(index=False)
+        
+        # Generate plot for the first two features
+        fig1 = customer_model.plot_clusters(feature_cols[0], feature_cols[1])
+        
+        # Save plot to buffer
+        buf1 = BytesIO()
+        fig1.savefig(buf1, format='png')
+        buf1.seek(0)
+        plot1_base64 = base64.b64encode(buf1.read()).decode('utf-8')
+        plt.close(fig1)
+        
+        # Generate feature importance plot
+        fig2 = customer_model.plot_feature_importance()
+        
+        # Save plot to buffer
+        buf2 = BytesIO()
+        fig2.savefig(buf2, format='png')
+        buf2.seek(0)
+        plot2_base64 = base64.b64encode(buf2.read()).decode('utf-8')
+        plt.close(fig2)
+        
+        # Return segmented data
+        segments = customer_model.get_customer_segments()
+        segments_display = segments[['customer_id', 'segment'] + feature_cols].head(50)
+        
+        return "Customer segmentation completed successfully!", profile_html, plot1_base64, plot2_base64, segments_display
+        
+    except Exception as e:
+        return f"Error running model: {str(e)}", None, None, None, None
+
+# Background fits
+JOB_POLL_SECONDS = 1.0
+
+async def stream_job(fn, args, n_outputs):
+    """
+    Run a model fit on the job queue, streaming its progress to the UI
+
+    Yields the job ID, a status message and n_outputs result values; the
+    result values are left untouched until the job finishes. Polling awaits
+    instead of sleeping, so waiting fits do not hold Gradio worker threads.
+    """
+    job_id = job_manager.submit(fn, *args)
+    skipped = (gr.skip(),) * n_outputs
+
+    status = job_manager.status(job_id)
+    while status['state'] not in JobManager.FINISHED_STATES:
+        yield (job_id, format_job_status(status)) + skipped
+        await asyncio.sleep(JOB_POLL_SECONDS)
+        status = job_manager.status(job_id)
+
+    if status['state'] == 'done':
+        result = job_manager.result(job_id)
+    else:
+        result = (format_job_status(status),) + (None,) * n_outputs
+    job_manager.forget(job_id)
+    yield (None,) + tuple(result)
+
+def cancel_job(job_id):
+    """Cancel the running fit of an interface, if any"""
+    if not job_id:
+        return gr.skip()
+    if job_manager.cancel(job_id):
+        return f"Cancelling job {job_id[:8]}..."
+    return gr.skip()
+
 # Gradio interfaces
 def create_mmm_interface():
     """Create Gradio interface for Media Mix Modeling"""
@@ -120,8 +334,13 @@ def create_mmm_interface():
                 data = pd.read_csv(file.name)
             elif file.name.endswith(('.xls', '.xlsx')):
                 data = pd.read_excel(file.name)
+            elif file.name.endswith('.parquet'):
+                data = pd.read_parquet(file.name)
+            elif file.name.endswith(('.arrow', '.arrows')):
+                with pa.OSFile(file.name, 'rb') as source:
+                    data = pa.ipc.open_stream(source).read_pandas()
             else:
-                return "Unsupported file format. Please upload CSV or Excel file.", None
+                return "Unsupported file format. Please upload CSV, Excel, Parquet or Arrow file.", None
                 
             # Validate essential columns
             required_columns = ["date"]  # Add required columns for MMM
@@ -133,84 +352,32 @@ def create_mmm_interface():
         except Exception as e:
             return f"Error loading file: {str(e)}", None
     
-    def run_mmm(data_csv, target_col, date_col, channel_cols_str):
-        """Run media mix modeling analysis"""
-        try:
-            # Parse inputs
-            if data_csv is None:
-                return "No data available. Please upload a file or use sample data.", None, None, None
-                
-            # Validate column names
-            try:
-                # Parse channel columns
-                channel_cols = [col.strip() for col in channel_cols_str.split(',')]
-                
-                # Check if target column exists
-                if target_col not in data_csv.columns:
-                    return f"Error: Target column '{target_col}' not found in data.", None, None, None
-                    
-                # Check if date column exists
-                if date_col not in data_csv.columns:
-                    return f"Error: Date column '{date_col}' not found in data.", None, None, None
-                    
-                # Check if all channel columns exist
-                missing_channels = [col for col in channel_cols if col not in data_csv.columns]
-                if missing_channels:
-                    return f"Error: Channel columns not found: {', '.join(missing_channels)}", None, None, None
-            except Exception as e:
-                return f"Error validating columns: {str(e)}", None, None, None
-                
-            # Initialize model
-            mmm = MediaMixModel()
-            
-            # Fit model
-            mmm.fit(data_csv, channels=channel_cols, target=target_col, date_col=date_col)
-            
-            # Generate ROI estimates
-            roi_df = mmm.get_roi_estimates()
-            roi_html = roi_df.to_html(index=False)
-            
-            # Generate plot
-            fig = mmm.plot_channel_contributions()
-            
-            # Save plot to buffer
-            buf = BytesIO()
-            fig.savefig(buf, format='png')
-            buf.seek(0)
-            plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close(fig)
-            
-            # Get budget optimization with even budget split
-            total_budget = data_csv[channel_cols].sum().sum() / len(data_csv) * 30  # Monthly budget estimate
-            optimal_budget = mmm.optimize_budget(total_budget)
-            budget_html = pd.DataFrame({
-                'Channel': list(optimal_budget.keys()),
-                'Optimal Budget': list(optimal_budget.values())
-            }).to_html(index=False)
-            
-            return "Media Mix Model successfully fitted!", roi_html, plot_base64, budget_html
-            
-        except Exception as e:
-            return f"Error running model: {str(e)}", None, None, None
-    
     with gr.Blocks() as mmm_interface:
         gr.Markdown("# Media Mix Modeling with PyMC Marketing")
         
         with gr.Row():
             with gr.Column():
-                data_file = gr.File(label="Upload Data (CSV or Excel)")
+                data_file = gr.File(label="Upload Data (CSV, Excel, Parquet or Arrow)")
                 use_sample = gr.Button("Use Sample Data")
                 data_info = gr.Textbox(label="Data Info", interactive=False)
                 
                 target_col = gr.Textbox(label="Target Column", value="sales")
                 date_col = gr.Textbox(label="Date Column", value="date")
                 channel_cols = gr.Textbox(label="Channel Columns (comma-separated)", value="tv,radio,social,search,email")
-                run_button = gr.Button("Run Media Mix Model")
+                inference_method = gr.Dropdown(
+                    label="Inference Method",
+                    choices=INFERENCE_METHODS,
+                    value=INFERENCE_CONFIG['method']
+                )
+                with gr.Row():
+                    run_button = gr.Button("Run Media Mix Model")
+                    cancel_button = gr.Button("Cancel")
                 
             with gr.Column():
                 data_preview = gr.Dataframe(label="Data Preview")
         
         result = gr.Textbox(label="Result")
+        job_id = gr.State(None)
         loading_indicator = gr.HTML("""<div id="loading" style="display:none; text-align:center">
                                     <p>Calculating model - this may take a few moments...</p>
                                     <div class="loader"></div>
@@ -237,6 +404,9 @@ def create_mmm_interface():
                     # Using HTML to display the base64 image
                     channel_effects_plot = gr.HTML(label="Channel Effects")
                 
+                with gr.TabItem("Contribution Decomposition"):
+                    decomposition_plot = gr.HTML(label="Contribution Decomposition")
+                
                 with gr.TabItem("ROI Estimates"):
                     roi_table = gr.HTML(label="ROI Estimates")
                 
@@ -279,21 +449,26 @@ def create_mmm_interface():
         def hide_loading():
             return """<div id="loading" style="display:none"></div>"""
         
+        async def submit_mmm(*args):
+            async for update in stream_job(run_mmm, args, 4):
+                yield update
+        
         run_button.click(
             show_loading, 
             inputs=None, 
             outputs=loading_indicator,
             queue=False
         ).then(
-            run_mmm, 
-            inputs=[data_preview, target_col, date_col, channel_cols], 
-            outputs=[result, roi_table, channel_effects_plot, budget_table]
+            submit_mmm, 
+            inputs=[data_preview, target_col, date_col, channel_cols, inference_method], 
+            outputs=[job_id, result, roi_table, channel_effects_plot, decomposition_plot, budget_table]
         ).then(
             hide_loading,
             inputs=None,
             outputs=loading_indicator,
             queue=False
         )
+        cancel_button.click(cancel_job, inputs=[job_id], outputs=[result], queue=False)
     
     return mmm_interface
 
@@ -310,62 +485,24 @@ def create_clv_interface():
                 data = pd.read_csv(file.name)
             elif file.name.endswith(('.xls', '.xlsx')):
                 data = pd.read_excel(file.name)
+            elif file.name.endswith('.parquet'):
+                data = pd.read_parquet(file.name)
+            elif file.name.endswith(('.arrow', '.arrows')):
+                with pa.OSFile(file.name, 'rb') as source:
+                    data = pa.ipc.open_stream(source).read_pandas()
             else:
-                return "Unsupported file format. Please upload CSV or Excel file.", None
+                return "Unsupported file format. Please upload CSV, Excel, Parquet or Arrow file.", None
                 
             return f"Successfully loaded data with {data.shape[0]} rows and {data.shape[1]} columns.", data
         except Exception as e:
             return f"Error loading file: {str(e)}", None
     
-    def run_clv(data_csv, freq_col, recency_col, t_col, monetary_col):
-        """Run CLV analysis"""
-        try:
-            # Parse inputs
-            if data_csv is None:
-                return "No data available. Please upload a file or use sample data.", None, None
-                
-            # Initialize model
-            clv = CustomerLifetimeValue()
-            
-            # Fit model
-            clv.fit(
-                data=data_csv, 
-                frequency_col=freq_col, 
-                recency_col=recency_col, 
-                T_col=t_col, 
-                monetary_col=monetary_col
-            )
-            
-            # Get customer segments
-            segments_df = clv.segment_customers()
-            
-            # Create segment distribution DataFrame
-            segment_counts = segments_df['segment'].value_counts().reset_index()
-            segment_counts.columns = ['Segment', 'Count']
-            segment_counts['Percentage'] = segment_counts['Count'] / segment_counts['Count'].sum() * 100
-            segments_html = segment_counts.to_html(index=False)
-            
-            # Generate plot
-            fig = clv.plot_segments()
-            
-            # Save plot to buffer
-            buf = BytesIO()
-            fig.savefig(buf, format='png')
-            buf.seek(0)
-            plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close(fig)
-            
-            return "CLV Model successfully fitted!", segments_html, plot_base64
-            
-        except Exception as e:
-            return f"Error running model: {str(e)}", None, None
-    
     with gr.Blocks() as clv_interface:
         gr.Markdown("# Customer Lifetime Value Modeling with PyMC Marketing")
         
         with gr.Row():
             with gr.Column():
-                data_file = gr.File(label="Upload Data (CSV or Excel)")
+                data_file = gr.File(label="Upload Data (CSV, Excel, Parquet or Arrow)")
                 use_sample = gr.Button("Use Sample Data")
                 data_info = gr.Textbox(label="Data Info", interactive=False)
                 
@@ -373,12 +510,20 @@ def create_clv_interface():
                 recency_col = gr.Textbox(label="Recency Column", value="recency")
                 t_col = gr.Textbox(label="T Column (time since first purchase)", value="T")
                 monetary_col = gr.Textbox(label="Monetary Value Column (optional)", value="monetary_value")
-                run_button = gr.Button("Run CLV Model")
+                inference_method = gr.Dropdown(
+                    label="Inference Method",
+                    choices=INFERENCE_METHODS,
+                    value=INFERENCE_CONFIG['method']
+                )
+                with gr.Row():
+                    run_button = gr.Button("Run CLV Model")
+                    cancel_button = gr.Button("Cancel")
                 
             with gr.Column():
                 data_preview = gr.Dataframe(label="Data Preview")
         
         result = gr.Textbox(label="Result")
+        job_id = gr.State(None)
         
         with gr.Accordion("Model Results", open=False):
             with gr.Tabs():
@@ -399,11 +544,16 @@ def create_clv_interface():
         data_file.upload(load_and_preview_data, inputs=[data_file], outputs=[data_info, data_preview])
         use_sample.click(use_sample_data, inputs=[], outputs=[data_info, data_preview])
         
+        async def submit_clv(*args):
+            async for update in stream_job(run_clv, args, 2):
+                yield update
+        
         run_button.click(
-            run_clv, 
-            inputs=[data_preview, freq_col, recency_col, t_col, monetary_col], 
-            outputs=[result, segment_table, segment_plot]
+            submit_clv, 
+            inputs=[data_preview, freq_col, recency_col, t_col, monetary_col, inference_method], 
+            outputs=[job_id, result, segment_table, segment_plot]
         )
+        cancel_button.click(cancel_job, inputs=[job_id], outputs=[result], queue=False)
     
     return clv_interface
 
@@ -427,67 +577,6 @@ def create_customer_interface():
         except Exception as e:
             return f"Error loading file: {str(e)}", None
     
-    def run_customer_analysis(data_csv, feature_cols_str, n_clusters):
-        """Run customer segmentation analysis"""
-        try:
-            # Parse inputs
-            if data_csv is None:
-                return "No data available. Please upload a file or use sample data.", None, None, None
-                
-            # Parse feature columns
-            feature_cols = [col.strip() for col in feature_cols_str.split(',')]
-            
-            # Initialize model
-            customer_model = CustomerAnalysis(n_clusters=n_clusters)
-            
-            # Fit model
-            customer_model.fit(data_csv, feature_cols=feature_cols)
-            
-            # Get cluster profiles
-            profiles = customer_model.get_cluster_profiles()
-            
-            # Format profile data for display
-            profile_display = pd.DataFrame({
-                'Segment': profiles['name'],
-                'Count': profiles['count'],
-                'Percentage': profiles['percentage'].round(2)
-            })
-            
-            # Add key stats for each feature
-            for feature in feature_cols:
-                profile_display[f'{feature} (avg)'] = profiles[f'{feature}_mean'].round(2)
-            
-            profile_html = profile_display.to_html(index=False)
-            
-            # Generate plot for the first two features
-            fig1 = customer_model.plot_clusters(feature_cols[0], feature_cols[1])
-            
-            # Save plot to buffer
-            buf1 = BytesIO()
-            fig1.savefig(buf1, format='png')
-            buf1.seek(0)
-            plot1_base64 = base64.b64encode(buf1.read()).decode('utf-8')
-            plt.close(fig1)
-            
-            # Generate feature importance plot
-            fig2 = customer_model.plot_feature_importance()
-            
-            # Save plot to buffer
-            buf2 = BytesIO()
-            fig2.savefig(buf2, format='png')
-            buf2.seek(0)
-            plot2_base64 = base64.b64encode(buf2.read()).decode('utf-8')
-            plt.close(fig2)
-            
-            # Return segmented data
-            segments = customer_model.get_customer_segments()
-            segments_display = segments[['customer_id', 'segment'] + feature_cols].head(50)
-            
-            return "Customer segmentation completed successfully!", profile_html, plot1_base64, plot2_base64, segments_display
-            
-        except Exception as e:
-            return f"Error running model: {str(e)}", None, None, None, None
-    
     with gr.Blocks() as customer_interface:
         gr.Markdown("# Customer Segmentation Analysis")
         
@@ -508,12 +597,15 @@ def create_customer_interface():
                     step=1, 
                     value=4
                 )
-                run_button = gr.Button("Run Customer Segmentation")
+                with gr.Row():
+                    run_button = gr.Button("Run Customer Segmentation")
+                    cancel_button = gr.Button("Cancel")
                 
             with gr.Column():
                 data_preview = gr.Dataframe(label="Data Preview")
         
         result = gr.Textbox(label="Result")
+        job_id = gr.State(None)
         
         with gr.Accordion("Model Results", open=False):
             with gr.Tabs():
@@ -540,11 +632,16 @@ def create_customer_interface():
         data_file.upload(load_and_preview_data, inputs=[data_file], outputs=[data_info, data_preview])
         use_sample.click(use_sample_data, inputs=[], outputs=[data_info, data_preview])
         
+        async def submit_customer_analysis(*args):
+            async for update in stream_job(run_customer_analysis, args, 4):
+                yield update
+        
         run_button.click(
-            run_customer_analysis, 
+            submit_customer_analysis, 
             inputs=[data_preview, feature_cols, n_clusters], 
-            outputs=[result, segment_table, segment_plot, feature_plot, segments_data]
+            outputs=[job_id, result, segment_table, segment_plot, feature_plot, segments_data]
         )
+        cancel_button.click(cancel_job, inputs=[job_id], outputs=[result], queue=False)
     
     return customer_interface
 
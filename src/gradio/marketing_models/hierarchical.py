@@ -0,0 +1,292 @@
+"""
+Hierarchical media mix model fitting many clients in one PyMC model
+"""
+import numpy as np
+import pandas as pd
+import pymc as pm
+import arviz as az
+
+from .config import DEFAULT_PRIORS, TRANSFORMATIONS
+from .inference import sample_posterior, inference_settings
+from .mongo_feed import load_mmm_data
+from .posterior import stack_draws, summarize_samples
+from .trace_cache import cached_trace
+from .transforms import apply_media_transforms
+
+# Version of the model structure built by build_model, part of the trace cache
+# key; bump it whenever the model changes
+MODEL_VERSION = 1
+
+class HierarchicalMediaMixModel:
+    """
+    Media mix model with client-level channel effects sharing channel hyperpriors
+
+    Spend is adstocked and saturated per client with the TRANSFORMATIONS
+    settings, and each client's target is scaled by its mean, so channel
+    effects are comparable across clients of very different size. Effects
+    are log-normal around a channel-level population mean with a
+    non-centered parameterization, so small clients borrow strength from
+    the others while every client is fitted in a single vectorized model.
+    """
+
+    def __init__(self, priors=None):
+        """
+        Initialize the hierarchical model with configurable priors
+
+        Parameters:
+        -----------
+        priors : dict, optional
+            Dictionary of prior values for the model
+        """
+        self.priors = priors or DEFAULT_PRIORS['mmm']
+        self.model = None
+        self.trace = None
+        self.summary = None
+        self.data = None
+
+    def prepare_data(self, data, client_col, channels, target, date_col=None):
+        """
+        Prepare stacked multi-client data for modeling
+
+        Parameters:
+        -----------
+        data : pandas.DataFrame
+            Periods of all clients, one row per client and period
+        client_col : str
+            Column name with the client identifier
+        channels : list
+            List of column names for marketing channels
+        target : str
+            Column name for the target variable (e.g., sales)
+        date_col : str, optional
+            Name of the date column, used to order each client's periods
+
+        Returns:
+        --------
+        tuple
+            X (transformed media), y (scaled target), client index per row
+        """
+        if date_col:
+            data = data.sort_values([client_col, date_col], kind='stable')
+        self.data = data.reset_index(drop=True)
+        self.client_col = client_col
+        self.channels = channels
+        self.target = target
+        self.date_col = date_col
+
+        client_idx, self.clients = pd.factorize(self.data[client_col], sort=True)
+        self.client_idx = client_idx
+
+        spend = self.data[channels].to_numpy(dtype=float)
+        y = self.data[target].to_numpy(dtype=float)
+
+        # Per-client target scale keeps effects comparable across client sizes
+        counts = np.bincount(client_idx)
+        self.target_scale = np.bincount(client_idx, weights=y) / counts
+        self.target_scale[self.target_scale == 0] = 1.0
+
+        # Carryover must not leak across clients, so transform each block
+        X = np.empty_like(spend)
+        for c in range(len(self.clients)):
+            rows = client_idx == c
+            X[rows] = apply_media_transforms(spend[rows])
+
+        return X, y / self.target_scale[client_idx], client_idx
+
+    def build_model(self, X, y, client_idx):
+        """
+        Build the hierarchical PyMC model
+
+        Parameters:
+        -----------
+        X : numpy.ndarray
+            Transformed media with shape (rows, channels)
+        y : numpy.ndarray
+            Target scaled by each client's mean
+        client_idx : numpy.ndarray
+            Client index of every row
+        """
+        coords = {'client': list(map(str, self.clients)), 'channel': self.channels}
+
+        with pm.Model(coords=coords) as self.model:
+            # Channel-level population effects
+            mu_log_beta = pm.Normal('mu_log_beta', mu=np.log(self.priors['beta']), sigma=1.0, dims='channel')
+            sigma_log_beta = pm.HalfNormal('sigma_log_beta', sigma=0.5, dims='channel')
+
+            # Non-centered client deviations avoid the funnel for small clients
+            z_beta = pm.Normal('z_beta', 0.0, 1.0, dims=('client', 'channel'))
+            beta = pm.Deterministic(
+                'beta', pm.math.exp(mu_log_beta + sigma_log_beta * z_beta), dims=('client', 'channel')
+            )
+
+            alpha = pm.Normal('alpha', mu=1.0, sigma=1.0, dims='client')
+            sigma = pm.HalfNormal('sigma', sigma=self.priors['sigma'] * 5, dims='client')
+
+            mu = alpha[client_idx] + (X * beta[client_idx]).sum(axis=1)
+            pm.Normal('y', mu=mu, sigma=sigma[client_idx], observed=y)
+
+    def fit(self, data, client_col, channels, target, date_col=None, method=None, nuts_sampler=None):
+        """
+        Fit all clients in one hierarchical model
+
+        Parameters:
+        -----------
+        data : pandas.DataFrame
+            Periods of all clients, one row per client and period
+        client_col : str
+            Column name with the client identifier
+        channels : list
+            List of column names for marketing channels
+        target : str
+            Column name for the target variable (e.g., sales)
+        date_col : str, optional
+            Name of the date column, used to order each client's periods
+        method : str, optional
+            Inference method, defaults to INFERENCE_CONFIG['method']
+        nuts_sampler : str, optional
+            NUTS backend, defaults to SAMPLING_CONFIG['nuts_sampler']
+
+        Returns:
+        --------
+        self
+            The fitted model object
+        """
+        X, y, client_idx = self.prepare_data(data, client_col, channels, target, date_col)
+        self.X = X
+
+        self.build_model(X, y, client_idx)
+
+        self.trace = cached_trace(
+            ['hierarchical_mmm', MODEL_VERSION, X, y, client_idx, list(map(str, self.clients)), self.channels,
+             self.priors, TRANSFORMATIONS, inference_settings(method, nuts_sampler)],
+            lambda: sample_posterior(self.model, method, nuts_sampler=nuts_sampler)
+        )
+
+        self.summary = az.summary(self.trace, var_names=['mu_log_beta', 'sigma_log_beta', 'alpha', 'sigma'])
+
+        return self
+
+    def fit_from_mongo(self, db, client_ids, target="conversions", date_col="date",
+                       start_date=None, end_date=None, freq="D", method=None):
+        """
+        Fit the campaign histories of several clients in one model
+
+        Parameters:
+        -----------
+        db : pymongo.database.Database
+            Database holding the campaigns collection
+        client_ids : list
+            IDs of the clients to model
+        target : str, optional
+            Campaign metric used as the outcome, default is 'conversions'
+        date_col : str, optional
+            Name of the date column
+        start_date, end_date : datetime-like, optional
+            Restrict campaigns by start date
+        freq : str, optional
+            Pandas frequency of the modeled periods, default is daily
+        method : str, optional
+            Inference method, defaults to INFERENCE_CONFIG['method']
+
+        Returns:
+        --------
+        self
+            The fitted model object
+        """
+        frames = []
+        for client_id in client_ids:
+            frame = load_mmm_data(
+                db, client_id, target=target, date_col=date_col,
+                start_date=start_date, end_date=end_date, freq=freq
+            )
+            frames.append(frame.assign(client=str(client_id)))
+
+        # Channels a client never used count as zero spend
+        data = pd.concat(frames, ignore_index=True)
+        channels = sorted(col for col in data.columns if col not in (date_col, target, 'client'))
+        data[channels] = data[channels].fillna(0.0)
+
+        return self.fit(data, 'client', channels, target, date_col, method=method)
+
+    def _samples(self, name):
+        """Posterior draws stacked over (chain, draw)"""
+        return stack_draws(self.trace.posterior[name].values)
+
+    def predict(self):
+        """
+        Posterior mean predictions for the training periods
+
+        Returns:
+        --------
+        numpy.ndarray
+            Predicted target in original units, one value per row of self.data
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
+
+        alpha = self._samples('alpha').mean(axis=0)
+        beta = self._samples('beta').mean(axis=0)
+
+        scaled = alpha[self.client_idx] + (self.X * beta[self.client_idx]).sum(axis=1)
+        return scaled * self.target_scale[self.client_idx]
+
+    def get_roi_estimates(self):
+        """
+        Posterior ROI of every client and channel
+
+        ROI is the modeled contribution of a channel over the training
+        periods divided by the client's spend on it.
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Client, Channel, ROI, Lower_CI and Upper_CI per client and channel
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
+
+        n_clients = len(self.clients)
+
+        # Transformed media and spend totals per client: (clients, channels)
+        media_totals = np.stack([
+            np.bincount(self.client_idx, weights=self.X[:, k], minlength=n_clients)
+            for k in range(len(self.channels))
+        ], axis=1)
+        spend = self.data[self.channels].to_numpy(dtype=float)
+        spend_totals = np.stack([
+            np.bincount(self.client_idx, weights=spend[:, k], minlength=n_clients)
+            for k in range(len(self.channels))
+        ], axis=1)
+
+        # One broadcast over (draws, clients, channels)
+        contribution = self._samples('beta') * media_totals * self.target_scale[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi_samples = np.where(spend_totals > 0, contribution / spend_totals, np.nan)
+        roi_mean, roi_quantiles = summarize_samples(roi_samples, [0.025, 0.975])
+
+        return pd.DataFrame({
+            'Client': np.repeat(self.clients, len(self.channels)),
+            'Channel': np.tile(self.channels, n_clients),
+            'ROI': roi_mean.ravel(),
+            'Lower_CI': roi_quantiles[0].ravel(),
+            'Upper_CI': roi_quantiles[1].ravel()
+        })
+
+    def get_population_effects(self):
+        """
+        Channel effects of a typical client from the population distribution
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Channel, Effect (median effect on the scaled target) and the
+            between-client spread Sigma on the log scale
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
+
+        return pd.DataFrame({
+            'Channel': self.channels,
+            'Effect': np.exp(self._samples('mu_log_beta').mean(axis=0)),
+            'Sigma': self._samples('sigma_log_beta').mean(axis=0)
+        })
@@ -0,0 +1,338 @@
+"""
+Posterior inference with NUTS or fast approximate methods
+"""
+import contextvars
+import importlib.util
+import itertools
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pymc as pm
+import arviz as az
+
+from .config import SAMPLING_CONFIG, INFERENCE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_METHODS = ['nuts', 'map', 'advi', 'fullrank_advi', 'pathfinder']
+
+# Alternative NUTS implementations and the package each one needs
+NUTS_SAMPLERS = {
+    'pymc': None,
+    'nutpie': 'nutpie',
+    'numpyro': 'numpyro',
+    'blackjax': 'blackjax'
+}
+
+# Draws between two progress reports, keeps reporting overhead negligible
+PROGRESS_EVERY = 25
+
+# Optimizer iterations between two progress reports of MAP and variational fits
+FIT_PROGRESS_EVERY = 100
+
+# Log density evaluations allowed to the MAP optimizer
+MAP_MAX_EVALS = 5000
+
+# Receives (phase, done, total) while a fit runs, e.g. to update a background
+# job. A context variable, so fits in other threads keep their own reporter
+_progress_reporter = contextvars.ContextVar('progress_reporter', default=None)
+
+def set_progress_reporter(reporter):
+    """
+    Register a callable receiving (phase, done, total) progress updates
+
+    Phases are 'tuning' and 'sampling' for NUTS draws summed over chains,
+    and 'fitting' with optimizer iterations for the other inference
+    methods; Pathfinder only reports its start and end. The reporter may
+    raise to abort the fit. It applies to fits in the current thread (or
+    asyncio task) only. Pass None to stop reporting.
+    """
+    _progress_reporter.set(reporter)
+
+@contextmanager
+def reporting_progress(reporter):
+    """Send progress updates of fits in this block to reporter, see set_progress_reporter"""
+    token = _progress_reporter.set(reporter)
+    try:
+        yield
+    finally:
+        _progress_reporter.reset(token)
+
+def report_progress(phase, done, total):
+    """Pass a progress update to the registered reporter, if any"""
+    reporter = _progress_reporter.get()
+    if reporter is not None:
+        reporter(phase, done, total)
+
+def _progress_callback(tune, draws, chains):
+    """pm.sample callback counting tuning and sampling draws over all chains"""
+    counts = {'tuning': 0, 'sampling': 0}
+    totals = {'tuning': tune * chains, 'sampling': draws * chains}
+
+    def callback(trace, draw):
+        phase = 'tuning' if draw.tuning else 'sampling'
+        counts[phase] += 1
+        if counts[phase] % PROGRESS_EVERY == 0 or counts[phase] == totals[phase]:
+            report_progress(phase, counts[phase], totals[phase])
+
+    return callback
+
+def _fit_progress_callback(total):
+    """Optimizer callback reporting 'fitting' progress every FIT_PROGRESS_EVERY iterations"""
+    iterations = itertools.count(1)
+
+    def callback(*args):
+        done = next(iterations)
+        if done % FIT_PROGRESS_EVERY == 0:
+            report_progress('fitting', min(done, total), total)
+
+    return callback
+
+def fit_iterations(method):
+    """Iteration budget of a non-NUTS method, the total of its 'fitting' progress"""
+    if method == 'map':
+        return MAP_MAX_EVALS
+    if method in ('advi', 'fullrank_advi'):
+        return INFERENCE_CONFIG['advi_iterations']
+    return 1
+
+def _cgroup_cpu_limit():
+    """CPU quota imposed by cgroups (v2 or v1), or None when unlimited"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return float(quota) / float(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = float(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = float(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_cpus():
+    """Number of CPUs this process may use, honoring affinity and cgroup quotas"""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+def sampling_resources(config=None):
+    """
+    Resolve the number of chains and parallel cores for NUTS
+
+    Parameters:
+    -----------
+    config : dict, optional
+        Sampling settings, defaults to SAMPLING_CONFIG
+
+    Returns:
+    --------
+    tuple
+        (chains, cores)
+    """
+    config = config or SAMPLING_CONFIG
+    cpus = available_cpus()
+
+    chains = config['chains']
+    if chains == 'auto':
+        chains = min(max(cpus, config.get('min_chains', 2)), config.get('max_chains', cpus))
+
+    cores = config.get('cores', 'auto')
+    if cores == 'auto':
+        cores = min(chains, cpus)
+
+    return chains, cores
+
+def resolve_nuts_sampler(nuts_sampler=None):
+    """Return the requested NUTS backend, or 'pymc' when it is not installed"""
+    nuts_sampler = nuts_sampler or SAMPLING_CONFIG.get('nuts_sampler', 'pymc')
+    if nuts_sampler not in NUTS_SAMPLERS:
+        raise ValueError(f"Unknown NUTS sampler '{nuts_sampler}'. Must be one of {list(NUTS_SAMPLERS)}")
+
+    package = NUTS_SAMPLERS[nuts_sampler]
+    if package is not None and importlib.util.find_spec(package) is None:
+        logger.warning("NUTS sampler '%s' requires the '%s' package, falling back to 'pymc'", nuts_sampler, package)
+        return 'pymc'
+    return nuts_sampler
+
+def inference_settings(method=None, nuts_sampler=None, tune=None):
+    """
+    Settings that determine the posterior a fit produces, e.g. for cache keys
+
+    Returns:
+    --------
+    dict
+        Inference method with its relevant configuration
+    """
+    method = method or INFERENCE_CONFIG['method']
+    if method != 'nuts':
+        return {'method': method, 'config': INFERENCE_CONFIG}
+    return {
+        'method': method,
+        'config': SAMPLING_CONFIG,
+        'chains': sampling_resources()[0],
+        'nuts_sampler': resolve_nuts_sampler(nuts_sampler),
+        'tune': tune or SAMPLING_CONFIG['tune']
+    }
+
+def posterior_point(trace):
+    """
+    Posterior mean of every variable, e.g. as starting values for a refit
+
+    Returns:
+    --------
+    dict
+        Variable name to posterior mean array
+    """
+    return {
+        # Means of compacted float32 traces are cast back for the float64 model
+        name: values.mean(dim=('chain', 'draw')).values.astype(float)
+        for name, values in trace.posterior.data_vars.items()
+    }
+
+def _map_inference_data(model, point):
+    """Wrap a MAP point estimate as a single-draw posterior"""
+    names = [var.name for var in model.free_RVs + model.deterministics]
+    posterior = {
+        name: np.asarray(point[name])[np.newaxis, np.newaxis]
+        for name in names if name in point
+    }
+    dims = {
+        name: list(model.named_vars_to_dims[name])
+        for name in posterior if name in model.named_vars_to_dims
+    }
+    coords = {name: list(values) for name, values in model.coords.items() if values is not None}
+    return az.from_dict(posterior=posterior, dims=dims, coords=coords)
+
+def sample_posterior(model=None, method=None, random_seed=None, nuts_sampler=None,
+                     tune=None, initvals=None):
+    """
+    Draw from the posterior of a PyMC model with the selected inference method
+
+    Parameters:
+    -----------
+    model : pymc.Model, optional
+        Model to fit, defaults to the model on the context stack
+    method : str, optional
+        One of INFERENCE_METHODS, defaults to INFERENCE_CONFIG['method']:
+        'nuts' runs full MCMC with SAMPLING_CONFIG, 'map' finds the posterior
+        mode, 'advi'/'fullrank_advi' fit a variational approximation and
+        'pathfinder' runs multi-path Pathfinder (requires pymc-extras)
+    random_seed : int, optional
+        Seed for reproducible draws
+    nuts_sampler : str, optional
+        NUTS backend for method 'nuts', one of NUTS_SAMPLERS, defaults to
+        SAMPLING_CONFIG['nuts_sampler']; falls back to 'pymc' if not installed
+    tune : int, optional
+        NUTS tuning steps, defaults to SAMPLING_CONFIG['tune']
+    initvals : dict, optional
+        Starting values by variable name, e.g. from posterior_point of an
+        earlier fit. Names that are not free variables of the model are ignored
+
+    Returns:
+    --------
+    arviz.InferenceData
+        Posterior draws. MAP returns a single draw at the mode. The method,
+        backend, chains, cores and wall-clock seconds of the run are recorded
+        in the posterior attributes
+    """
+    method = method or INFERENCE_CONFIG['method']
+    if method not in INFERENCE_METHODS:
+        raise ValueError(f"Unknown inference method '{method}'. Must be one of {INFERENCE_METHODS}")
+
+    model = pm.modelcontext(model)
+    if initvals:
+        free_names = {var.name for var in model.free_RVs}
+        initvals = {name: value for name, value in initvals.items() if name in free_names} or None
+
+    run_info = {'inference_method': method, 'warm_start': int(bool(initvals))}
+    start = time.perf_counter()
+    if method != 'nuts':
+        report_progress('fitting', 0, fit_iterations(method))
+    with model:
+        trace = _run_inference(model, method, random_seed, nuts_sampler, tune, initvals, run_info)
+    run_info['inference_seconds'] = time.perf_counter() - start
+    if method != 'nuts':
+        report_progress('fitting', fit_iterations(method), fit_iterations(method))
+
+    logger.info("Posterior inference finished: %s", run_info)
+    if hasattr(trace, 'posterior'):
+        trace.posterior.attrs.update(run_info)
+    return trace
+
+def _run_inference(model, method, random_seed, nuts_sampler, tune, initvals, run_info):
+    """Run one inference method inside the model context"""
+    if method == 'nuts':
+        chains, cores = sampling_resources()
+        nuts_sampler = resolve_nuts_sampler(nuts_sampler)
+        tune = tune or SAMPLING_CONFIG['tune']
+        run_info.update({'nuts_sampler': nuts_sampler, 'chains': chains, 'cores': cores, 'tune': tune})
+
+        # Per-draw callbacks are only supported by the PyMC sampler
+        callback = None
+        if _progress_reporter.get() is not None and nuts_sampler == 'pymc':
+            callback = _progress_callback(tune, SAMPLING_CONFIG['draws'], chains)
+
+        return pm.sample(
+            draws=SAMPLING_CONFIG['draws'],
+            tune=tune,
+            chains=chains,
+            cores=cores,
+            target_accept=SAMPLING_CONFIG['target_accept'],
+            return_inferencedata=SAMPLING_CONFIG['return_inferencedata'],
+            nuts_sampler=nuts_sampler,
+            initvals=initvals,
+            callback=callback,
+            random_seed=random_seed
+        )
+
+    # Iteration callbacks report progress and let the reporter abort mid-fit
+    report = _progress_reporter.get() is not None
+
+    if method == 'map':
+        point = pm.find_MAP(
+            start=initvals, progressbar=False, seed=random_seed, maxeval=MAP_MAX_EVALS,
+            callback=_fit_progress_callback(MAP_MAX_EVALS) if report else None
+        )
+        return _map_inference_data(model, point)
+
+    if method == 'pathfinder':
+        try:
+            import pymc_extras as pmx
+        except ImportError:
+            raise ImportError("Pathfinder inference requires the 'pymc-extras' package")
+        # Paths run in worker processes only when there are CPUs to spare;
+        # the process pool fails on single-CPU hosts
+        return pmx.fit(
+            method='pathfinder',
+            num_paths=INFERENCE_CONFIG['pathfinder_paths'],
+            num_draws=INFERENCE_CONFIG['approx_draws'],
+            concurrent='process' if available_cpus() > 1 else None,
+            initvals=initvals,
+            random_seed=random_seed,
+            progressbar=False
+        )
+
+    approximation = pm.fit(
+        n=INFERENCE_CONFIG['advi_iterations'],
+        method=method,
+        start=initvals,
+        random_seed=random_seed,
+        progressbar=False,
+        callbacks=[_fit_progress_callback(INFERENCE_CONFIG['advi_iterations'])] if report else None
+    )
+    return approximation.sample(INFERENCE_CONFIG['approx_draws'], random_seed=random_seed)
@@ -0,0 +1,205 @@
+"""
+Background job queue for model fits with progress and cancellation
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from . import inference
+from .inference import available_cpus, sampling_resources
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a worker when its job is cancelled
+
+    Derives from BaseException so the ``except Exception`` handlers around
+    model fits do not turn a cancellation into an ordinary error result.
+    """
+
+def _run_job(job_id, progress, cancelled, fn, args, kwargs):
+    """Worker entry point: run fn while publishing progress for job_id"""
+    def report(phase, done, total):
+        if cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        progress[job_id] = {'phase': phase, 'done': done, 'total': total}
+
+    with inference.reporting_progress(report):
+        report('starting', 0, 1)
+        return fn(*args, **kwargs)
+
+class JobManager:
+    """
+    Runs model fits in worker processes and tracks their progress
+
+    The number of concurrent fits is bounded by the CPU budget: each NUTS
+    fit already runs its chains on ``sampling_resources()`` cores, so only
+    ``available_cpus() // cores`` fits run at once and the rest wait in the
+    queue. Workers are started lazily on the first submission and reused.
+    """
+
+    # States a job can no longer leave
+    FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+    def __init__(self, max_workers=None):
+        """
+        Initialize the job manager
+
+        Parameters:
+        -----------
+        max_workers : int, optional
+            Maximum number of concurrent fits, defaults to the CPU budget
+        """
+        if max_workers is None:
+            max_workers = max(1, available_cpus() // sampling_resources()[1])
+        self.max_workers = max_workers
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Spawned workers avoid forking a multi-threaded web server
+        context = multiprocessing.get_context('spawn')
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._cancelled = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def submit(self, fn, *args, name=None, **kwargs):
+        """
+        Queue a fit for execution in a worker process
+
+        Parameters:
+        -----------
+        fn : callable
+            Module-level function to run; it and its arguments must be picklable
+        *args, **kwargs
+            Arguments passed to fn
+        name : str, optional
+            Label shown in job listings
+
+        Returns:
+        --------
+        str
+            Job ID
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            job_id = uuid.uuid4().hex
+            future = self._executor.submit(_run_job, job_id, self._progress, self._cancelled, fn, args, kwargs)
+            self._jobs[job_id] = {
+                'future': future,
+                'name': name or getattr(fn, '__name__', 'job'),
+                'submitted_at': time.time()
+            }
+        return job_id
+
+    def _job(self, job_id):
+        if job_id not in self._jobs:
+            raise KeyError(f"Unknown job '{job_id}'")
+        return self._jobs[job_id]
+
+    def status(self, job_id):
+        """
+        Current state and progress of a job
+
+        Returns:
+        --------
+        dict
+            'id', 'name', 'state' (queued, running, done, failed or cancelled),
+            'progress' (phase, done, total), 'elapsed' seconds and 'error'
+        """
+        job = self._job(job_id)
+        future = job['future']
+
+        error = None
+        if future.cancelled():
+            state = 'cancelled'
+        elif future.done():
+            exception = future.exception()
+            if isinstance(exception, JobCancelled):
+                state = 'cancelled'
+            elif exception is not None:
+                state, error = 'failed', str(exception)
+            else:
+                state = 'done'
+        elif future.running() and job_id in self._progress:
+            state = 'running'
+        else:
+            state = 'queued'
+
+        return {
+            'id': job_id,
+            'name': job['name'],
+            'state': state,
+            'progress': self._progress.get(job_id),
+            'elapsed': time.time() - job['submitted_at'],
+            'error': error
+        }
+
+    def result(self, job_id, timeout=None):
+        """Wait for a job and return its result, re-raising its error"""
+        return self._job(job_id)['future'].result(timeout)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job
+
+        Queued jobs are dropped immediately; running fits stop at their next
+        progress report.
+
+        Returns:
+        --------
+        bool
+            False if the job had already finished
+        """
+        job = self._job(job_id)
+        if job['future'].cancel():
+            return True
+        if job['future'].done():
+            return False
+        self._cancelled[job_id] = True
+        return True
+
+    def jobs(self):
+        """Status of every known job, most recent first"""
+        ids = sorted(self._jobs, key=lambda job_id: self._jobs[job_id]['submitted_at'], reverse=True)
+        return [self.status(job_id) for job_id in ids]
+
+    def forget(self, job_id):
+        """Drop a finished job and its progress record"""
+        job = self._jobs.pop(job_id, None)
+        if job is not None and self._progress is not None:
+            self._progress.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes, cancelling queued jobs"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._manager.shutdown()
+                self._executor = None
+                self._manager = None
+
+def format_job_status(status):
+    """One-line human readable job status for the UI"""
+    progress = status['progress']
+    text = f"Job {status['id'][:8]} {status['state']} ({status['elapsed']:.0f}s)"
+    if status['state'] == 'running' and progress and progress['phase'] in ('tuning', 'sampling'):
+        text += f" - {progress['phase']} {progress['done']}/{progress['total']} draws"
+    elif status['state'] == 'running' and progress and progress['phase'] == 'fitting' and progress['total'] > 1:
+        text += f" - fitting {progress['done']}/{progress['total']} iterations"
+    elif status['state'] == 'running' and progress:
+        text += f" - {progress['phase']}"
+    if status['error']:
+        text += f": {status['error']}"
+    return text
+
+# Shared job manager used by the Gradio interface
+job_manager = JobManager()
@@ -1,5 +1,5 @@
 """
-Media Mix Modeling module using PyMC Marketing
+Media Mix Modeling module using PyMC
 """
 import numpy as np
 import pandas as pd
@@ -7,15 +7,50 @@ import matplotlib.pyplot as plt
 import pymc as pm
 import arviz as az
 import warnings
-import scipy.optimize as optimize
-from pymc_marketing.mmm import MMM
 
-from .config import DEFAULT_PRIORS, SAMPLING_CONFIG
+from .config import DEFAULT_PRIORS, SAMPLING_CONFIG, TRANSFORMATIONS, COMPACTION_CONFIG
+from .mongo_feed import load_mmm_data
+from .posterior import stack_draws, hdi, summarize_samples, compact_trace
+from .seasonality import fourier_features, SEASONAL_PERIODS
+from .scoring import save_artifact, fourier_matrix
+from .budget import optimize_allocation, sweep_budgets
+from .transforms import (
+    ADSTOCK_WEIGHTS, DEFAULT_ADSTOCK_PARAMS, DEFAULT_SATURATION_PARAMS, SATURATION_FUNCTIONS,
+    UNIT_INTERVAL_PARAMS, lagged_spend, transform_media
+)
+from .inference import sample_posterior, inference_settings, posterior_point
+from .trace_cache import cached_trace
 
 warnings.filterwarnings("ignore")
 
+# Version of the model structure built by build_model, part of the trace cache
+# key. Bump it whenever the model changes so cached traces of older models are
+# never served for the new one
+MODEL_VERSION = 3
+
+# Values of one (draws, periods, components) block in get_contributions, about 32 MB
+CONTRIBUTION_CHUNK_VALUES = 2 ** 22
+
+# Prior standard deviation of the adstock and saturation parameters,
+# relative to their defaults
+TRANSFORM_PRIOR_SPREAD = 0.5
+
+def _scaled_normal(name, mu, sigma, dims=None):
+    """Normal(mu, sigma) variable built from a standard normal 'z_<name>'"""
+    z = pm.Normal(f'z_{name}', 0.0, 1.0, dims=dims)
+    return pm.Deterministic(name, mu + sigma * z, dims=dims)
+
+def _transform_parameters():
+    """Model variable names and defaults of the configured adstock and saturation parameters"""
+    adstock = TRANSFORMATIONS['adstock'].get('method', 'geometric')
+    saturation = TRANSFORMATIONS['diminishing_returns']['method']
+    return (
+        {f'adstock_{param}': (param, value) for param, value in DEFAULT_ADSTOCK_PARAMS[adstock].items()},
+        {f'saturation_{param}': (param, value) for param, value in DEFAULT_SATURATION_PARAMS[saturation].items()}
+    )
+
 class MediaMixModel:
-    """Media Mix Modeling using PyMC Marketing"""
+    """Media Mix Modeling using PyMC"""
     
     def __init__(self, priors=None):
         """
@@ -30,8 +65,17 @@ class MediaMixModel:
         self.model = None
         self.trace = None
         self.summary = None
+        self.data = None
+        self.date_col = None
+        self.seasonality = None
+        self.spend_scale = None
+        
+        # Stacked posterior draws, reused until the trace changes
+        self._samples_trace = None
+        self._samples_cache = {}
+        self._roi_cache = None
         
-    def prepare_data(self, data, channels, target):
+    def prepare_data(self, data, channels, target, date_col=None):
         """
         Prepare data for media mix modeling
         
@@ -43,6 +87,8 @@ class MediaMixModel:
             List of column names for marketing channels
         target : str
             Column name for the target variable (e.g., sales)
+        date_col : str, optional
+            Name of the date column used to build Fourier seasonality features
             
         Returns:
         --------
@@ -53,16 +99,37 @@ class MediaMixModel:
         self.data = data.copy()
         self.channels = channels
         self.target = target
+        self.date_col = date_col
+        
+        # Seasonality features are memoized per calendar, so refits over the
+        # same dates reuse the same design matrix
+        self.seasonality = fourier_features(data[date_col]) if date_col else None
         
         # Extract features and target
         X = np.array(data[channels])
         y = np.array(data[target])
         
+        # Saturation parameters are relative to the peak training spend of
+        # each channel, also when transforming new periods
+        self.spend_scale = np.ones(len(channels))
+        if TRANSFORMATIONS['diminishing_returns']['normalize']:
+            self.spend_scale = np.max(np.abs(X.astype(float)), axis=0)
+            self.spend_scale[self.spend_scale == 0] = 1.0
+        
         return X, y
     
-    def build_model(self, X, y):
+    def build_model(self, X, y, posterior=None, start=0):
         """
-        Build the PyMC Marketing media mix model
+        Build the PyMC media mix model
+        
+        Spend is adstocked and saturated as configured in TRANSFORMATIONS,
+        with per-channel carryover and saturation parameters fitted around
+        their defaults, and the target is an intercept plus a linear effect
+        of every channel's transformed media and, when a date column was
+        given, the Fourier seasonality terms:
+        y ~ Normal(alpha + s(adstock(X)) beta + F gamma_fourier, sigma).
+        Prior widths scale with the target, so the same priors suit clients
+        of any size; beta is the effect at the peak training spend.
         
         Parameters:
         -----------
@@ -70,33 +137,74 @@ class MediaMixModel:
             Feature matrix with marketing channel data
         y : numpy.ndarray
             Target variable (sales, conversions, etc.)
+        posterior : dict, optional
+            Posterior mean ('mu') and sd ('sigma') per parameter of an
+            earlier fit; the priors of this model are centred on them
+        start : int, optional
+            First observed period; earlier rows of X only carry adstock
+            into the observed periods. Default is 0
         """
-        # Create the model using PyMC Marketing's MMM class
-        with pm.Model() as self.model:
-            # Create an MMM instance instead of MMMModelBuilder
-            mmm = MMM()
+        priors = dict(DEFAULT_PRIORS['mmm'], **self.priors)
+        posterior = posterior or {}
+        y = y[start:]
+        target_scale = np.mean(np.abs(y)) or 1.0
+        
+        def location_scale(name, mu, sigma):
+            # Centre on the previous posterior when updating sequentially; a
+            # zero posterior spread (MAP) keeps the cold prior width
+            if name not in posterior:
+                return mu, sigma
+            post_sd = np.asarray(posterior[name]['sigma'], dtype=float)
+            return (
+                np.asarray(posterior[name]['mu'], dtype=float),
+                np.where(post_sd > 0, post_sd, sigma)
+            )
+        
+        def transform_parameter(name, param, default):
+            mu, sigma = location_scale(name, default, default * TRANSFORM_PRIOR_SPREAD)
+            if param in UNIT_INTERVAL_PARAMS:
+                return pm.Beta(name, mu=mu, sigma=sigma, dims='channel')
+            return pm.Gamma(name, mu=mu, sigma=sigma, dims='channel')
+        
+        coords = {'channel': list(self.channels)}
+        if self.seasonality is not None:
+            coords['fourier'] = list(self.seasonality.columns)
+        adstock_names, saturation_names = _transform_parameters()
+        lagged = lagged_spend(X, TRANSFORMATIONS['adstock']['max_lag'])[:, start:]
+        
+        with pm.Model(coords=coords) as self.model:
+            # Non-centered: the sampler works on unit-scale z variables and
+            # the parameters on the data scale are deterministic
+            alpha = _scaled_normal('alpha', *location_scale('alpha', priors['alpha'] * target_scale, target_scale))
+            beta = _scaled_normal(
+                'beta', *location_scale('beta', priors['beta'] * target_scale, target_scale), dims='channel'
+            )
+            if 'sigma' in posterior:
+                sigma_mu, sigma_sd = location_scale('sigma', None, priors['sigma'] * 5 * target_scale)
+                z_sigma = pm.Gamma('z_sigma', mu=sigma_mu / target_scale, sigma=sigma_sd / target_scale)
+            else:
+                z_sigma = pm.HalfNormal('z_sigma', sigma=priors['sigma'] * 5)
+            sigma = pm.Deterministic('sigma', z_sigma * target_scale)
             
-            # Add media channels
-            for i, channel in enumerate(self.channels):
-                # Add each channel's data to the model
-                mmm.add_media(
-                    name=channel,
-                    media_data=X[:, i],
-                    adstock=None,  # Use default adstock
-                    saturation=None  # Use default saturation
+            media = transform_media(
+                lagged,
+                self.spend_scale,
+                {param: transform_parameter(name, param, default) for name, (param, default) in adstock_names.items()},
+                {param: transform_parameter(name, param, default) for name, (param, default) in saturation_names.items()}
+            )
+            mu = alpha + pm.math.dot(media, beta)
+            if self.seasonality is not None:
+                gamma_fourier = _scaled_normal(
+                    'gamma_fourier',
+                    *location_scale('gamma_fourier', 0.0, priors['seasonality_prior_scale'] * target_scale),
+                    dims='fourier'
                 )
+                mu = mu + pm.math.dot(self.seasonality.values[start:], gamma_fourier)
             
-            # Add the response variable
-            mmm.add_response(y)
-            
-            # Build the model
-            mmm.build()
-            
-            # Set priors for model parameters
-            # Note: The PyMC Marketing's MMM class handles priors internally,
-            # so we don't need to set them manually here
-
-    def fit(self, data, channels, target):
+            pm.Normal('y', mu=mu, sigma=sigma, observed=y)
+    
+    def fit(self, data, channels, target, date_col=None, method=None, nuts_sampler=None,
+            tune=None, initvals=None):
         """
         Fit the media mix model to data
         
@@ -108,6 +216,18 @@ class MediaMixModel:
             List of column names for marketing channels
         target : str
             Column name for the target variable (e.g., sales)
+        date_col : str, optional
+            Name of the date column used to build Fourier seasonality features
+        method : str, optional
+            Inference method ('nuts', 'map', 'advi', 'fullrank_advi' or
+            'pathfinder'), defaults to INFERENCE_CONFIG['method']
+        nuts_sampler : str, optional
+            NUTS backend ('pymc', 'nutpie', 'numpyro' or 'blackjax'),
+            defaults to SAMPLING_CONFIG['nuts_sampler']
+        tune : int, optional
+            NUTS tuning steps, defaults to SAMPLING_CONFIG['tune']
+        initvals : dict, optional
+            Starting values by variable name
             
         Returns:
         --------
@@ -115,39 +235,213 @@ class MediaMixModel:
             The fitted model object
         """
         # Prepare data
-        X, y = self.prepare_data(data, channels, target)
+        X, y = self.prepare_data(data, channels, target, date_col)
         
         # Build the model
         self.build_model(X, y)
         
-        # Sample from the model
-        with self.model:
-            self.trace = pm.sample(
-                draws=SAMPLING_CONFIG['draws'],
-                tune=SAMPLING_CONFIG['tune'],
-                chains=SAMPLING_CONFIG['chains'],
-                target_accept=SAMPLING_CONFIG['target_accept'],
-                return_inferencedata=SAMPLING_CONFIG['return_inferencedata']
+        return self._sample(X, y, method, nuts_sampler, tune, initvals)
+    
+    def _sample(self, X, y, method, nuts_sampler, tune, initvals=None, posterior=None, start=0):
+        """Sample the built model, reusing the trace of an identical earlier fit"""
+        self.trace = cached_trace(
+            ['mmm', MODEL_VERSION, X, y, self.channels, self.target, self.seasonality, self.priors,
+             self.spend_scale, posterior, start, TRANSFORMATIONS, inference_settings(method, nuts_sampler, tune)],
+            lambda: sample_posterior(
+                self.model, method, nuts_sampler=nuts_sampler, tune=tune, initvals=initvals
             )
+        )
         
         # Generate summary statistics
         self.summary = az.summary(self.trace)
         
         return self
     
-    def predict(self, data=None):
+    def update(self, new_data, informed_priors=False, method=None, nuts_sampler=None, tune=None):
+        """
+        Refit after new periods arrive, warm-started from the current posterior
+        
+        Sampling starts at the current posterior means, which are already
+        close to the new posterior, so a much shorter tuning phase suffices.
+        
+        Parameters:
+        -----------
+        new_data : pandas.DataFrame
+            New periods with the same channel, target and date columns
+        informed_priors : bool, optional
+            Fit only the new periods with priors centred on the current
+            posterior means and as wide as the posterior spread (sequential
+            updating) instead of refitting the full history. The history
+            still supplies adstock carryover, and the data kept for
+            predictions, contributions and ROI is the full history
+        method : str, optional
+            Inference method, defaults to INFERENCE_CONFIG['method']
+        nuts_sampler : str, optional
+            NUTS backend, defaults to SAMPLING_CONFIG['nuts_sampler']
+        tune : int, optional
+            NUTS tuning steps, defaults to SAMPLING_CONFIG['update_tune']
+            
+        Returns:
+        --------
+        self
+            The refitted model object
+        """
+        if self.model is None or self.trace is None:
+            raise ValueError("Model has not been fitted yet")
+        
+        data = pd.concat([self.data, new_data], ignore_index=True)
+        tune = tune or SAMPLING_CONFIG['update_tune']
+        
+        if informed_priors:
+            # Saturation and seasonality parameters keep the meaning they
+            # had in the fit the posterior comes from
+            posterior = self._posterior_moments()
+            spend_scale, seasonality = self.spend_scale, self.seasonality
+            X, y = self.prepare_data(data, self.channels, self.target, self.date_col)
+            self.spend_scale = spend_scale
+            if seasonality is not None:
+                self.seasonality = pd.DataFrame(
+                    fourier_matrix(data[self.date_col], list(seasonality.columns), SEASONAL_PERIODS),
+                    columns=seasonality.columns, index=data.index
+                )
+            
+            # The priors are centred on the current posterior, so the model's
+            # default initial point already is the posterior mean
+            start = len(data) - len(new_data)
+            self.build_model(X, y, posterior=posterior, start=start)
+            return self._sample(X, y, method, nuts_sampler, tune, posterior=posterior, start=start)
+        
+        return self.fit(
+            data, self.channels, self.target, self.date_col,
+            method=method,
+            nuts_sampler=nuts_sampler,
+            tune=tune,
+            initvals=posterior_point(self.trace)
+        )
+    
+    def _posterior_moments(self):
+        """Posterior mean and sd of the parameters that informed priors centre on"""
+        moments = {}
+        adstock_names, saturation_names = _transform_parameters()
+        for name in ('alpha', 'beta', 'sigma', 'gamma_fourier', *adstock_names, *saturation_names):
+            if name in self.trace.posterior:
+                samples = stack_draws(self.trace.posterior[name].values).astype(float)
+                moments[name] = {'mu': samples.mean(axis=0).tolist(), 'sigma': samples.std(axis=0).tolist()}
+        return moments
+    
+    def fit_from_mongo(self, db, client_id, target="conversions", date_col="date",
+                       start_date=None, end_date=None, freq="D"):
+        """
+        Fit the media mix model directly on a client's campaign history
+        
+        Parameters:
+        -----------
+        db : pymongo.database.Database
+            Database holding the campaigns collection
+        client_id : str
+            ID of the client whose campaigns are modeled
+        target : str, optional
+            Campaign metric used as the outcome, default is 'conversions'
+        date_col : str, optional
+            Name of the date column
+        start_date, end_date : datetime-like, optional
+            Restrict campaigns by start date
+        freq : str, optional
+            Pandas frequency of the modeled periods, default is daily
+            
+        Returns:
+        --------
+        self
+            The fitted model object
+        """
+        data = load_mmm_data(
+            db, client_id, target=target, date_col=date_col,
+            start_date=start_date, end_date=end_date, freq=freq
+        )
+        channels = [col for col in data.columns if col not in (date_col, target)]
+        
+        return self.fit(data, channels, target, date_col)
+    
+    def compact(self, target_ess=None, dtype=None):
+        """
+        Replace the trace by a compact float32 copy holding only the posterior
+        
+        Parameters:
+        -----------
+        target_ess : float, optional
+            Thin draws down to this bulk effective sample size. None uses
+            COMPACTION_CONFIG['target_ess'], which keeps every draw unless set
+        dtype : str, optional
+            Floating point type of the posterior, defaults to COMPACTION_CONFIG['dtype']
+            
+        Returns:
+        --------
+        self
+            The model object with the compacted trace
+        """
+        if self.trace is None:
+            raise ValueError("Model has not been fitted yet")
+        
+        self.trace = compact_trace(self.trace, target_ess=target_ess, dtype=dtype)
+        return self
+    
+    def export_artifact(self, path, dtype=None):
+        """
+        Export the posterior for scoring with scoring.MediaMixScorer
+        
+        Parameters:
+        -----------
+        path : str
+            Destination .npz file
+        dtype : str, optional
+            Floating point type of the stored draws, defaults to COMPACTION_CONFIG['dtype']
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
+        
+        arrays = {
+            'alpha': self._posterior_samples('alpha'),
+            'beta': self._posterior_samples('beta'),
+            'mean_spend': self.data[self.channels].mean().values
+        }
+        metadata = {'channels': list(self.channels), 'target': self.target, 'date_col': self.date_col}
+        if self._transform_samples() is not None:
+            adstock_names, saturation_names = _transform_parameters()
+            for name in (*adstock_names, *saturation_names):
+                arrays[name] = self._posterior_samples(name)
+            arrays['spend_scale'] = self.spend_scale
+            arrays['roi'] = self.get_roi_posterior()
+            metadata['transformations'] = {
+                key: TRANSFORMATIONS[key] for key in ('adstock', 'diminishing_returns')
+            }
+        if self.date_col is not None and 'gamma_fourier' in self.trace.posterior:
+            arrays['gamma_fourier'] = self._posterior_samples('gamma_fourier')
+            metadata['fourier_names'] = list(self.seasonality.columns)
+            metadata['seasonal_periods'] = SEASONAL_PERIODS
+        
+        save_artifact(path, 'mmm', arrays, metadata, dtype=dtype or COMPACTION_CONFIG['dtype'])
+    
+    def predict(self, data=None, hdi_prob=None, chunk_size=1000):
         """
         Generate predictions from the fitted model
         
         Parameters:
         -----------
         data : pandas.DataFrame, optional
-            New data to predict on. If None, use the training data.
+            New data to predict on. If None, use the training data. Carryover
+            is computed from the periods of data alone
+        hdi_prob : float, optional
+            If given, also return the highest density interval containing
+            this probability mass for every period
+        chunk_size : int, optional
+            Number of periods evaluated per batch when computing intervals,
+            bounding memory to (chains * draws * chunk_size) values
             
         Returns:
         --------
-        numpy.ndarray
-            Array of predictions
+        numpy.ndarray or pandas.DataFrame
+            Array of mean predictions, or a DataFrame with 'mean',
+            'hdi_lower' and 'hdi_upper' columns when hdi_prob is given
         """
         if self.model is None:
             raise ValueError("Model has not been fitted yet")
@@ -155,76 +449,175 @@ class MediaMixModel:
         # Use training data if no new data is provided
         if data is None:
             data = self.data
-            X = np.array(data[self.channels])
+        X = np.asarray(data[self.channels], dtype=float)
+        lagged = self._lagged_media(X)
+        
+        # Flatten (chain, draw) into a single sample dimension
+        alpha_samples = self._posterior_samples('alpha')
+        
+        # Seasonal component, when the model was fitted with Fourier terms
+        F = None
+        if self.date_col is not None and 'gamma_fourier' in self.trace.posterior:
+            F = self._seasonality_matrix(data)
+            gamma_samples = self._posterior_samples('gamma_fourier')
+        
+        if lagged is None:
+            # Without media transforms the predictor is linear in the
+            # parameters, so the posterior mean prediction only needs the
+            # posterior mean parameters
+            mean = alpha_samples.mean() + X @ self._posterior_samples('beta').mean(axis=0)
+            if F is not None:
+                mean = mean + F @ gamma_samples.mean(axis=0)
+            if hdi_prob is None:
+                return mean
         else:
-            # Extract features from the new data
-            X = np.array(data[self.channels])
+            mean = np.empty(len(X))
         
-        # Extract parameters from trace
-        alpha_samples = self.trace.posterior['alpha'].values.flatten()
-        beta_samples = self.trace.posterior['beta'].values
+        # Saturated media and intervals need every draw for a period, so
+        # batch over periods with (draws x periods) predictions per chunk
+        lower = np.empty(len(X))
+        upper = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            stop = start + chunk_size
+            predictions = alpha_samples[:, np.newaxis] + self._channel_draws(X, lagged, start, stop).sum(axis=2)
+            if F is not None:
+                predictions += gamma_samples @ F[start:stop].T
+            if lagged is not None:
+                mean[start:stop] = predictions.mean(axis=0)
+            if hdi_prob is not None:
+                lower[start:stop], upper[start:stop] = hdi(predictions, hdi_prob, axis=0)
         
-        # Reshape beta to work with matrix multiplication
-        beta_samples = np.mean(beta_samples, axis=0)  # Average over chains
+        if hdi_prob is None:
+            return mean
         
-        # Calculate predictions
-        n_samples = len(alpha_samples)
-        n_datapoints = X.shape[0]
-        predictions = np.zeros((n_samples, n_datapoints))
+        return pd.DataFrame({
+            'mean': mean,
+            'hdi_lower': lower,
+            'hdi_upper': upper
+        }, index=data.index)
+    
+    def _seasonality_matrix(self, data):
+        """
+        Fourier terms of the training columns for the periods of data
         
-        for i in range(n_samples):
-            alpha = alpha_samples[i]
-            beta = beta_samples[i]
-            
-            # Linear component: alpha + X * beta
-            predictions[i] = alpha + np.dot(X, beta)
-            
-        # Return mean prediction across all samples
-        return predictions.mean(axis=0)
+        The harmonics fourier_features keeps depend on the spacing of the
+        dates it is given, so new periods are evaluated by column name to
+        line up with the fitted gamma_fourier.
+        """
+        if data is self.data:
+            return self.seasonality.values
+        return fourier_matrix(data[self.date_col], list(self.seasonality.columns), SEASONAL_PERIODS)
     
-    def get_roi_estimates(self):
+    def _posterior_samples(self, name):
+        """Posterior draws of a variable stacked over (chain, draw), cached per trace"""
+        if self._samples_trace is not self.trace:
+            self._samples_trace = self.trace
+            self._samples_cache = {}
+            self._roi_cache = None
+        if name not in self._samples_cache:
+            self._samples_cache[name] = stack_draws(self.trace.posterior[name].values)
+        return self._samples_cache[name]
+    
+    def _transform_samples(self):
         """
-        Calculate ROI for each marketing channel
+        Posterior draws of the adstock and saturation parameters
         
         Returns:
         --------
-        pandas.DataFrame
-            DataFrame with ROI estimates and confidence intervals
+        tuple or None
+            (adstock_params, saturation_params) with arrays of shape
+            (draws, 1, channels), or None when the posterior has no transform
+            parameters and channels act on spend directly
+        """
+        adstock_names, saturation_names = _transform_parameters()
+        if any(name not in self.trace.posterior for name in (*adstock_names, *saturation_names)):
+            return None
+        return tuple(
+            {param: self._posterior_samples(name)[:, np.newaxis] for name, (param, _) in names.items()}
+            for names in (adstock_names, saturation_names)
+        )
+    
+    def _lagged_media(self, X):
+        """Lagged spend for _channel_draws, None when spend enters untransformed"""
+        if self._transform_samples() is None:
+            return None
+        return lagged_spend(X, TRANSFORMATIONS['adstock']['max_lag'])
+    
+    def _channel_draws(self, X, lagged, start, stop):
+        """Channel contributions beta * media of periods start:stop, shape (draws, periods, channels)"""
+        beta_samples = self._posterior_samples('beta')[:, np.newaxis]
+        if lagged is None:
+            return beta_samples * X[start:stop]
+        return beta_samples * transform_media(lagged[:, start:stop], self.spend_scale, *self._transform_samples())
+    
+    def _contribution_totals(self):
+        """Channel contributions summed over the training periods, shape (draws, channels)"""
+        X = np.asarray(self.data[self.channels], dtype=float)
+        lagged = self._lagged_media(X)
+        n_samples = len(self._posterior_samples('beta'))
+        chunk_size = max(1, CONTRIBUTION_CHUNK_VALUES // (n_samples * len(self.channels)))
+        totals = np.zeros((n_samples, len(self.channels)))
+        for start in range(0, len(X), chunk_size):
+            totals += self._channel_draws(X, lagged, start, start + chunk_size).sum(axis=1)
+        return totals
+    
+    def get_roi_posterior(self):
+        """
+        Posterior ROI draws for every channel
+        
+        Returns:
+        --------
+        numpy.ndarray
+            Array with shape (chains * draws, n_channels) of the modeled
+            contribution over the training periods per $ spent. The array is
+            cached and shared until the trace or data change.
         """
         if self.model is None:
             raise ValueError("Model has not been fitted yet")
-            
-        # Extract beta parameters from trace
-        beta_samples = self.trace.posterior['beta'].values
         
-        # Calculate mean spend for each channel
-        mean_spend = self.data[self.channels].mean().values
+        beta_samples = self._posterior_samples('beta')
+        if self._roi_cache is None or self._roi_cache[0] is not self.data:
+            spend = self.data[self.channels].values
+            if self._transform_samples() is None:
+                # Impact per $ spent: one broadcast division over all channels
+                roi = beta_samples / spend.mean(axis=0)
+            else:
+                # Modeled contribution over the training periods per $ spent
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    roi = self._contribution_totals() / spend.sum(axis=0)
+            self._roi_cache = (self.data, roi)
+        
+        return self._roi_cache[1]
+    
+    def get_roi_estimates(self, quantiles=None):
+        """
+        Calculate ROI for each marketing channel
         
-        # Calculate ROI for each sample
-        n_samples = beta_samples.shape[1]
-        n_channels = len(self.channels)
-        roi_samples = np.zeros((n_samples, n_channels))
+        Parameters:
+        -----------
+        quantiles : list of float, optional
+            Additional posterior quantiles to report, e.g. [0.1, 0.5, 0.9]
         
-        # Calculate ROI as beta / mean_spend for each channel
-        for i in range(n_channels):
-            # Extract beta samples for this channel
-            channel_beta = beta_samples[:, :, i].flatten()
-            
-            # Calculate ROI: Impact per $ spent
-            roi_samples[:, i] = channel_beta / mean_spend[i]
-            
-        # Calculate mean and CI for ROI
-        roi_mean = np.mean(roi_samples, axis=0)
-        roi_lower = np.percentile(roi_samples, 2.5, axis=0)
-        roi_upper = np.percentile(roi_samples, 97.5, axis=0)
+        Returns:
+        --------
+        pandas.DataFrame
+            DataFrame with ROI estimates and confidence intervals
+        """
+        roi_samples = self.get_roi_posterior()
+        
+        # Mean, 95% interval and any extra quantiles from one sorted pass
+        extra = list(quantiles or [])
+        roi_mean, roi_quantiles = summarize_samples(roi_samples, [0.025, 0.975] + extra)
         
         # Create DataFrame with results
         roi_df = pd.DataFrame({
             'Channel': self.channels,
             'ROI': roi_mean,
-            'Lower_CI': roi_lower,
-            'Upper_CI': roi_upper
+            'Lower_CI': roi_quantiles[0],
+            'Upper_CI': roi_quantiles[1]
         })
+        for q, values in zip(extra, roi_quantiles[2:]):
+            roi_df[f'Q{q:g}'] = values
         
         # Sort by ROI in descending order
         roi_df = roi_df.sort_values('ROI', ascending=False)
@@ -248,15 +641,8 @@ class MediaMixModel:
         if self.model is None:
             raise ValueError("Model has not been fitted yet")
             
-        # Extract beta parameters from trace
-        beta_samples = self.trace.posterior['beta'].values
-        
-        # Calculate mean beta for each channel
-        beta_mean = np.mean(beta_samples, axis=(0, 1))
-        
-        # Calculate contribution as beta * mean_spend
-        mean_spend = self.data[self.channels].mean().values
-        contributions = beta_mean * mean_spend
+        # Mean contribution of each channel per training period
+        contributions = self._contribution_totals().mean(axis=0) / len(self.data)
         
         # Calculate contribution percentages
         total_contribution = np.sum(contributions)
@@ -302,10 +688,193 @@ class MediaMixModel:
             
         return fig
     
-    def optimize_budget(self, total_budget, min_budget=None, max_budget=None):
+    def get_contributions(self, data=None, hdi_prob=0.94, chunk_size=None):
+        """
+        Decompose predictions into baseline, seasonality and channel contributions
+        
+        Every component is evaluated for all posterior draws at once, over
+        blocks of periods so that at most CONTRIBUTION_CHUNK_VALUES
+        (draws x periods x components) values are held in memory.
+        
+        Parameters:
+        -----------
+        data : pandas.DataFrame, optional
+            Periods to decompose. If None, use the training data.
+        hdi_prob : float, optional
+            Probability mass of the per-period highest density intervals
+        chunk_size : int, optional
+            Number of periods per block, derived from CONTRIBUTION_CHUNK_VALUES by default
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            One row per period and component with 'period', 'component',
+            'mean', 'hdi_lower' and 'hdi_upper' columns. Periods are dates
+            when the model has a date column and the data index otherwise
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
+        
+        if data is None:
+            data = self.data
+        X = np.asarray(data[self.channels], dtype=float)
+        lagged = self._lagged_media(X)
+        
+        alpha_samples = self._posterior_samples('alpha')
+        components = ['baseline']
+        F = None
+        if self.date_col is not None and 'gamma_fourier' in self.trace.posterior:
+            F = self._seasonality_matrix(data)
+            gamma_samples = self._posterior_samples('gamma_fourier')
+            components.append('seasonality')
+        n_fixed = len(components)
+        components += list(self.channels)
+        
+        n_periods, n_samples = len(X), len(alpha_samples)
+        if chunk_size is None:
+            chunk_size = max(1, CONTRIBUTION_CHUNK_VALUES // (n_samples * len(components)))
+        
+        mean = np.empty((n_periods, len(components)))
+        lower = np.empty_like(mean)
+        upper = np.empty_like(mean)
+        block = np.empty((n_samples, min(chunk_size, n_periods), len(components)))
+        for start in range(0, n_periods, chunk_size):
+            stop = min(start + chunk_size, n_periods)
+            values = block[:, :stop - start]
+            values[..., 0] = alpha_samples[:, np.newaxis]
+            if F is not None:
+                values[..., 1] = gamma_samples @ F[start:stop].T
+            values[..., n_fixed:] = self._channel_draws(X, lagged, start, stop)
+            
+            mean[start:stop] = values.mean(axis=0)
+            lower[start:stop], upper[start:stop] = hdi(values, hdi_prob, axis=0)
+        
+        periods = data[self.date_col].values if self.date_col is not None else data.index.values
+        return pd.DataFrame({
+            'period': np.repeat(periods, len(components)),
+            'component': np.tile(components, n_periods),
+            'mean': mean.ravel(),
+            'hdi_lower': lower.ravel(),
+            'hdi_upper': upper.ravel()
+        })
+    
+    def plot_contributions(self, data=None, save_path=None):
+        """
+        Stacked area plot of the mean contribution of every component per period
+        
+        Parameters:
+        -----------
+        data : pandas.DataFrame, optional
+            Periods to plot. If None, use the training data.
+        save_path : str, optional
+            Path to save the plot to
+            
+        Returns:
+        --------
+        matplotlib.figure.Figure
+            The generated figure
+        """
+        if data is None:
+            data = self.data
+        contributions = self.get_contributions(data)
+        
+        # Periods x components, keeping the baseline at the bottom of the stack
+        components = list(pd.unique(contributions['component']))
+        means = contributions['mean'].values.reshape(-1, len(components))
+        periods = contributions['period'].values[::len(components)]
+        
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.stackplot(
+            periods,
+            means.T,
+            labels=components,
+            colors=plt.cm.viridis(np.linspace(0, 0.9, len(components))),
+            alpha=0.85
+        )
+        if self.target in data:
+            ax.plot(periods, data[self.target].values, color='black', linewidth=1.5, label='Actual')
+        
+        ax.set_title('Contribution Decomposition', fontsize=15)
+        ax.set_xlabel('Period', fontsize=12)
+        ax.set_ylabel(self.target, fontsize=12)
+        ax.legend(loc='upper left', bbox_to_anchor=(1.0, 1.0))
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        
+        plt.tight_layout()
+        
+        # Save if path is provided
+        if save_path:
+            plt.savefig(save_path)
+            
+        return fig
+    
+    def _reference_spend(self, total_budget, periods=1):
+        """Typical spend per channel over the budget horizon, where saturation sets in"""
+        if self.data is not None:
+            scale = self.data[self.channels].mean().values * periods
+            if np.all(scale > 0):
+                return scale
+        # Without spend history every channel saturates around an equal split
+        return np.full(len(self.channels), total_budget / len(self.channels))
+    
+    def _budget_bounds(self, min_budget=None, max_budget=None):
+        """Per-channel spend bounds, unconstrained where no limit is given"""
+        min_budget = min_budget or {}
+        max_budget = max_budget or {}
+        lower = np.array([min_budget.get(channel, 0) for channel in self.channels], dtype=float)
+        upper = np.array([max_budget.get(channel, np.inf) for channel in self.channels], dtype=float)
+        return lower, upper
+    
+    def _budget_curve(self, total_budget, periods=1, use_posterior=False, saturation_params=None):
+        """
+        Coefficients, spend scale and saturation parameters of every channel's response curve
+        
+        With fitted transforms the curve is the model's steady-state response
+        to spend sustained evenly over the periods, periods * beta *
+        s(gain * x / (periods * spend_scale)), where gain is the sum of the
+        adstock weights (1 when normalized), evaluated per posterior draw or
+        at the posterior means. Posteriors without transform parameters have
+        no fitted curve, so an assumed saturation curve with
+        DEFAULT_SATURATION_PARAMS is anchored at the historical spend K,
+        beta * K * s(x / K) / s(1).
+        """
+        beta_samples = self._posterior_samples('beta')
+        saturation = TRANSFORMATIONS['diminishing_returns']['method']
+        transforms = self._transform_samples()
+        
+        if transforms is None:
+            params = saturation_params or DEFAULT_SATURATION_PARAMS[saturation]
+            scale = self._reference_spend(total_budget, periods)
+            coefficients = beta_samples * scale / SATURATION_FUNCTIONS[saturation][0](1.0, **params)
+            return (coefficients if use_posterior else coefficients.mean(axis=0)), scale, params
+        
+        adstock_params, fitted_params = transforms
+        gain = 1.0
+        if not TRANSFORMATIONS['adstock']['normalize']:
+            method = TRANSFORMATIONS['adstock'].get('method', 'geometric')
+            weights = ADSTOCK_WEIGHTS[method](max_lag=TRANSFORMATIONS['adstock']['max_lag'], **adstock_params)
+            gain = weights.sum(axis=1)
+        coefficients = beta_samples * periods
+        scale = self.spend_scale * periods / gain
+        params = saturation_params or {param: values[:, 0] for param, values in fitted_params.items()}
+        
+        if not use_posterior:
+            # Plug-in curve at the posterior means
+            coefficients = coefficients.mean(axis=0)
+            scale = scale if np.ndim(scale) == 1 else scale.mean(axis=0)
+            params = {param: np.mean(values, axis=0) if np.ndim(values) == 2 else values
+                      for param, values in params.items()}
+        return coefficients, scale, params
+    
+    def optimize_budget(self, total_budget, min_budget=None, max_budget=None,
+                        periods=1, use_posterior=False, saturation_params=None):
         """
         Optimize marketing budget allocation
         
+        Maximizes expected response through each channel's fitted saturation
+        curve, the steady-state response of the model to the spend (see
+        _budget_curve for posteriors without fitted transforms).
+        
         Parameters:
         -----------
         total_budget : float
@@ -314,6 +883,13 @@ class MediaMixModel:
             Minimum budget for each channel
         max_budget : dict, optional
             Maximum budget for each channel
+        periods : int, optional
+            Number of modeled periods the budget covers, default is 1
+        use_posterior : bool, optional
+            Average the response over all posterior draws of the coefficients
+            and saturation parameters instead of using the posterior means
+        saturation_params : dict, optional
+            Saturation curve parameters replacing the fitted ones
             
         Returns:
         --------
@@ -323,50 +899,116 @@ class MediaMixModel:
         if self.model is None:
             raise ValueError("Model has not been fitted yet")
             
-        # Extract mean beta for each channel
-        beta_samples = self.trace.posterior['beta'].values
-        beta_mean = np.mean(beta_samples, axis=(0, 1))
+        lower, upper = self._budget_bounds(min_budget, max_budget)
+        coefficients, scale, params = self._budget_curve(total_budget, periods, use_posterior, saturation_params)
+        solution = optimize_allocation(
+            total_budget,
+            coefficients,
+            scale,
+            lower=lower,
+            upper=upper,
+            saturation_params=params
+        )
+        
+        # Create dictionary with optimal allocation
+        optimal = dict(zip(self.channels, solution['allocation']))
         
-        # Set up budget constraints
-        n_channels = len(self.channels)
+        return optimal
+    
+    def budget_scenarios(self, total_budgets, min_budget=None, max_budget=None, periods=1,
+                         use_posterior=False, saturation_params=None, n_jobs=1):
+        """
+        Optimal allocation and expected response for a grid of total budgets
+        
+        Parameters:
+        -----------
+        total_budgets : array-like
+            Total budgets to evaluate
+        min_budget : dict, optional
+            Minimum budget for each channel
+        max_budget : dict, optional
+            Maximum budget for each channel
+        periods : int, optional
+            Number of modeled periods the budgets cover, default is 1
+        use_posterior : bool, optional
+            Average the response over all posterior draws
+        saturation_params : dict, optional
+            Saturation curve parameters replacing the fitted ones
+        n_jobs : int, optional
+            Number of worker processes used to solve the grid
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            Efficient frontier with the expected response, incremental return,
+            allocation and marginal ROI of every channel per budget
+        """
+        if self.model is None:
+            raise ValueError("Model has not been fitted yet")
         
-        # Default min and max budgets if not provided
-        if min_budget is None:
-            min_budget = {channel: 0 for channel in self.channels}
+        lower, upper = self._budget_bounds(min_budget, max_budget)
+        coefficients, scale, params = self._budget_curve(
+            np.max(total_budgets), periods, use_posterior, saturation_params
+        )
+        return sweep_budgets(
+            total_budgets,
+            coefficients,
+            scale,
+            lower=lower,
+            upper=upper,
+            saturation_params=params,
+            channels=self.channels,
+            n_jobs=n_jobs
+        )
+    
+    def plot_budget_scenarios(self, total_budgets, save_path=None, **kwargs):
+        """
+        Plot the response curve and optimal channel mix over a grid of budgets
         
-        if max_budget is None:
-            max_budget = {channel: total_budget for channel in self.channels}
+        Parameters:
+        -----------
+        total_budgets : array-like
+            Total budgets to evaluate
+        save_path : str, optional
+            Path to save the plot to
+        **kwargs
+            Passed on to budget_scenarios
             
-        # Initial guess: equal allocation
-        x0 = np.ones(n_channels) * total_budget / n_channels
-        
-        # Budget constraint functions
-        def constraint_sum(x):
-            return np.sum(x) - total_budget
-        
-        constraints = [{'type': 'eq', 'fun': constraint_sum}]
-        
-        # Bounds for each channel
-        bounds = [(min_budget[self.channels[i]], max_budget[self.channels[i]]) 
-                  for i in range(n_channels)]
-        
-        # Objective function to maximize (negative for minimization)
-        def objective(x):
-            return -np.sum(beta_mean * x)
-        
-        # Run optimization
-        result = optimize.minimize(
-            objective,
-            x0,
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints
+        Returns:
+        --------
+        matplotlib.figure.Figure
+            The generated figure
+        """
+        frontier = self.budget_scenarios(total_budgets, **kwargs)
+        
+        fig, (ax_response, ax_mix) = plt.subplots(1, 2, figsize=(14, 6))
+        
+        # Expected response against total budget
+        ax_response.plot(frontier['Total_Budget'], frontier['Response'], marker='o', color='darkblue')
+        ax_response.set_title('Expected Response by Total Budget', fontsize=15)
+        ax_response.set_xlabel('Total Budget ($)', fontsize=12)
+        ax_response.set_ylabel('Expected Response', fontsize=12)
+        ax_response.grid(linestyle='--', alpha=0.7)
+        
+        # Optimal allocation per channel
+        ax_mix.stackplot(
+            frontier['Total_Budget'],
+            *[frontier[channel] for channel in self.channels],
+            labels=self.channels,
+            colors=plt.cm.viridis(np.linspace(0, 0.8, len(self.channels)))
         )
+        ax_mix.set_title('Optimal Allocation by Total Budget', fontsize=15)
+        ax_mix.set_xlabel('Total Budget ($)', fontsize=12)
+        ax_mix.set_ylabel('Budget ($)', fontsize=12)
+        ax_mix.legend(loc='upper left')
         
-        # Create dictionary with optimal allocation
-        optimal = {self.channels[i]: result.x[i] for i in range(n_channels)}
+        plt.tight_layout()
         
-        return optimal
+        # Save if path is provided
+        if save_path:
+            plt.savefig(save_path)
+            
+        return fig
     
     def plot_budget_optimization(self, total_budget, save_path=None):
         """
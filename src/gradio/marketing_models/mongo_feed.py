@@ -0,0 +1,175 @@
+"""
+MongoDB data feed for media mix modeling
+"""
+import os
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from pymongo import MongoClient
+
+# MongoDB connection settings (shared with the FastAPI backend)
+MONGODB_URI = os.environ.get("MONGODB_URI", "mongodb://localhost:27017/dmc-propaganda")
+
+def get_database(uri=None):
+    """
+    Connect to the campaign database
+
+    Parameters:
+    -----------
+    uri : str, optional
+        MongoDB connection string. Defaults to the MONGODB_URI environment variable
+
+    Returns:
+    --------
+    pymongo.database.Database
+        The default database of the connection string
+    """
+    return MongoClient(uri or MONGODB_URI).get_default_database()
+
+def _campaign_match(client_id, start_date=None, end_date=None):
+    """Build the $match stage selecting a client's active campaigns"""
+    match = {"client.$id": ObjectId(client_id), "isActive": True}
+    if start_date is not None or end_date is not None:
+        match["startDate"] = {}
+        if start_date is not None:
+            match["startDate"]["$gte"] = pd.Timestamp(start_date).to_pydatetime()
+        if end_date is not None:
+            match["startDate"]["$lte"] = pd.Timestamp(end_date).to_pydatetime()
+    return match
+
+def build_channel_spend_pipeline(client_id, start_date=None, end_date=None):
+    """
+    Aggregation pipeline returning total spend per (day, channel)
+
+    A campaign's budget is split evenly across its channels and attributed
+    to the day the campaign starts. Campaigns without channels are reported
+    under an 'unassigned' channel.
+    """
+    return [
+        {"$match": _campaign_match(client_id, start_date, end_date)},
+        {"$project": {
+            "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$startDate"}},
+            "budget": 1,
+            "channels": {"$cond": [
+                {"$gt": [{"$size": {"$ifNull": ["$channels", []]}}, 0]},
+                "$channels",
+                ["unassigned"]
+            ]}
+        }},
+        {"$project": {
+            "date": 1,
+            "channels": 1,
+            "share": {"$divide": ["$budget", {"$size": "$channels"}]}
+        }},
+        {"$unwind": "$channels"},
+        {"$group": {
+            "_id": {"date": "$date", "channel": "$channels"},
+            "spend": {"$sum": "$share"}
+        }}
+    ]
+
+def build_outcome_pipeline(client_id, outcome_field="conversions", start_date=None, end_date=None):
+    """Aggregation pipeline returning the summed campaign outcome per day"""
+    return [
+        {"$match": _campaign_match(client_id, start_date, end_date)},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$startDate"}},
+            "outcome": {"$sum": {"$ifNull": [f"$metrics.{outcome_field}", 0]}}
+        }}
+    ]
+
+def pivot_dense(row_codes, col_codes, values, n_rows, n_cols):
+    """
+    Scatter-add (row, column, value) triplets into a dense matrix
+
+    Parameters:
+    -----------
+    row_codes : numpy.ndarray
+        Integer row index of each value
+    col_codes : numpy.ndarray
+        Integer column index of each value
+    values : numpy.ndarray
+        Values to accumulate; duplicates of the same cell are summed
+    n_rows : int
+        Number of rows in the output
+    n_cols : int
+        Number of columns in the output
+
+    Returns:
+    --------
+    numpy.ndarray
+        Dense (n_rows, n_cols) float matrix
+    """
+    flat = np.asarray(row_codes, dtype=np.int64) * n_cols + np.asarray(col_codes, dtype=np.int64)
+    return np.bincount(
+        flat,
+        weights=np.asarray(values, dtype=float),
+        minlength=n_rows * n_cols
+    ).reshape(n_rows, n_cols)
+
+def load_mmm_data(db, client_id, target="conversions", date_col="date",
+                  start_date=None, end_date=None, freq="D"):
+    """
+    Load a client's date x channel spend matrix and outcome series
+
+    Parameters:
+    -----------
+    db : pymongo.database.Database
+        Database holding the campaigns collection
+    client_id : str
+        ID of the client whose campaigns are modeled
+    target : str, optional
+        Campaign metric used as the outcome, default is 'conversions'
+    date_col : str, optional
+        Name of the date column in the result
+    start_date, end_date : datetime-like, optional
+        Restrict campaigns by start date
+    freq : str, optional
+        Pandas frequency of the output calendar, default is daily
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per period with a date column, one spend column per channel
+        and the target column, ready for MediaMixModel.fit
+    """
+    spend_rows = list(db.campaigns.aggregate(
+        build_channel_spend_pipeline(client_id, start_date, end_date)
+    ))
+    outcome_rows = list(db.campaigns.aggregate(
+        build_outcome_pipeline(client_id, target, start_date, end_date)
+    ))
+
+    if not spend_rows:
+        raise ValueError(f"No campaign data found for client {client_id}")
+
+    spend_dates = pd.to_datetime([row["_id"]["date"] for row in spend_rows])
+    spend_channels = np.array([row["_id"]["channel"] for row in spend_rows])
+    spend_values = np.array([row["spend"] for row in spend_rows], dtype=float)
+    outcome_dates = pd.to_datetime([row["_id"] for row in outcome_rows])
+    outcome_values = np.array([row["outcome"] for row in outcome_rows], dtype=float)
+
+    # Dense daily calendar so periods without campaigns get zero spend
+    calendar = pd.date_range(
+        min(spend_dates.min(), outcome_dates.min() if len(outcome_dates) else spend_dates.min()),
+        max(spend_dates.max(), outcome_dates.max() if len(outcome_dates) else spend_dates.max()),
+        freq="D"
+    )
+    channels, channel_codes = np.unique(spend_channels, return_inverse=True)
+
+    spend = pivot_dense(
+        calendar.get_indexer(spend_dates), channel_codes, spend_values,
+        len(calendar), len(channels)
+    )
+    outcome = pivot_dense(
+        calendar.get_indexer(outcome_dates), np.zeros(len(outcome_dates), dtype=np.int64),
+        outcome_values, len(calendar), 1
+    )
+
+    matrix = np.hstack([spend, outcome])
+    data = pd.DataFrame(matrix, index=calendar, columns=list(channels) + [target])
+    if freq != "D":
+        data = data.resample(freq).sum()
+
+    data.index.name = date_col
+    return data.reset_index()
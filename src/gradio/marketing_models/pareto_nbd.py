@@ -0,0 +1,153 @@
+"""
+Pareto/NBD customer-level expressions in log space, with NumPy only
+
+Follows Fader, Hardie and Lee (2005), "A Note on Deriving the Pareto/NBD
+Model and Related Expressions". Parameters are the purchase rate gamma
+(r, alpha) and the dropout rate gamma (s, beta); customer inputs are the
+repeat purchases x, the time of the last purchase t_x and the length of
+the observation period T. Every function broadcasts over its arguments, so
+draws of shape (draws, 1) against customers of shape (customers,) give
+(draws, customers) results.
+
+Terms such as (alpha + T)^(r + x) overflow float64 for customers with
+hundreds of purchases, so all products are carried as sums of logs.
+"""
+import numpy as np
+
+# Relative accuracy of the hypergeometric series
+HYP2F1_TOLERANCE = 1e-12
+HYP2F1_MAX_TERMS = 100_000
+HYP2F1_TERMS_PER_CHECK = 8
+
+def log_hyp2f1(a, b, z, tol=HYP2F1_TOLERANCE, max_terms=HYP2F1_MAX_TERMS):
+    """
+    log 2F1(a, b; a + 1; z) for 0 <= z < 1 and 0 < b < a + 1
+
+    Euler's transformation 2F1(a, b; c; z) = (1 - z)^(c - a - b) 2F1(c - a, c - b; c; z)
+    turns the series into one of positive terms whose ratio
+    (a + 1 - b + k) / (a + 1 + k) * z stays below z, so the remaining
+    tail is bounded by term * z / (1 - z). Summation stops per element
+    once that bound falls below tol; the bound is checked every
+    HYP2F1_TERMS_PER_CHECK terms and only unconverged elements are carried
+    on.
+
+    Parameters:
+    -----------
+    a, b, z : array-like
+        Series parameters and argument, broadcast against each other
+
+    Returns:
+    --------
+    numpy.ndarray
+        Logarithm of the hypergeometric function
+    """
+    a, b, z = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, z)))
+    shape = a.shape
+    numerator = (a + 1 - b).ravel()
+    denominator = (a + 1).ravel()
+    z_flat = z.ravel()
+
+    total = np.ones(z_flat.size)
+    term = np.ones(z_flat.size)
+    active = np.flatnonzero(z_flat > 0)
+    k = 0
+    while active.size and k < max_terms:
+        # Work on contiguous copies of the unconverged elements for a few
+        # terms at a time; gathering them costs more than the terms do
+        p, q, z_active = numerator[active], denominator[active], z_flat[active]
+        term_active, total_active = term[active], total[active]
+        for _ in range(HYP2F1_TERMS_PER_CHECK):
+            ratio = p + k
+            ratio /= q + k
+            ratio *= z_active
+            term_active *= ratio
+            total_active += term_active
+            k += 1
+        term[active] = term_active
+        total[active] = total_active
+        converged = term_active * z_active <= tol * total_active * (1 - z_active)
+        active = active[~converged]
+
+    return (1 - b) * np.log1p(-z) + np.log(total).reshape(shape)
+
+def _log_a0(r, alpha, s, beta, x, t_x, T):
+    """log of the A0 term, which integrates the dropout time between t_x and T"""
+    rsx = r + s + x
+    alpha_larger = alpha >= beta
+    larger = np.where(alpha_larger, alpha, beta)
+    smaller = np.where(alpha_larger, beta, alpha)
+    b = np.where(alpha_larger, s + 1, r + x)
+
+    log_at_tx = log_hyp2f1(rsx, b, (larger - smaller) / (larger + t_x)) - rsx * np.log(larger + t_x)
+    log_at_T = log_hyp2f1(rsx, b, (larger - smaller) / (larger + T)) - rsx * np.log(larger + T)
+
+    # A0 is the difference of the two terms, which is zero when t_x == T
+    with np.errstate(divide='ignore'):
+        return log_at_tx + np.log(-np.expm1(np.minimum(log_at_T - log_at_tx, 0.0)))
+
+def log_probability_alive(r, alpha, s, beta, x, t_x, T):
+    """
+    log P(alive | x, t_x, T)
+
+    P(alive) = 1 / (1 + s / (r + s + x) * (alpha + T)^(r + x) * (beta + T)^s * A0)
+
+    Returns:
+    --------
+    numpy.ndarray
+        Log probability that the customer has not dropped out by T
+    """
+    r, alpha, s, beta, x, t_x, T = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (r, alpha, s, beta, x, t_x, T))
+    )
+    log_odds = (
+        np.log(s) - np.log(r + s + x)
+        + (r + x) * np.log(alpha + T) + s * np.log(beta + T)
+        + _log_a0(r, alpha, s, beta, x, t_x, T)
+    )
+    return -np.logaddexp(0.0, log_odds)
+
+def probability_alive(r, alpha, s, beta, x, t_x, T):
+    """P(alive | x, t_x, T), see log_probability_alive"""
+    return np.exp(log_probability_alive(r, alpha, s, beta, x, t_x, T))
+
+def log_expected_purchases(t, r, alpha, s, beta, x, t_x, T, log_p_alive=None):
+    """
+    log E[Y(t) | x, t_x, T], the expected purchases in the next t periods
+
+    E[Y(t)] = (r + x) (beta + T) / ((alpha + T) (s - 1))
+              * (1 - ((beta + T) / (beta + T + t))^(s - 1)) * P(alive)
+
+    The bracket is evaluated as -expm1(-(s - 1) log1p(t / (beta + T))),
+    whose limit log1p(t / (beta + T)) is used at s = 1.
+
+    Parameters:
+    -----------
+    t : float
+        Length of the prediction period
+    log_p_alive : array-like, optional
+        Precomputed log_probability_alive for the same inputs
+
+    Returns:
+    --------
+    numpy.ndarray
+        Log expected number of purchases
+    """
+    if log_p_alive is None:
+        log_p_alive = log_probability_alive(r, alpha, s, beta, x, t_x, T)
+
+    r, alpha, s, beta, x, T = (np.asarray(v, dtype=float) for v in (r, alpha, s, beta, x, T))
+    growth = np.log1p(t / (beta + T))
+    shape = s - 1
+    near_one = np.abs(shape) < 1e-8
+    safe_shape = np.where(near_one, 1.0, shape)
+    dropout_term = np.where(near_one, growth, -np.expm1(-safe_shape * growth) / safe_shape)
+
+    with np.errstate(divide='ignore'):
+        return (
+            np.log(r + x) + np.log(beta + T) - np.log(alpha + T)
+            + np.log(dropout_term) + log_p_alive
+        )
+
+def expected_purchases(t, r, alpha, s, beta, x, t_x, T):
+    """E[Y(t) | x, t_x, T], see log_expected_purchases"""
+    return np.exp(log_expected_purchases(t, r, alpha, s, beta, x, t_x, T))
@@ -0,0 +1,243 @@
+"""
+NumPy helpers for working with posterior draws
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .config import COMPACTION_CONFIG
+
+def stack_draws(values):
+    """
+    Merge the leading (chain, draw) dimensions into a single sample dimension
+
+    Parameters:
+    -----------
+    values : array-like
+        Posterior array with shape (chain, draw, ...)
+
+    Returns:
+    --------
+    numpy.ndarray
+        Array with shape (chain * draw, ...)
+    """
+    values = np.asarray(values)
+    return values.reshape((-1,) + values.shape[2:])
+
+def hdi(samples, prob=0.94, axis=0):
+    """
+    Highest density interval of samples, vectorized over all other axes
+
+    Parameters:
+    -----------
+    samples : array-like
+        Posterior samples
+    prob : float, optional
+        Probability mass contained in the interval, default is 0.94
+    axis : int, optional
+        Axis holding the samples, default is 0
+
+    Returns:
+    --------
+    tuple
+        (lower, upper) arrays with the sample axis removed
+    """
+    if not 0 < prob < 1:
+        raise ValueError("prob must be between 0 and 1")
+
+    ordered = np.sort(np.moveaxis(np.asarray(samples), axis, 0), axis=0)
+    n = ordered.shape[0]
+    interval_size = int(np.floor(prob * n))
+    n_intervals = n - interval_size
+    if interval_size == 0 or n_intervals == 0:
+        return ordered[0], ordered[-1]
+
+    # Narrowest window containing interval_size + 1 consecutive sorted samples
+    widths = ordered[interval_size:] - ordered[:n_intervals]
+    start = np.argmin(widths, axis=0)[np.newaxis]
+    lower = np.take_along_axis(ordered[:n_intervals], start, axis=0)[0]
+    upper = np.take_along_axis(ordered[interval_size:], start, axis=0)[0]
+    return lower, upper
+
+def sorted_quantiles(ordered, quantiles):
+    """
+    Quantiles of already sorted samples along axis 0
+
+    Uses the same linear interpolation as numpy.quantile, so many quantiles
+    can be read off a single sort.
+
+    Parameters:
+    -----------
+    ordered : numpy.ndarray
+        Samples sorted along axis 0
+    quantiles : sequence of float
+        Quantiles to compute, each between 0 and 1
+
+    Returns:
+    --------
+    numpy.ndarray
+        Array with shape (len(quantiles), ...)
+    """
+    quantiles = np.asarray(quantiles, dtype=float)
+    position = quantiles * (ordered.shape[0] - 1)
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, ordered.shape[0] - 1)
+    weight = (position - below).reshape((-1,) + (1,) * (ordered.ndim - 1))
+    return ordered[below] * (1 - weight) + ordered[above] * weight
+
+def summarize_samples(samples, quantiles=(0.025, 0.975)):
+    """
+    Mean and quantiles of samples along axis 0 from one sorted pass
+
+    Parameters:
+    -----------
+    samples : array-like
+        Posterior samples with the sample dimension first
+    quantiles : sequence of float, optional
+        Quantiles to compute, default is the central 95% interval
+
+    Returns:
+    --------
+    tuple
+        (mean, quantiles) where quantiles has shape (len(quantiles), ...)
+    """
+    ordered = np.sort(np.asarray(samples), axis=0)
+    return ordered.mean(axis=0), sorted_quantiles(ordered, quantiles)
+
+def summarize_chunks(evaluate, n_items, n_draws, quantiles=None, chunk_size=None,
+                     max_values=2 ** 22, n_jobs=1):
+    """
+    Posterior mean and quantiles of a per-item quantity, evaluated in chunks
+
+    Only one (draws x chunk) block per worker is alive at a time, so memory
+    stays bounded however many items there are. NumPy releases the GIL in
+    its ufuncs, so chunks are evaluated on a thread pool.
+
+    Parameters:
+    -----------
+    evaluate : callable
+        evaluate(start, stop) returns the draws of items start to stop as
+        an array with shape (draws, stop - start)
+    n_items : int
+        Number of items, e.g. customers
+    n_draws : int
+        Number of posterior draws per item
+    quantiles : sequence of float, optional
+        Quantiles to compute besides the mean
+    chunk_size : int, optional
+        Items per chunk, defaults to max_values // n_draws
+    max_values : int, optional
+        Size bound of one block when chunk_size is not given
+    n_jobs : int, optional
+        Number of threads, default is 1
+
+    Returns:
+    --------
+    tuple
+        (mean, quantiles) where quantiles has shape (len(quantiles), n_items)
+        or is None
+    """
+    chunk_size = chunk_size or max(1, max_values // max(n_draws, 1))
+    mean = np.empty(n_items)
+    values = np.empty((len(quantiles), n_items)) if quantiles is not None else None
+
+    def run(start):
+        stop = min(start + chunk_size, n_items)
+        block = evaluate(start, stop)
+        mean[start:stop] = block.mean(axis=0)
+        if values is not None:
+            block.sort(axis=0)
+            values[:, start:stop] = sorted_quantiles(block, quantiles)
+
+    starts = range(0, n_items, chunk_size)
+    if n_jobs > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=min(n_jobs, len(starts))) as executor:
+            list(executor.map(run, starts))
+    else:
+        for start in starts:
+            run(start)
+    return mean, values
+
+def trace_nbytes(trace):
+    """Memory held by the arrays of every group of an InferenceData"""
+    return sum(getattr(trace, group).nbytes for group in trace.groups())
+
+def thinning_step(posterior, target_ess):
+    """
+    Largest thinning step that keeps the bulk ESS of every variable near target_ess
+
+    Thinning by k keeps the ESS while k is below the autocorrelation time
+    and leaves n / k nearly independent draws beyond it, so a step of
+    min(ESS) / target_ess keeps at least target_ess effective draws.
+
+    Parameters:
+    -----------
+    posterior : xarray.Dataset
+        Posterior group with (chain, draw) dimensions
+    target_ess : float
+        Effective sample size to retain
+
+    Returns:
+    --------
+    int
+        Thinning step, 1 when the posterior is too short or its ESS is undefined
+    """
+    # Imported here so the scoring workers can use this module without arviz
+    import arviz as az
+
+    if posterior.sizes.get('draw', 0) < 4:
+        return 1
+    ess = az.ess(posterior, method='bulk')
+    values = np.concatenate([np.ravel(ess[name].values) for name in ess.data_vars])
+    min_ess = np.nanmin(values) if np.isfinite(values).any() else np.nan
+    if not np.isfinite(min_ess):
+        return 1
+    return max(1, int(min_ess // target_ess))
+
+def compact_trace(trace, target_ess=None, groups=None, dtype=None):
+    """
+    Smaller in-memory copy of a fitted trace for prediction
+
+    Keeps only the listed groups, optionally thins draws down to a target
+    effective sample size and downcasts floating point variables.
+
+    Parameters:
+    -----------
+    trace : arviz.InferenceData
+        Fitted trace
+    target_ess : float, optional
+        Bulk ESS to retain when thinning. None uses COMPACTION_CONFIG['target_ess'],
+        and every draw is kept when that is None as well (the default) or 0
+    groups : list, optional
+        Groups to keep, defaults to COMPACTION_CONFIG['groups']
+    dtype : str or numpy.dtype, optional
+        Floating point type of the kept variables, defaults to COMPACTION_CONFIG['dtype']
+
+    Returns:
+    --------
+    arviz.InferenceData
+        Compacted trace; the thinning step is recorded in the posterior attrs
+    """
+    import arviz as az
+
+    groups = groups or COMPACTION_CONFIG['groups']
+    dtype = np.dtype(dtype or COMPACTION_CONFIG['dtype'])
+    if target_ess is None:
+        target_ess = COMPACTION_CONFIG['target_ess']
+
+    kept = {group: getattr(trace, group) for group in trace.groups() if group in groups}
+    step = thinning_step(trace.posterior, target_ess) if target_ess else 1
+
+    for group, dataset in kept.items():
+        if step > 1 and 'draw' in dataset.dims:
+            dataset = dataset.isel(draw=slice(None, None, step))
+        kept[group] = dataset.assign({
+            name: values.astype(dtype)
+            for name, values in dataset.data_vars.items()
+            if np.issubdtype(values.dtype, np.floating)
+        })
+
+    compacted = az.InferenceData(**kept)
+    if 'posterior' in kept:
+        compacted.posterior.attrs['thinning_step'] = step
+    return compacted
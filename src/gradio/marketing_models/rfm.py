@@ -0,0 +1,216 @@
+"""
+RFM summary builder turning raw transaction logs into CLV model inputs
+"""
+import numpy as np
+import pandas as pd
+
+# Supported period lengths, mapped to numpy datetime64 units
+PERIOD_UNITS = {
+    'D': 'D',  # days
+    'W': 'W',  # weeks
+    'M': 'M'   # months
+}
+
+# Compact the partial customer-period table once it grows past this many rows
+COMPACT_THRESHOLD = 5_000_000
+
+def _to_periods(dates, freq):
+    """Convert datetimes to integer period numbers"""
+    if freq not in PERIOD_UNITS:
+        raise ValueError(f"Unsupported frequency '{freq}'. Must be one of {list(PERIOD_UNITS)}")
+    values = pd.to_datetime(dates).values.astype(f'datetime64[{PERIOD_UNITS[freq]}]')
+    return values.astype(np.int64)
+
+def _reduce_chunk(transactions, customer_col, date_col, value_col, freq, end_period=None):
+    """
+    Collapse transactions to one row per (customer, period) with summed value,
+    dropping transactions after end_period
+    """
+    partial = pd.DataFrame({
+        'customer': transactions[customer_col].values,
+        'period': _to_periods(transactions[date_col], freq),
+        'value': transactions[value_col].values if value_col else 0.0
+    })
+    if end_period is not None:
+        partial = partial[partial['period'] <= end_period]
+    return partial.groupby(['customer', 'period'], as_index=False, sort=False)['value'].sum()
+
+def _merge_partials(partials):
+    """Combine customer-period partial aggregates from several chunks"""
+    combined = pd.concat(partials, ignore_index=True)
+    return combined.groupby(['customer', 'period'], as_index=False, sort=False)['value'].sum()
+
+def _customer_state(partials):
+    """Per-customer first and last period, purchase periods and value totals"""
+    partials = partials.sort_values(['customer', 'period'], kind='mergesort')
+    return partials.groupby('customer', sort=True).agg(
+        first=('period', 'min'),
+        last=('period', 'max'),
+        periods=('period', 'size'),
+        total_value=('value', 'sum'),
+        first_value=('value', 'first')
+    )
+
+def _merge_states(state, update):
+    """
+    Fold the customer state of a later chunk into the running state
+
+    Only valid for logs ordered by date: a customer's periods in the later
+    chunk may start in the last period seen so far, which then counts once.
+    """
+    old, new = state.align(update, join='outer')
+    seen, arrived = old['first'].notna(), new['first'].notna()
+    if (seen & arrived & (new['first'] < old['last'])).any():
+        raise ValueError("Transactions are not ordered by date; use ordered=False")
+    shared_period = seen & arrived & (new['first'] == old['last'])
+    same_first = seen & arrived & (new['first'] == old['first'])
+
+    merged = pd.DataFrame({
+        'first': old['first'].fillna(new['first']),
+        'last': new['last'].fillna(old['last']),
+        'periods': old['periods'].fillna(0) + new['periods'].fillna(0) - shared_period,
+        'total_value': old['total_value'].fillna(0) + new['total_value'].fillna(0),
+        'first_value': old['first_value'].fillna(0)
+                       + new['first_value'].fillna(0).where(~seen | same_first, 0)
+    })
+    return merged.astype({'first': np.int64, 'last': np.int64, 'periods': np.int64})
+
+def _finalize(partials, observation_end):
+    """Compute frequency, recency, T and monetary value from customer-period rows"""
+    return _finalize_state(_customer_state(partials), observation_end)
+
+def _finalize_state(summary, observation_end):
+    """Compute frequency, recency, T and monetary value from the customer state"""
+    summary = summary.sort_index()
+    frequency = summary['periods'].values - 1
+    repeat_value = summary['total_value'].values - summary['first_value'].values
+
+    result = pd.DataFrame({
+        'frequency': frequency,
+        'recency': (summary['last'].values - summary['first'].values).astype(float),
+        'T': (observation_end - summary['first'].values).astype(float),
+        # Average value of repeat transactions, as used by Gamma-Gamma style models
+        'monetary_value': np.divide(
+            repeat_value, frequency,
+            out=np.zeros(len(summary), dtype=float),
+            where=frequency > 0
+        )
+    }, index=summary.index)
+    result.index.name = 'customer_id'
+    return result.reset_index()
+
+def summarize_transactions(transactions, customer_col, date_col, value_col=None,
+                           observation_end=None, freq='D'):
+    """
+    Build the per-customer RFM summary from a transaction log
+
+    Parameters:
+    -----------
+    transactions : pandas.DataFrame
+        One row per transaction
+    customer_col : str
+        Column name with the customer identifier
+    date_col : str
+        Column name with the transaction date
+    value_col : str, optional
+        Column name with the transaction value
+    observation_end : datetime-like, optional
+        End of the observation window; later transactions are ignored.
+        Defaults to the last transaction date
+    freq : str, optional
+        Period length ('D', 'W' or 'M'); several transactions in the same
+        period count as one purchase, default is 'D'
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per customer with customer_id, frequency, recency, T and
+        monetary_value columns
+    """
+    end_period = None if observation_end is None else _to_periods([observation_end], freq)[0]
+    partials = _reduce_chunk(transactions, customer_col, date_col, value_col, freq, end_period)
+    if end_period is None:
+        end_period = partials['period'].max()
+
+    return _finalize(partials, end_period)
+
+def summarize_transactions_chunked(source, customer_col, date_col, value_col=None,
+                                   observation_end=None, freq='D', chunksize=1_000_000,
+                                   ordered=False):
+    """
+    Build the RFM summary from a transaction log that does not fit in memory
+
+    By default each chunk is reduced to (customer, period) partial
+    aggregates, which are merged across chunks, so the result is identical
+    to summarize_transactions regardless of how the log is ordered or
+    split. Memory then grows with the number of distinct purchase periods,
+    not transactions. For logs ordered by date, ordered=True folds every
+    chunk into a running per-customer state instead, so memory grows with
+    the number of customers only.
+
+    Parameters:
+    -----------
+    source : str or iterable of pandas.DataFrame
+        Path to a CSV file, or an iterable of transaction DataFrames
+    customer_col : str
+        Column name with the customer identifier
+    date_col : str
+        Column name with the transaction date
+    value_col : str, optional
+        Column name with the transaction value
+    observation_end : datetime-like, optional
+        End of the observation window; later transactions are ignored.
+        Defaults to the last transaction date
+    freq : str, optional
+        Period length ('D', 'W' or 'M'), default is 'D'
+    chunksize : int, optional
+        Rows per chunk when reading from a CSV path
+    ordered : bool, optional
+        The log is ordered by date; raises ValueError if a chunk goes back
+        in time for a customer. Default is False
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per customer with customer_id, frequency, recency, T and
+        monetary_value columns
+    """
+    if isinstance(source, str):
+        usecols = [customer_col, date_col] + ([value_col] if value_col else [])
+        source = pd.read_csv(source, usecols=usecols, chunksize=chunksize)
+
+    pending = []
+    pending_rows = 0
+    merged = None
+    cutoff = None if observation_end is None else _to_periods([observation_end], freq)[0]
+    end_period = cutoff
+
+    for chunk in source:
+        partial = _reduce_chunk(chunk, customer_col, date_col, value_col, freq, cutoff)
+        if len(partial) == 0:
+            continue
+        if cutoff is None:
+            chunk_end = partial['period'].max()
+            end_period = chunk_end if end_period is None else max(end_period, chunk_end)
+
+        if ordered:
+            state = _customer_state(partial)
+            merged = state if merged is None else _merge_states(merged, state)
+            continue
+
+        pending.append(partial)
+        pending_rows += len(partial)
+
+        # Merge partial aggregates so duplicates across chunks collapse
+        if pending_rows >= COMPACT_THRESHOLD:
+            merged = _merge_partials(([merged] if merged is not None else []) + pending)
+            pending = []
+            pending_rows = 0
+
+    if pending:
+        merged = _merge_partials(([merged] if merged is not None else []) + pending)
+
+    if merged is None:
+        raise ValueError("No transactions found")
+
+    return _finalize_state(merged, end_period) if ordered else _finalize(merged, end_period)
@@ -0,0 +1,281 @@
+"""
+Lightweight scoring of exported models with NumPy only
+
+Fitted models are exported to ``.npz`` artifacts holding the stacked
+posterior draws plus JSON metadata. The scorers below reproduce the model
+predictions from those arrays without importing pymc, pymc_marketing,
+arviz or pandas, so scoring workers start in well under a second.
+"""
+import json
+
+import numpy as np
+
+from . import pareto_nbd
+from .transforms import lagged_spend, transform_media
+from .posterior import hdi, summarize_samples, summarize_chunks
+
+# Bumped whenever the artifact layout changes
+ARTIFACT_VERSION = 3
+
+def save_artifact(path, kind, arrays, metadata, dtype=None):
+    """
+    Write posterior arrays and metadata to a compressed .npz artifact
+
+    Parameters:
+    -----------
+    path : str
+        Destination file, conventionally ending in .npz
+    kind : str
+        Model type, 'mmm' or 'clv'
+    arrays : dict
+        Array name to stacked posterior draws or other numeric inputs
+    metadata : dict
+        JSON-serializable model description (columns, feature names, ...)
+    dtype : str or numpy.dtype, optional
+        Floating point type of the stored arrays, default keeps their type
+    """
+    metadata = dict(metadata, kind=kind, version=ARTIFACT_VERSION)
+    stored = {
+        name: np.asarray(values, dtype=dtype) if dtype else np.asarray(values)
+        for name, values in arrays.items()
+    }
+    # Metadata travels as a plain string array so loading never needs pickle
+    np.savez_compressed(path, __metadata__=np.array(json.dumps(metadata)), **stored)
+
+def load_artifact(path, kind=None):
+    """
+    Read an artifact written by save_artifact
+
+    Parameters:
+    -----------
+    path : str
+        Artifact file
+    kind : str, optional
+        Expected model type, checked against the artifact
+
+    Returns:
+    --------
+    tuple
+        (metadata dict, dict of arrays)
+    """
+    with np.load(path, allow_pickle=False) as artifact:
+        arrays = {name: artifact[name] for name in artifact.files}
+    metadata = json.loads(str(arrays.pop('__metadata__')))
+
+    if metadata.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported artifact version {metadata.get('version')}")
+    if kind is not None and metadata['kind'] != kind:
+        raise ValueError(f"Expected a '{kind}' artifact, got '{metadata['kind']}'")
+    return metadata, arrays
+
+def fourier_matrix(dates, names, periods):
+    """
+    Recreate Fourier seasonality columns by name from period dates
+
+    Parameters:
+    -----------
+    dates : array-like
+        Period dates, anything numpy.datetime64 accepts
+    names : list of str
+        Columns such as 'yearly_sin_1' in the order used by the model
+    periods : dict
+        Season name to cycle length in days
+
+    Returns:
+    --------
+    numpy.ndarray
+        Design matrix with shape (periods, len(names))
+    """
+    days = np.asarray(dates, dtype='datetime64[ns]').astype(np.int64) / 86_400e9
+    columns = []
+    for name in names:
+        season, wave, harmonic = name.rsplit('_', 2)
+        phase = 2 * np.pi * int(harmonic) * days / periods[season]
+        columns.append(np.sin(phase) if wave == 'sin' else np.cos(phase))
+    return np.column_stack(columns) if columns else np.empty((len(days), 0))
+
+def _column(data, name):
+    return np.asarray(data[name], dtype=float)
+
+class MediaMixScorer:
+    """Predictions and ROI of an exported MediaMixModel"""
+
+    def __init__(self, path):
+        """
+        Load an artifact written by MediaMixModel.export_artifact
+
+        Parameters:
+        -----------
+        path : str
+            Artifact file
+        """
+        self.metadata, arrays = load_artifact(path, kind='mmm')
+        self.channels = self.metadata['channels']
+        self.date_col = self.metadata.get('date_col')
+        self.alpha = arrays['alpha']
+        self.beta = arrays['beta']
+        self.gamma_fourier = arrays.get('gamma_fourier')
+        self.mean_spend = arrays['mean_spend']
+
+        # Fitted adstock and saturation, absent for models on untransformed spend
+        self.transformations = self.metadata.get('transformations')
+        self.spend_scale = arrays.get('spend_scale')
+        self.roi = arrays.get('roi')
+        self.transform_params = None
+        if self.transformations is not None:
+            self.transform_params = tuple(
+                {name[len(prefix):]: values[:, np.newaxis] for name, values in arrays.items() if name.startswith(prefix)}
+                for prefix in ('adstock_', 'saturation_')
+            )
+
+    def _seasonality(self, data):
+        if self.gamma_fourier is None:
+            return None
+        return fourier_matrix(
+            data[self.date_col], self.metadata['fourier_names'], self.metadata['seasonal_periods']
+        )
+
+    def predict(self, data, hdi_prob=None, chunk_size=1000):
+        """
+        Predict the target for new periods
+
+        Parameters:
+        -----------
+        data : mapping
+            Column name to values, e.g. a dict of arrays or a DataFrame, with
+            every channel and, for seasonal models, the date column
+        hdi_prob : float, optional
+            If given, also return the highest density interval per period
+        chunk_size : int, optional
+            Number of periods evaluated per batch when computing intervals
+
+        Returns:
+        --------
+        numpy.ndarray or dict
+            Mean predictions, or a dict with 'mean', 'hdi_lower' and
+            'hdi_upper' arrays when hdi_prob is given
+        """
+        X = np.column_stack([_column(data, channel) for channel in self.channels])
+        F = self._seasonality(data)
+
+        if self.transform_params is None:
+            mean = self.alpha.mean() + X @ self.beta.mean(axis=0)
+            if F is not None:
+                mean = mean + F @ self.gamma_fourier.mean(axis=0)
+            if hdi_prob is None:
+                return mean
+        else:
+            lagged = lagged_spend(X, self.transformations['adstock']['max_lag'])
+            mean = np.empty(len(X))
+
+        lower = np.empty(len(X))
+        upper = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            stop = start + chunk_size
+            if self.transform_params is None:
+                media = X[start:stop]
+            else:
+                media = transform_media(
+                    lagged[:, start:stop], self.spend_scale, *self.transform_params, config=self.transformations
+                )
+            predictions = self.alpha[:, np.newaxis] + (self.beta[:, np.newaxis] * media).sum(axis=2)
+            if F is not None:
+                predictions += self.gamma_fourier @ F[start:stop].T
+            if self.transform_params is not None:
+                mean[start:stop] = predictions.mean(axis=0)
+            if hdi_prob is not None:
+                lower[start:stop], upper[start:stop] = hdi(predictions, hdi_prob, axis=0)
+
+        if hdi_prob is None:
+            return mean
+        return {'mean': mean, 'hdi_lower': lower, 'hdi_upper': upper}
+
+    def roi_estimates(self, quantiles=None):
+        """
+        ROI per channel, sorted by ROI in descending order
+
+        Parameters:
+        -----------
+        quantiles : list of float, optional
+            Additional posterior quantiles to report
+
+        Returns:
+        --------
+        dict
+            'Channel', 'ROI', 'Lower_CI', 'Upper_CI' and 'Q<q>' arrays, the
+            columns of MediaMixModel.get_roi_estimates
+        """
+        extra = list(quantiles or [])
+        roi = self.beta / self.mean_spend if self.roi is None else self.roi
+        roi_mean, roi_quantiles = summarize_samples(roi, [0.025, 0.975] + extra)
+
+        order = np.argsort(-roi_mean, kind='stable')
+        result = {
+            'Channel': np.asarray(self.channels)[order],
+            'ROI': roi_mean[order],
+            'Lower_CI': roi_quantiles[0][order],
+            'Upper_CI': roi_quantiles[1][order]
+        }
+        for q, values in zip(extra, roi_quantiles[2:]):
+            result[f'Q{q:g}'] = values[order]
+        return result
+
+class CLVScorer:
+    """Customer predictions of an exported CustomerLifetimeValue model"""
+
+    def __init__(self, path):
+        """
+        Load an artifact written by CustomerLifetimeValue.export_artifact
+
+        Parameters:
+        -----------
+        path : str
+            Artifact file
+        """
+        self.metadata, arrays = load_artifact(path, kind='clv')
+        self.r = arrays['r']
+        self.alpha = arrays['alpha']
+        self.s = arrays['s']
+        self.beta = arrays['beta']
+
+    def predict_probability_alive(self, frequency, recency, T):
+        """
+        Probability that each customer is still active
+
+        Parameters:
+        -----------
+        frequency, recency, T : array-like
+            Repeat transactions, time of the last and time since the first
+            transaction per customer
+
+        Returns:
+        --------
+        numpy.ndarray
+            Posterior mean probability per customer
+        """
+        return self._summarize(pareto_nbd.probability_alive, frequency, recency, T)
+
+    def predict_expected_purchases(self, t, frequency, recency, T):
+        """
+        Expected number of purchases of each customer in the next t periods
+
+        Returns:
+        --------
+        numpy.ndarray
+            Posterior mean expected purchases per customer
+        """
+        def expected(*args):
+            return pareto_nbd.expected_purchases(t, *args)
+
+        return self._summarize(expected, frequency, recency, T)
+
+    def _summarize(self, fn, frequency, recency, T):
+        """Posterior mean of fn(r, alpha, s, beta, x, t_x, T) per customer, in chunks"""
+        frequency, recency, T = (np.asarray(values, dtype=float) for values in (frequency, recency, T))
+        params = [values[:, np.newaxis] for values in (self.r, self.alpha, self.s, self.beta)]
+
+        def evaluate(start, stop):
+            return fn(*params, frequency[start:stop], recency[start:stop], T[start:stop])
+
+        mean, _ = summarize_chunks(evaluate, len(frequency), len(self.r), max_values=2 ** 21)
+        return mean
@@ -0,0 +1,126 @@
+"""
+Fourier seasonality features for media mix modeling
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .config import TRANSFORMATIONS
+
+# Seasonal cycle lengths in days
+SEASONAL_PERIODS = {
+    'yearly': 365.25,
+    'weekly': 7.0
+}
+
+# Number of distinct calendars whose design matrices are kept in memory
+FOURIER_CACHE_SIZE = 32
+
+_fourier_cache = OrderedDict()
+
+def _calendar_key(dates):
+    """Hashable key identifying a calendar, cheap for regular date ranges"""
+    freq = pd.infer_freq(dates) if len(dates) >= 3 else None
+    if freq is not None:
+        return ('regular', dates[0].value, len(dates), freq)
+    digest = hashlib.sha1(dates.as_unit('ns').asi8.tobytes()).hexdigest()
+    return ('dates', digest, len(dates))
+
+def _max_order(period, step):
+    """Highest harmonic that does not alias at the given sampling step"""
+    return int(np.floor((period / step - 1) / 2))
+
+def _build_fourier(dates, order, seasons):
+    """Compute the sine/cosine design matrix and its column names"""
+    days = dates.as_unit('ns').asi8 / 86_400e9
+    step = np.median(np.diff(days)) if len(days) > 1 else 1.0
+
+    blocks = []
+    names = []
+    for season in seasons:
+        period = SEASONAL_PERIODS[season]
+        season_order = min(order, _max_order(period, step))
+        if season_order < 1:
+            continue
+        harmonics = np.arange(1, season_order + 1)
+        phase = 2 * np.pi * np.outer(days, harmonics) / period
+        blocks.extend([np.sin(phase), np.cos(phase)])
+        names.extend([f'{season}_sin_{k}' for k in harmonics])
+        names.extend([f'{season}_cos_{k}' for k in harmonics])
+
+    matrix = np.hstack(blocks) if blocks else np.empty((len(dates), 0))
+    matrix.setflags(write=False)
+    return matrix, names
+
+def _enclosing_entry(dates, key):
+    """
+    Rows of a cached regular calendar that contains dates as a contiguous range
+
+    Fourier terms depend only on the absolute date, so the features of a
+    sub-range of a cached calendar with the same frequency (e.g. a backtest
+    fold of the full history) are a slice of the cached matrix.
+    """
+    calendar, order, seasons = key
+    if calendar[0] != 'regular':
+        return None
+
+    for (cached, cached_order, cached_seasons), (matrix, names, index) in _fourier_cache.items():
+        if cached[0] != 'regular' or cached[3] != calendar[3] or (cached_order, cached_seasons) != (order, seasons):
+            continue
+        start = index.searchsorted(dates[0])
+        stop = start + len(dates)
+        if stop <= len(index) and index[start] == dates[0] and index[stop - 1] == dates[-1]:
+            return matrix[start:stop], names, dates
+    return None
+
+def fourier_features(dates, order=None, yearly=None, weekly=None):
+    """
+    Fourier seasonality design matrix for a calendar, memoized per calendar
+
+    Parameters:
+    -----------
+    dates : array-like
+        Period dates
+    order : int, optional
+        Number of harmonics per season. Defaults to TRANSFORMATIONS['seasonality']
+    yearly : bool, optional
+        Include yearly terms. Defaults to TRANSFORMATIONS['seasonality']
+    weekly : bool, optional
+        Include weekly terms. Defaults to TRANSFORMATIONS['seasonality']. Weekly
+        terms are dropped for weekly or coarser data, and harmonics that would
+        alias at the data frequency are skipped
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Read-only sine/cosine features indexed by date. Calls with the same
+        calendar, frequency and order share the cached matrix, and sub-ranges
+        of a cached regular calendar reuse its rows
+    """
+    config = TRANSFORMATIONS['seasonality']
+    order = config['fourier_order'] if order is None else order
+    yearly = config['yearly'] if yearly is None else yearly
+    weekly = config['weekly'] if weekly is None else weekly
+    seasons = tuple(season for season, enabled in (('yearly', yearly), ('weekly', weekly)) if enabled)
+
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    key = (_calendar_key(dates), order, seasons)
+
+    if key in _fourier_cache:
+        _fourier_cache.move_to_end(key)
+    else:
+        entry = _enclosing_entry(dates, key)
+        if entry is None:
+            entry = _build_fourier(dates, order, seasons) + (dates,)
+        _fourier_cache[key] = entry
+        if len(_fourier_cache) > FOURIER_CACHE_SIZE:
+            _fourier_cache.popitem(last=False)
+
+    matrix, names, _ = _fourier_cache[key]
+    return pd.DataFrame(matrix, index=dates, columns=names, copy=False)
+
+def clear_fourier_cache():
+    """Drop all memoized seasonality matrices"""
+    _fourier_cache.clear()
@@ -0,0 +1,176 @@
+"""
+Content-addressed on-disk cache of fitted model traces
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import arviz as az
+
+from .config import TRACE_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+def _update_hash(digest, part):
+    """Feed one input into a running hash, by content rather than identity"""
+    if isinstance(part, pd.DataFrame):
+        digest.update(json.dumps([str(col) for col in part.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+    elif isinstance(part, pd.Series):
+        digest.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+    elif isinstance(part, np.ndarray):
+        digest.update(f'{part.dtype.str}{part.shape}'.encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    else:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+    # Separator so that consecutive parts cannot run into each other
+    digest.update(b'\0')
+
+def fingerprint(*parts):
+    """
+    SHA-256 key of the inputs that determine a fitted trace
+
+    Parameters:
+    -----------
+    *parts
+        DataFrames, Series, arrays or JSON-serializable values such as
+        column names, priors and sampler settings
+
+    Returns:
+    --------
+    str
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        _update_hash(digest, part)
+    return digest.hexdigest()
+
+class TraceCache:
+    """
+    Fitted InferenceData stored as NetCDF files named by their input hash
+
+    Reads refresh a file's modification time, so evicting the oldest files
+    once the directory exceeds ``max_bytes`` drops the least recently used.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        """
+        Initialize the cache
+
+        Parameters:
+        -----------
+        directory : str, optional
+            Cache directory, defaults to TRACE_CACHE_CONFIG['directory']
+        max_bytes : int, optional
+            Size bound of the directory, defaults to TRACE_CACHE_CONFIG['max_bytes']
+        """
+        self.directory = directory or TRACE_CACHE_CONFIG['directory']
+        self.max_bytes = max_bytes or TRACE_CACHE_CONFIG['max_bytes']
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.nc')
+
+    def get(self, key):
+        """Return the cached trace for a key, or None"""
+        path = self.path(key)
+        try:
+            with az.rc_context({'data.load': 'eager'}):
+                trace = az.from_netcdf(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Discarding unreadable cached trace %s", path, exc_info=True)
+            self._remove(path)
+            return None
+
+        os.utime(path)
+        return trace
+
+    def put(self, key, trace):
+        """Store a trace under a key, then evict down to the size bound"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial traces
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            trace.to_netcdf(tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used traces until the cache fits in max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.nc'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """Delete every cached trace"""
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.nc'):
+                    self._remove(entry.path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def get_trace_cache():
+    """The configured trace cache, or None when caching is disabled"""
+    if not TRACE_CACHE_CONFIG['enabled']:
+        return None
+    return TraceCache()
+
+def cached_trace(key_parts, sample):
+    """
+    Return the cached trace for the inputs, sampling and storing it on a miss
+
+    Parameters:
+    -----------
+    key_parts : sequence
+        Inputs that determine the trace, passed to fingerprint
+    sample : callable
+        Produces the trace when it is not cached
+
+    Returns:
+    --------
+    arviz.InferenceData
+        The cached or freshly sampled trace
+    """
+    cache = get_trace_cache()
+    if cache is None:
+        return sample()
+
+    key = fingerprint(*key_parts)
+    trace = cache.get(key)
+    if trace is not None:
+        logger.info("Reusing cached trace %s", key)
+        return trace
+
+    trace = sample()
+    try:
+        cache.put(key, trace)
+    except Exception:
+        # A cache that cannot be written must not fail the fit
+        logger.warning("Could not cache trace %s", key, exc_info=True)
+    return trace
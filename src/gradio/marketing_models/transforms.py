@@ -0,0 +1,312 @@
+"""
+Vectorized adstock and saturation transforms for media spend
+"""
+import numpy as np
+
+from .config import DEFAULT_PRIORS, TRANSFORMATIONS
+
+# Default adstock parameters, with lags in periods
+DEFAULT_ADSTOCK_PARAMS = {
+    'geometric': {'alpha': DEFAULT_PRIORS['mmm']['gamma']},
+    'weibull': {'shape': 2.0, 'scale': 2.0}
+}
+
+# Default saturation parameters, expressed on spend normalized to [0, 1]
+DEFAULT_SATURATION_PARAMS = {
+    'hill': {'half_saturation': 0.5, 'slope': 1.0},
+    'logistic': {'lam': 1.0},
+    'power': {'exponent': 0.5}
+}
+
+# Parameters that must lie in (0, 1); fitted models give them Beta priors
+# and the other parameters Gamma priors
+UNIT_INTERVAL_PARAMS = ('alpha', 'exponent')
+
+# Offset added to carried-over spend before saturation, so curve gradients
+# with respect to their parameters stay finite for periods without spend
+MIN_MEDIA = 1e-9
+
+def _as_float(x):
+    """Float array of x; symbolic PyTensor tensors pass through unchanged"""
+    return x if hasattr(x, 'owner') else np.asarray(x, dtype=float)
+
+def _as_2d(x):
+    """View spend as (periods, channels)"""
+    x = np.asarray(x, dtype=float)
+    return x[:, np.newaxis] if x.ndim == 1 else x
+
+def convolve_lags(x, weights, normalize=True):
+    """
+    Apply per-channel finite lag weights to a spend history
+
+    Parameters:
+    -----------
+    x : array-like
+        Spend with shape (periods,) or (periods, channels)
+    weights : array-like
+        Lag weights with shape (max_lag,) or (max_lag, channels); weights[0]
+        applies to the current period
+    normalize : bool, optional
+        Scale the weights of each channel to sum to one
+
+    Returns:
+    --------
+    numpy.ndarray
+        Carried-over spend with the same shape as x
+    """
+    values = _as_2d(x)
+    weights = np.asarray(weights, dtype=float)
+    if weights.ndim == 1:
+        weights = weights[:, np.newaxis]
+    if normalize:
+        weights = weights / weights.sum(axis=0)
+
+    # One shifted multiply-add per lag, vectorized over periods and channels
+    result = np.zeros_like(values)
+    n_periods = values.shape[0]
+    for lag in range(min(weights.shape[0], n_periods)):
+        result[lag:] += weights[lag] * values[:n_periods - lag]
+
+    return result.reshape(np.shape(x))
+
+def geometric_adstock(x, alpha, max_lag=8, normalize=True):
+    """
+    Geometric carryover: weight alpha**lag for lags 0..max_lag-1
+
+    Parameters:
+    -----------
+    x : array-like
+        Spend with shape (periods,) or (periods, channels)
+    alpha : float or array-like
+        Retention rate in [0, 1), scalar or one per channel
+    max_lag : int, optional
+        Number of periods the effect carries over
+    normalize : bool, optional
+        Scale the weights to sum to one
+
+    Returns:
+    --------
+    numpy.ndarray
+        Adstocked spend with the same shape as x
+    """
+    return convolve_lags(x, geometric_weights(alpha, max_lag), normalize)
+
+def geometric_weights(alpha, max_lag=8):
+    """
+    Lag weights alpha**lag of geometric_adstock
+
+    Parameters broadcast against the lag axis: scalars or (channels,)
+    give (max_lag, channels) weights, (draws, 1, channels) gives
+    (draws, max_lag, channels). PyTensor tensors are accepted as well.
+    """
+    lags = np.arange(max_lag)[:, np.newaxis]
+    return _as_float(alpha) ** lags
+
+def weibull_adstock(x, shape, scale, max_lag=8, normalize=True, kind='pdf'):
+    """
+    Weibull carryover allowing a delayed peak ('pdf') or a flexible decay ('cdf')
+
+    Parameters:
+    -----------
+    x : array-like
+        Spend with shape (periods,) or (periods, channels)
+    shape : float or array-like
+        Weibull shape parameter k, scalar or one per channel
+    scale : float or array-like
+        Weibull scale parameter lambda in periods, scalar or one per channel
+    max_lag : int, optional
+        Number of periods the effect carries over
+    normalize : bool, optional
+        Scale the weights to sum to one
+    kind : str, optional
+        'pdf' weights lags by the Weibull density, 'cdf' by its survival function
+
+    Returns:
+    --------
+    numpy.ndarray
+        Adstocked spend with the same shape as x
+    """
+    return convolve_lags(x, weibull_weights(shape, scale, max_lag, kind), normalize)
+
+def weibull_weights(shape, scale, max_lag=8, kind='pdf'):
+    """Lag weights of weibull_adstock, broadcast like geometric_weights"""
+    shape, scale = _as_float(shape), _as_float(scale)
+
+    if kind == 'pdf':
+        # Density evaluated one period after each lag so lag 0 is non-zero
+        lags = np.arange(1, max_lag + 1)[:, np.newaxis] / scale
+        weights = (shape / scale) * lags ** (shape - 1) * np.exp(-lags ** shape)
+    elif kind == 'cdf':
+        lags = np.arange(max_lag)[:, np.newaxis] / scale
+        weights = np.exp(-lags ** shape)
+    else:
+        raise ValueError("kind must be 'pdf' or 'cdf'")
+
+    return weights
+
+def hill_saturation(x, half_saturation=0.5, slope=1.0):
+    """Hill curve x^S / (K^S + x^S), reaching half its maximum at x = K"""
+    ratio = (_as_float(x) / half_saturation) ** slope
+    return ratio / (1.0 + ratio)
+
+def hill_saturation_grad(x, half_saturation=0.5, slope=1.0):
+    """Derivative of hill_saturation with respect to x"""
+    x = np.asarray(x, dtype=float)
+    ratio = np.power(x / half_saturation, slope)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grad = slope * ratio / (x * (1.0 + ratio) ** 2)
+    # Limit at x = 0 is 1/K for slope 1, 0 for slope > 1, infinite below 1
+    at_zero = np.where(slope == 1.0, 1.0 / half_saturation, np.where(slope > 1.0, 0.0, np.inf))
+    return np.where(x > 0, grad, at_zero)
+
+def logistic_saturation(x, lam=1.0):
+    """Logistic curve (1 - exp(-lam x)) / (1 + exp(-lam x))"""
+    return np.tanh(0.5 * lam * _as_float(x))
+
+def logistic_saturation_grad(x, lam=1.0):
+    """Derivative of logistic_saturation with respect to x"""
+    return 0.5 * lam / np.cosh(0.5 * lam * np.asarray(x, dtype=float)) ** 2
+
+def power_saturation(x, exponent=0.5):
+    """Power curve x^p with 0 < p <= 1"""
+    return _as_float(x) ** exponent
+
+def power_saturation_grad(x, exponent=0.5):
+    """Derivative of power_saturation with respect to x"""
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore'):
+        return exponent * np.power(x, exponent - 1.0)
+
+SATURATION_FUNCTIONS = {
+    'hill': (hill_saturation, hill_saturation_grad),
+    'logistic': (logistic_saturation, logistic_saturation_grad),
+    'power': (power_saturation, power_saturation_grad)
+}
+
+ADSTOCK_FUNCTIONS = {
+    'geometric': geometric_adstock,
+    'weibull': weibull_adstock
+}
+
+ADSTOCK_WEIGHTS = {
+    'geometric': geometric_weights,
+    'weibull': weibull_weights
+}
+
+def apply_media_transforms(x, adstock_params=None, saturation_params=None, config=None):
+    """
+    Adstock then saturate a spend history as configured in TRANSFORMATIONS
+
+    Parameters:
+    -----------
+    x : array-like
+        Spend with shape (periods,) or (periods, channels)
+    adstock_params : dict, optional
+        Parameters of the configured adstock function, missing ones are
+        taken from DEFAULT_ADSTOCK_PARAMS (geometric adstock defaults to
+        the 'gamma' carryover prior)
+    saturation_params : dict, optional
+        Parameters of the configured saturation function
+    config : dict, optional
+        Transformation settings, defaults to config.TRANSFORMATIONS
+
+    Returns:
+    --------
+    numpy.ndarray
+        Transformed spend with the same shape as x
+    """
+    config = config or TRANSFORMATIONS
+    adstock_config = config['adstock']
+    saturation_config = config['diminishing_returns']
+
+    method = adstock_config.get('method', 'geometric')
+    if method not in ADSTOCK_FUNCTIONS:
+        raise ValueError(f"Unknown adstock method '{method}'. Must be one of {list(ADSTOCK_FUNCTIONS)}")
+    params = dict(DEFAULT_ADSTOCK_PARAMS[method], **(adstock_params or {}))
+    values = ADSTOCK_FUNCTIONS[method](
+        x,
+        max_lag=adstock_config['max_lag'],
+        normalize=adstock_config['normalize'],
+        **params
+    )
+
+    if saturation_config['normalize']:
+        # Saturation parameters are then relative to each channel's peak
+        scale = np.max(np.abs(_as_2d(values)), axis=0)
+        scale[scale == 0] = 1.0
+        values = (_as_2d(values) / scale).reshape(np.shape(values))
+
+    saturation = saturation_config['method']
+    if saturation not in SATURATION_FUNCTIONS:
+        raise ValueError(f"Unknown saturation method '{saturation}'. Must be one of {list(SATURATION_FUNCTIONS)}")
+    params = saturation_params or DEFAULT_SATURATION_PARAMS[saturation]
+
+    return SATURATION_FUNCTIONS[saturation][0](values, **params)
+
+def lagged_spend(x, max_lag):
+    """
+    Spend shifted by 0..max_lag-1 periods, zero before the first period
+
+    Parameters:
+    -----------
+    x : array-like
+        Spend with shape (periods, channels)
+    max_lag : int
+        Number of lags
+
+    Returns:
+    --------
+    numpy.ndarray
+        Array with shape (max_lag, periods, channels)
+    """
+    values = _as_2d(x)
+    lagged = np.zeros((max_lag,) + values.shape)
+    for lag in range(min(max_lag, len(values))):
+        lagged[lag, lag:] = values[:len(values) - lag]
+    return lagged
+
+def transform_media(lagged, spend_scale, adstock_params, saturation_params, config=None):
+    """
+    Adstock then saturate spend with fitted, per-draw or symbolic parameters
+
+    The model-side counterpart of apply_media_transforms: carried-over spend
+    is divided by a fixed per-channel spend_scale instead of its own peak, so
+    new periods are transformed exactly like the training periods.
+
+    Parameters:
+    -----------
+    lagged : numpy.ndarray
+        Output of lagged_spend with shape (max_lag, periods, channels)
+    spend_scale : array-like
+        Spend per channel that saturation parameters are relative to
+    adstock_params, saturation_params : dict
+        Parameters of the configured functions, each a PyTensor tensor or
+        array of shape (channels,), or (draws, 1, channels) for posterior draws
+    config : dict, optional
+        Transformation settings, defaults to config.TRANSFORMATIONS
+
+    Returns:
+    --------
+    numpy.ndarray or TensorVariable
+        Transformed media with shape (periods, channels), or
+        (draws, periods, channels) for per-draw parameters
+    """
+    config = config or TRANSFORMATIONS
+    adstock_config = config['adstock']
+    method = adstock_config.get('method', 'geometric')
+    if method not in ADSTOCK_WEIGHTS:
+        raise ValueError(f"Unknown adstock method '{method}'. Must be one of {list(ADSTOCK_WEIGHTS)}")
+
+    weights = ADSTOCK_WEIGHTS[method](max_lag=lagged.shape[0], **adstock_params)
+    if adstock_config['normalize']:
+        weights = weights / weights.sum(axis=-2, keepdims=True)
+    if hasattr(weights, 'owner'):
+        values = (weights[:, np.newaxis, :] * lagged).sum(axis=0)
+    else:
+        values = np.einsum('...lc,lpc->...pc', weights, lagged)
+
+    saturation = config['diminishing_returns']['method']
+    if saturation not in SATURATION_FUNCTIONS:
+        raise ValueError(f"Unknown saturation method '{saturation}'. Must be one of {list(SATURATION_FUNCTIONS)}")
+    values = values / np.asarray(spend_scale, dtype=float) + MIN_MEDIA
+    return SATURATION_FUNCTIONS[saturation][0](values, **saturation_params)
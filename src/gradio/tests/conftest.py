@@ -10,6 +10,12 @@ import numpy as np
 # Add the parent directory to the path so we can import modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+@pytest.fixture(autouse=True)
+def isolated_trace_cache(tmp_path, monkeypatch):
+    """Keep fitted traces cached during tests out of the user's cache directory"""
+    from marketing_models.config import TRACE_CACHE_CONFIG
+    monkeypatch.setitem(TRACE_CACHE_CONFIG, 'directory', str(tmp_path / 'traces'))
+
 @pytest.fixture
 def sample_mmm_data():
     """Generate sample data for media mix modeling tests"""
@@ -0,0 +1,85 @@
+"""
+Unit tests for the budget allocation optimizer
+"""
+import pytest
+import numpy as np
+
+from marketing_models.budget import channel_response, optimize_allocation, sweep_budgets
+
+class TestBudget:
+    """Tests for response curves and the allocation optimizer"""
+
+    def test_marginal_matches_finite_differences(self):
+        """Test the analytic marginal response against a numerical derivative"""
+        coefficients = np.array([0.5, 0.3, 0.7])
+        scale = np.array([2000.0, 600.0, 400.0])
+        spend = np.array([1500.0, 900.0, 100.0])
+
+        for saturation in ['hill', 'logistic', 'power']:
+            _, marginal = channel_response(spend, coefficients, scale, saturation)
+            step = 1e-3
+            upper, _ = channel_response(spend + step, coefficients, scale, saturation)
+            lower, _ = channel_response(spend - step, coefficients, scale, saturation)
+            assert np.allclose(marginal, (upper - lower) / (2 * step), rtol=1e-5)
+
+    def test_interior_solution_equalizes_marginal_roi(self):
+        """Test that channels below their maximum end with the same marginal ROI"""
+        rng = np.random.default_rng(0)
+        coefficients = rng.uniform(0.2, 1.0, size=30)
+        scale = rng.uniform(100, 1000, size=30)
+
+        solution = optimize_allocation(10000, coefficients, scale)
+
+        assert solution['success']
+        assert np.isclose(solution['allocation'].sum(), 10000)
+        funded = solution['allocation'] > 1.0
+        marginal = solution['marginal_roi'][funded]
+        assert np.allclose(marginal, marginal.mean(), rtol=1e-3)
+
+    def test_bounds_and_posterior_draws(self):
+        """Test per-channel bounds and averaging over posterior draws"""
+        rng = np.random.default_rng(1)
+        draws = rng.normal([0.5, 0.3, 0.7], 0.05, size=(200, 3))
+        scale = np.full(3, 1000.0)
+
+        solution = optimize_allocation(3000, draws, scale, lower=[500, 500, 0], upper=[3000, 3000, 800])
+        mean_solution = optimize_allocation(3000, draws.mean(axis=0), scale, lower=[500, 500, 0], upper=[3000, 3000, 800])
+
+        assert np.all(solution['allocation'] >= np.array([500, 500, 0]) - 1e-6)
+        assert solution['allocation'][2] <= 800 + 1e-6
+        # Fixed curve parameters make the expected response linear in beta
+        assert np.allclose(solution['allocation'], mean_solution['allocation'], atol=1e-3)
+
+    def test_infeasible_constraints(self):
+        """Test that impossible bounds are rejected"""
+        with pytest.raises(ValueError):
+            optimize_allocation(1000, [0.5, 0.3], [500.0, 500.0], lower=[600, 600])
+        with pytest.raises(ValueError):
+            optimize_allocation(1000, [0.5, 0.3], [500.0, 500.0], upper=[300, 300])
+
+    def test_pinned_budgets(self):
+        """Test channels whose minimum equals their maximum"""
+        solution = optimize_allocation(1000, [0.5, 0.3], [500.0, 500.0], lower=[400, 600], upper=[400, 600])
+        assert np.allclose(solution['allocation'], [400, 600])
+        assert solution['success'] and np.isfinite(solution['response'])
+
+        # Pinned bounds that do not add up to the budget are rejected
+        with pytest.raises(ValueError, match="outside the range"):
+            optimize_allocation(1200, [0.5, 0.3], [500.0, 500.0], lower=[400, 600], upper=[400, 600])
+
+    def test_sweep_budgets(self):
+        """Test the frontier table from serial and parallel sweeps"""
+        coefficients = np.array([0.5, 0.3, 0.7])
+        scale = np.array([2000.0, 600.0, 400.0])
+        budgets = np.linspace(1000, 10000, 10)
+
+        frontier = sweep_budgets(budgets, coefficients, scale, channels=['tv', 'radio', 'social'])
+        parallel = sweep_budgets(budgets, coefficients, scale, channels=['tv', 'radio', 'social'], n_jobs=2)
+
+        assert len(frontier) == 10
+        assert np.allclose(frontier[['tv', 'radio', 'social']].sum(axis=1), budgets)
+        assert np.allclose(frontier['Response'], parallel['Response'], rtol=1e-6)
+        # Concave curves: more budget helps, with diminishing marginal returns
+        assert np.all(frontier['Incremental_Response'].iloc[1:] > 0)
+        assert np.all(np.diff(frontier['Marginal_Return'].iloc[1:]) < 0)
+        assert 'social_Marginal_ROI' in frontier.columns
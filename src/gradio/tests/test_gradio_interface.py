@@ -13,7 +13,8 @@ from marketing_models.gradio_interface import (
     generate_sample_clv_data,
     create_mmm_interface,
     create_clv_interface,
-    create_marketing_analytics_interface
+    create_marketing_analytics_interface,
+    stream_job
 )
 
 class TestGradioInterface:
@@ -246,4 +247,38 @@ class TestGradioInterface:
         assert plot is not None
         assert budget_table is not None
         assert "tv" in budget_table
-        assert "radio" in budget_table
\ No newline at end of file
+        assert "radio" in budget_table
+
+    def test_stream_job(self, monkeypatch):
+        """Test that stream_job polls the job queue without blocking the event loop"""
+        import asyncio
+        import inspect
+        from marketing_models import gradio_interface
+
+        states = iter(['queued', 'running', 'done'])
+
+        class FakeJobManager:
+            def submit(self, fn, *args):
+                return 'job-1234abcd'
+
+            def status(self, job_id):
+                return {'id': job_id, 'name': 'fit', 'state': next(states),
+                        'progress': None, 'elapsed': 0.0, 'error': None}
+
+            def result(self, job_id):
+                return ('done', 'table')
+
+            def forget(self, job_id):
+                pass
+
+        monkeypatch.setattr(gradio_interface, 'job_manager', FakeJobManager())
+        monkeypatch.setattr(gradio_interface, 'JOB_POLL_SECONDS', 0.0)
+        assert inspect.isasyncgenfunction(stream_job)
+
+        async def collect():
+            return [update async for update in stream_job(print, (), 1)]
+
+        updates = asyncio.run(collect())
+        assert [update[0] for update in updates] == ['job-1234abcd', 'job-1234abcd', None]
+        assert 'running' in updates[1][1]
+        assert updates[-1] == (None, 'done', 'table')
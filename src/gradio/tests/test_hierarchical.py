@@ -0,0 +1,62 @@
+"""
+Unit tests for the hierarchical multi-client media mix model
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from marketing_models.hierarchical import HierarchicalMediaMixModel
+from marketing_models.transforms import apply_media_transforms
+
+@pytest.fixture
+def multi_client_data():
+    """Three clients of very different size sharing two channels"""
+    rng = np.random.default_rng(0)
+    frames = []
+    for c, scale in enumerate([1000, 5000, 200]):
+        spend = rng.gamma(2, 100 * (c + 1), size=(40, 2))
+        sales = scale * (1 + apply_media_transforms(spend) @ np.array([0.6, 0.3]))
+        frames.append(pd.DataFrame({
+            'client': f'client_{c}',
+            'date': pd.date_range('2024-01-01', periods=40, freq='D'),
+            'tv': spend[:, 0],
+            'search': spend[:, 1],
+            'sales': sales + rng.normal(0, 0.02 * scale, size=40)
+        }))
+    # Shuffle rows so the model has to restore each client's period order
+    return pd.concat(frames).sample(frac=1, random_state=0)
+
+class TestHierarchicalMediaMixModel:
+    """Tests for the HierarchicalMediaMixModel class"""
+
+    def test_prepare_data(self, multi_client_data):
+        """Test per-client ordering, scaling and transforms"""
+        model = HierarchicalMediaMixModel()
+        X, y, client_idx = model.prepare_data(multi_client_data, 'client', ['tv', 'search'], 'sales', 'date')
+
+        assert list(model.clients) == ['client_0', 'client_1', 'client_2']
+        assert np.allclose(np.bincount(client_idx, weights=y) / np.bincount(client_idx), 1.0)
+
+        # Carryover is computed within each client only
+        rows = client_idx == 1
+        spend = model.data.loc[rows, ['tv', 'search']].to_numpy()
+        assert np.allclose(X[rows], apply_media_transforms(spend))
+
+    def test_fit_map(self, multi_client_data):
+        """Test fitting all clients at once and the derived estimates"""
+        model = HierarchicalMediaMixModel().fit(
+            multi_client_data, 'client', ['tv', 'search'], 'sales', 'date', method='map'
+        )
+
+        assert model.trace.posterior['beta'].shape[-2:] == (3, 2)
+        assert np.corrcoef(model.predict(), model.data['sales'])[0, 1] > 0.99
+
+        roi = model.get_roi_estimates()
+        assert len(roi) == 6
+        assert (roi['ROI'] > 0).all()
+        # Larger clients earn more per $ at the same relative effect
+        tv = roi[roi['Channel'] == 'tv'].set_index('Client')['ROI']
+        assert tv['client_1'] > tv['client_2']
+
+        population = model.get_population_effects()
+        assert list(population['Channel']) == ['tv', 'search']
@@ -0,0 +1,112 @@
+"""
+Unit tests for the inference method selection
+"""
+import pytest
+import numpy as np
+import pymc as pm
+
+from marketing_models import config
+from marketing_models import inference
+from marketing_models.inference import sample_posterior, sampling_resources, resolve_nuts_sampler
+
+@pytest.fixture
+def regression_model():
+    """Small linear regression with known coefficients"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(100, 3))
+    y = 1.0 + X @ np.array([0.5, 0.3, 0.7]) + rng.normal(0, 0.2, size=100)
+
+    with pm.Model(coords={'channel': ['tv', 'radio', 'social']}) as model:
+        alpha = pm.Normal('alpha', 0, 5)
+        beta = pm.Normal('beta', 0, 1, dims='channel')
+        sigma = pm.HalfNormal('sigma', 1)
+        pm.Normal('y', alpha + pm.math.dot(X, beta), sigma, observed=y)
+    return model
+
+class TestInference:
+    """Tests for sample_posterior"""
+
+    def test_map(self, regression_model):
+        """Test that MAP returns a single draw at the mode"""
+        trace = sample_posterior(regression_model, 'map', random_seed=1)
+
+        assert trace.posterior['beta'].shape == (1, 1, 3)
+        assert trace.posterior['beta'].dims == ('chain', 'draw', 'channel')
+        assert np.allclose(trace.posterior['beta'].values[0, 0], [0.5, 0.3, 0.7], atol=0.1)
+        assert 'sigma_log__' not in trace.posterior
+        assert trace.posterior.attrs['inference_method'] == 'map'
+        assert trace.posterior.attrs['inference_seconds'] > 0
+
+    def test_advi(self, regression_model, monkeypatch):
+        """Test that ADVI returns the configured number of draws"""
+        monkeypatch.setitem(config.INFERENCE_CONFIG, 'advi_iterations', 500)
+        monkeypatch.setitem(config.INFERENCE_CONFIG, 'approx_draws', 50)
+
+        trace = sample_posterior(regression_model, 'advi', random_seed=1)
+
+        assert trace.posterior['beta'].shape == (1, 50, 3)
+
+    @pytest.mark.parametrize("method", ['map', 'advi'])
+    def test_fit_progress(self, regression_model, method, monkeypatch):
+        """Test iteration progress of optimizer fits and aborting them from the reporter"""
+        monkeypatch.setitem(config.INFERENCE_CONFIG, 'advi_iterations', 500)
+        monkeypatch.setitem(config.INFERENCE_CONFIG, 'approx_draws', 50)
+        monkeypatch.setattr(inference, 'FIT_PROGRESS_EVERY', 2)
+        total = inference.fit_iterations(method)
+
+        reports = []
+        with inference.reporting_progress(lambda *args: reports.append(args)):
+            sample_posterior(regression_model, method, random_seed=1)
+
+        assert reports[0] == ('fitting', 0, total)
+        assert reports[-1] == ('fitting', total, total)
+        assert ('fitting', 2, total) in reports
+        assert inference._progress_reporter.get() is None
+
+        class Abort(BaseException):
+            pass
+
+        def abort(phase, done, total):
+            if done > 0:
+                raise Abort()
+
+        with inference.reporting_progress(abort):
+            with pytest.raises(Abort):
+                sample_posterior(regression_model, method, random_seed=1)
+
+    def test_nuts_uses_sampling_config(self, regression_model, monkeypatch):
+        """Test that NUTS is run through pm.sample with SAMPLING_CONFIG"""
+        calls = {}
+
+        def mock_sample(**kwargs):
+            calls.update(kwargs)
+            return 'trace'
+
+        monkeypatch.setattr(pm, 'sample', mock_sample)
+
+        assert sample_posterior(regression_model, 'nuts') == 'trace'
+        assert calls['draws'] == config.SAMPLING_CONFIG['draws']
+        assert (calls['chains'], calls['cores']) == sampling_resources()
+        assert calls['nuts_sampler'] == 'pymc'
+
+    def test_unknown_method(self, regression_model):
+        """Test that unknown methods are rejected"""
+        with pytest.raises(ValueError):
+            sample_posterior(regression_model, 'gibbs')
+
+    def test_sampling_resources(self, monkeypatch):
+        """Test that automatic chains and cores follow the available CPUs"""
+        monkeypatch.setattr(inference, 'available_cpus', lambda: 32)
+        assert sampling_resources({'chains': 'auto', 'min_chains': 2, 'max_chains': 8, 'cores': 'auto'}) == (8, 8)
+        assert sampling_resources({'chains': 4, 'cores': 'auto'}) == (4, 4)
+
+        monkeypatch.setattr(inference, 'available_cpus', lambda: 1)
+        assert sampling_resources({'chains': 'auto', 'min_chains': 2, 'max_chains': 8, 'cores': 'auto'}) == (2, 1)
+
+    def test_nuts_sampler_fallback(self, monkeypatch):
+        """Test that a missing backend falls back to the PyMC sampler"""
+        monkeypatch.setattr(inference.importlib.util, 'find_spec', lambda name: None)
+
+        assert resolve_nuts_sampler('numpyro') == 'pymc'
+        with pytest.raises(ValueError):
+            resolve_nuts_sampler('stan')
@@ -0,0 +1,137 @@
+"""
+Unit tests for the background job queue
+"""
+import threading
+import time
+
+import pytest
+
+from marketing_models import inference
+from marketing_models.jobs import JobManager, JobCancelled, _run_job, format_job_status
+
+def add(a, b):
+    return a + b
+
+def fail():
+    raise ValueError("bad input")
+
+def slow_fit(steps):
+    """Stand-in for a fit that reports progress like sample_posterior"""
+    for i in range(1, steps + 1):
+        time.sleep(0.05)
+        inference.report_progress('sampling', i, steps)
+    return steps
+
+def wait_for(manager, job_id, states, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.status(job_id)
+        if status['state'] in states:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"Job never reached {states}: {status}")
+
+@pytest.fixture(scope='module')
+def manager():
+    manager = JobManager(max_workers=1)
+    yield manager
+    manager.shutdown()
+
+class TestJobManager:
+    """Tests for the JobManager class"""
+
+    def test_result(self, manager):
+        """Test running a job to completion"""
+        job_id = manager.submit(add, 2, b=3)
+
+        assert manager.result(job_id, timeout=60) == 5
+        status = manager.status(job_id)
+        assert status['state'] == 'done'
+        assert status['name'] == 'add'
+
+    def test_failure(self, manager):
+        """Test that errors are reported in the job status"""
+        job_id = manager.submit(fail)
+
+        status = wait_for(manager, job_id, JobManager.FINISHED_STATES)
+        assert status['state'] == 'failed'
+        assert 'bad input' in format_job_status(status)
+        with pytest.raises(ValueError):
+            manager.result(job_id)
+
+    def test_progress_and_cancel(self, manager):
+        """Test progress streaming and cancelling running and queued jobs"""
+        running = manager.submit(slow_fit, 1000)
+        queued = manager.submit(add, 1, 1)
+
+        status = wait_for(manager, running, ['running'])
+        while status['progress']['phase'] != 'sampling':
+            status = manager.status(running)
+        assert status['progress']['total'] == 1000
+        assert 'sampling' in format_job_status(status)
+
+        # With one worker the second job is still waiting
+        assert manager.status(queued)['state'] == 'queued'
+        assert manager.cancel(queued)
+
+        assert manager.cancel(running)
+        status = wait_for(manager, running, JobManager.FINISHED_STATES)
+        assert status['state'] == 'cancelled'
+        assert status['progress']['done'] < 1000
+        assert wait_for(manager, queued, JobManager.FINISHED_STATES)['state'] == 'cancelled'
+        assert not manager.cancel(running)
+
+        manager.forget(running)
+        with pytest.raises(KeyError):
+            manager.status(running)
+
+    def test_cancel_customer_analysis(self):
+        """Test that a running customer segmentation stops when cancelled"""
+        from marketing_models.gradio_interface import generate_sample_customer_data, run_customer_analysis
+
+        cancelled = {}
+
+        class CancelOnStart(dict):
+            """Progress record that cancels the job once it is running"""
+            def __setitem__(self, job_id, value):
+                super().__setitem__(job_id, value)
+                cancelled[job_id] = True
+
+        progress = CancelOnStart()
+        args = (generate_sample_customer_data(), 'age, income, tenure', 3)
+        with pytest.raises(JobCancelled):
+            _run_job('job', progress, cancelled, run_customer_analysis, args, {})
+        assert progress['job']['phase'] == 'starting'
+
+    def test_progress_callback(self):
+        """Test counting NUTS draws over chains"""
+        reports = []
+        inference.set_progress_reporter(lambda *args: reports.append(args))
+        try:
+            callback = inference._progress_callback(tune=10, draws=30, chains=2)
+            for tuning in [True] * 20 + [False] * 60:
+                callback(None, type('Draw', (), {'tuning': tuning}))
+        finally:
+            inference.set_progress_reporter(None)
+
+        assert reports[0] == ('tuning', 20, 20)
+        assert reports[-1] == ('sampling', 60, 60)
+        assert ('sampling', 25, 60) in reports
+
+    def test_progress_reporter_per_thread(self):
+        """Test that concurrent fits in threads keep their own reporter"""
+        reports = {}
+
+        def fit(name):
+            with inference.reporting_progress(lambda *args: reports.setdefault(name, []).append(args)):
+                slow_fit(3)
+
+        threads = [threading.Thread(target=fit, args=(name,)) for name in ('a', 'b')]
+        with inference.reporting_progress(lambda *args: reports.setdefault('main', []).append(args)):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert reports['a'] == reports['b'] == [('sampling', i, 3) for i in (1, 2, 3)]
+        assert 'main' not in reports
@@ -8,6 +8,7 @@ import matplotlib.pyplot as plt
 
 from marketing_models.media_mix import MediaMixModel
 from marketing_models.config import DEFAULT_PRIORS, SAMPLING_CONFIG
+from marketing_models.posterior import hdi
 
 class TestMediaMixModel:
     """Tests for the MediaMixModel class"""
@@ -100,6 +101,77 @@ class TestMediaMixModel:
         assert model.trace is not None
         assert model.summary is not None
         
+    @pytest.mark.slow
+    def test_seasonal_fit(self, sample_mmm_data, tmp_path):
+        """Test a MAP fit with Fourier seasonality from model to scoring artifact"""
+        from marketing_models.scoring import MediaMixScorer
+        
+        channels = ['tv', 'radio', 'social', 'search', 'email']
+        model = MediaMixModel().fit(sample_mmm_data, channels, 'sales', date_col='date', method='map')
+        
+        gamma = model.trace.posterior['gamma_fourier']
+        assert list(gamma.coords['fourier'].values) == list(model.seasonality.columns)
+        
+        # The decomposition includes seasonality and adds up to the prediction
+        contributions = model.get_contributions()
+        assert 'seasonality' in set(contributions['component'])
+        totals = contributions.groupby('period', sort=False)['mean'].sum().values
+        assert np.allclose(totals, model.predict())
+        
+        # Later dates get their own seasonal terms, in the model and the scorer
+        future = sample_mmm_data.assign(date=sample_mmm_data['date'] + pd.Timedelta(days=30))
+        assert not np.allclose(model.predict(future), model.predict())
+        path = tmp_path / 'mmm.npz'
+        model.export_artifact(path, dtype='float64')
+        assert np.allclose(MediaMixScorer(path).predict(future), model.predict(future))
+        
+        # Without a date column the model has no seasonal terms
+        plain = MediaMixModel().fit(sample_mmm_data, channels, 'sales', method='map')
+        assert 'gamma_fourier' not in plain.trace.posterior
+    
+    @pytest.mark.slow
+    def test_predict_single_period(self, sample_mmm_data):
+        """Test that new periods get the training seasonality columns, however few"""
+        channels = ['tv', 'radio', 'social', 'search', 'email']
+        weekly = sample_mmm_data.assign(date=pd.date_range('2023-01-01', periods=30, freq='W'))
+        model = MediaMixModel().fit(weekly, channels, 'sales', date_col='date', method='map')
+        
+        # One period cannot tell the weekly spacing apart from daily data
+        assert model.predict(weekly.iloc[-1:]).shape == (1,)
+        assert model.predict(weekly.iloc[-3:]).shape == (3,)
+        full = model.get_contributions().set_index(['period', 'component'])['mean']
+        last = model.get_contributions(weekly.iloc[-1:]).set_index(['period', 'component'])['mean']
+        key = (weekly['date'].iloc[-1], 'seasonality')
+        assert last[key] == pytest.approx(full[key])
+    
+    @pytest.mark.slow
+    def test_fit_media_transforms(self):
+        """Test that carryover and saturation are fitted and used for every output"""
+        from marketing_models.transforms import geometric_adstock, hill_saturation
+        
+        rng = np.random.default_rng(7)
+        channels = ['tv', 'radio']
+        spend = rng.gamma(2.0, 1000.0, size=(120, 2))
+        media = hill_saturation(geometric_adstock(spend, np.array([0.6, 0.2])) / spend.max(axis=0))
+        data = pd.DataFrame(spend, columns=channels)
+        data['sales'] = 50000 + media @ np.array([20000.0, 8000.0]) + rng.normal(0, 500, size=120)
+        
+        model = MediaMixModel().fit(data, channels, 'sales', method='map')
+        posterior = model.trace.posterior
+        for name in ['adstock_alpha', 'saturation_half_saturation', 'saturation_slope']:
+            assert list(posterior[name].coords['channel'].values) == channels
+        assert posterior['adstock_alpha'].values.ravel()[0] > posterior['adstock_alpha'].values.ravel()[1]
+        
+        # Predictions, contributions and ROI use the same transformed media
+        assert np.sqrt(np.mean((model.predict() - data['sales']) ** 2)) < 1000
+        contributions = model.get_contributions()
+        totals = contributions.groupby('period', sort=False)['mean'].sum().values
+        assert np.allclose(totals, model.predict())
+        channel_totals = contributions.groupby('component')['mean'].sum()
+        roi = model.get_roi_estimates().set_index('Channel')['ROI']
+        for channel in channels:
+            assert roi[channel] == pytest.approx(channel_totals[channel] / data[channel].sum())
+    
     def test_roi_estimates(self, monkeypatch):
         """Test ROI estimation logic"""
         model = MediaMixModel()
@@ -216,4 +288,333 @@ class TestMediaMixModel:
         
         # Check that channels with higher betas get more budget
         # In our mock, social has the highest beta, followed by tv, then radio
-        assert optimal['social'] > optimal['tv'] > optimal['radio']
\ No newline at end of file
+        assert optimal['social'] > optimal['tv'] > optimal['radio']
+    
+    def test_budget_uses_fitted_curve(self):
+        """Test that the optimizer maximizes the model's own steady-state response"""
+        import arviz as az
+        from marketing_models.config import TRANSFORMATIONS
+        
+        model = MediaMixModel()
+        model.channels = ['tv', 'radio']
+        model.model = "dummy_model"
+        model.data = pd.DataFrame({'tv': [1000.0, 3000.0], 'radio': [500.0, 700.0]})
+        model.spend_scale = np.array([3000.0, 700.0])
+        
+        rng = np.random.default_rng(5)
+        model.trace = az.from_dict(
+            posterior={
+                'beta': rng.normal([5000.0, 2000.0], 200.0, size=(2, 100, 2)),
+                'adstock_alpha': rng.uniform(0.3, 0.7, size=(2, 100, 2)),
+                'saturation_half_saturation': rng.uniform(0.2, 1.5, size=(2, 100, 2)),
+                'saturation_slope': rng.uniform(0.8, 2.0, size=(2, 100, 2))
+            },
+            coords={'channel': model.channels},
+            dims={name: ['channel'] for name in
+                  ['beta', 'adstock_alpha', 'saturation_half_saturation', 'saturation_slope']}
+        )
+        
+        periods = 4
+        frontier = model.budget_scenarios([8000.0], periods=periods, use_posterior=True)
+        allocation = frontier[model.channels].values[0]
+        
+        # Spend held at allocation / periods until the carryover is saturated
+        n_periods = TRANSFORMATIONS['adstock']['max_lag'] + 1
+        X = np.tile(allocation / periods, (n_periods, 1))
+        steady = model._channel_draws(X, model._lagged_media(X), n_periods - 1, n_periods).sum(axis=2).mean()
+        assert frontier['Response'].iloc[0] == pytest.approx(steady * periods, rel=1e-6)
+        
+        # Uncertain saturation parameters make averaging differ from the plug-in curve
+        plug_in = model.optimize_budget(8000.0, periods=periods)
+        assert not np.allclose(list(plug_in.values()), allocation, rtol=1e-3)
+    
+    def test_predict(self):
+        """Test vectorized predictions and credible intervals"""
+        model = MediaMixModel()
+        model.channels = ['tv', 'radio']
+        model.model = "dummy_model"
+        model.data = pd.DataFrame({
+            'tv': [1000.0, 2000.0, 3000.0, 4000.0, 5000.0],
+            'radio': [500.0, 600.0, 700.0, 800.0, 900.0]
+        })
+        
+        # Mock the trace
+        import arviz as az
+        
+        rng = np.random.default_rng(0)
+        mock_posterior = {
+            "alpha": rng.normal(100, 5, size=(2, 50)),
+            "beta": rng.normal([0.5, 0.3], 0.05, size=(2, 50, 2))
+        }
+        coords = {"channel": model.channels}
+        dims = {"beta": ["channel"]}
+        model.trace = az.from_dict(posterior=mock_posterior, coords=coords, dims=dims)
+        
+        # Brute-force reference: one prediction per (chain, draw)
+        X = model.data[model.channels].values
+        reference = np.array([
+            mock_posterior["alpha"][c, d] + X @ mock_posterior["beta"][c, d]
+            for c in range(2) for d in range(50)
+        ])
+        
+        # Mean prediction
+        mean = model.predict()
+        assert mean.shape == (5,)
+        assert np.allclose(mean, reference.mean(axis=0))
+        
+        # Intervals, with chunking that does not divide the number of periods
+        intervals = model.predict(hdi_prob=0.9, chunk_size=2)
+        assert list(intervals.columns) == ['mean', 'hdi_lower', 'hdi_upper']
+        assert np.allclose(intervals['mean'], reference.mean(axis=0))
+        assert (intervals['hdi_lower'] <= intervals['mean']).all()
+        assert (intervals['mean'] <= intervals['hdi_upper']).all()
+        
+        # Chunking does not change the result
+        unchunked = model.predict(hdi_prob=0.9, chunk_size=1000)
+        pd.testing.assert_frame_equal(intervals, unchunked)
+    
+    def test_compact(self):
+        """Test that compacted traces predict like the full trace"""
+        import arviz as az
+        
+        model = MediaMixModel()
+        model.channels = ['tv', 'radio']
+        model.model = "dummy_model"
+        model.data = pd.DataFrame({
+            'tv': [1000.0, 2000.0, 3000.0, 4000.0, 5000.0],
+            'radio': [500.0, 600.0, 700.0, 800.0, 900.0]
+        })
+        
+        rng = np.random.default_rng(0)
+        model.trace = az.from_dict(
+            posterior={
+                "alpha": rng.normal(100, 5, size=(4, 500)),
+                "beta": rng.normal([0.5, 0.3], 0.05, size=(4, 500, 2))
+            },
+            sample_stats={"energy": rng.normal(size=(4, 500))},
+            coords={"channel": model.channels},
+            dims={"beta": ["channel"]}
+        )
+        full = model.predict()
+        full_roi = model.get_roi_estimates()
+        
+        model.compact(target_ess=500)
+        assert model.trace.groups() == ['posterior']
+        assert model.trace.posterior['beta'].dtype == np.float32
+        assert model.trace.posterior.sizes['draw'] < 500
+        
+        # Thinning independent draws only costs Monte Carlo error
+        assert np.allclose(model.predict(), full, rtol=5e-3)
+        assert np.allclose(model.get_roi_estimates()['ROI'], full_roi['ROI'], rtol=2e-2)
+    
+    def test_contributions(self):
+        """Test the per-period decomposition into baseline and channels"""
+        import arviz as az
+        
+        model = MediaMixModel()
+        model.channels = ['tv', 'radio']
+        model.target = 'sales'
+        model.model = "dummy_model"
+        model.data = pd.DataFrame({
+            'tv': [1000.0, 2000.0, 3000.0, 4000.0, 5000.0],
+            'radio': [500.0, 600.0, 700.0, 800.0, 900.0],
+            'sales': [2000.0, 2500.0, 3000.0, 3500.0, 4000.0]
+        })
+        
+        rng = np.random.default_rng(0)
+        beta = rng.normal([0.5, 0.3], 0.05, size=(2, 50, 2))
+        model.trace = az.from_dict(
+            posterior={"alpha": rng.normal(100, 5, size=(2, 50)), "beta": beta},
+            coords={"channel": model.channels},
+            dims={"beta": ["channel"]}
+        )
+        
+        contributions = model.get_contributions(hdi_prob=0.9, chunk_size=2)
+        assert len(contributions) == 5 * 3
+        assert list(contributions['component'][:3]) == ['baseline', 'tv', 'radio']
+        
+        # Components add up to the mean prediction of every period
+        totals = contributions.groupby('period', sort=False)['mean'].sum().values
+        assert np.allclose(totals, model.predict())
+        
+        # Channel draws are beta * spend, so intervals scale with spend
+        tv = contributions[contributions['component'] == 'tv']
+        lower, upper = hdi(beta[..., 0].ravel() * 5000.0, 0.9)
+        assert tv['hdi_lower'].iloc[-1] == pytest.approx(lower)
+        assert tv['hdi_upper'].iloc[-1] == pytest.approx(upper)
+        assert (contributions['hdi_lower'] <= contributions['mean']).all()
+        
+        # Chunking does not change the result
+        pd.testing.assert_frame_equal(contributions, model.get_contributions(hdi_prob=0.9))
+        
+        fig = model.plot_contributions()
+        assert fig is not None
+        plt.close(fig)
+    
+    def test_roi_posterior_quantiles(self):
+        """Test ROI quantiles and reuse of the cached ROI posterior"""
+        model = MediaMixModel()
+        model.channels = ['tv', 'radio']
+        model.model = "dummy_model"
+        model.data = pd.DataFrame({
+            'tv': [1000.0, 3000.0],
+            'radio': [500.0, 700.0]
+        })
+        
+        import arviz as az
+        
+        rng = np.random.default_rng(3)
+        mock_beta = rng.normal([0.5, 0.3], 0.1, size=(2, 100, 2))
+        model.trace = az.from_dict(
+            posterior={"beta": mock_beta},
+            coords={"channel": model.channels},
+            dims={"beta": ["channel"]}
+        )
+        
+        roi_samples = model.get_roi_posterior()
+        assert roi_samples.shape == (200, 2)
+        assert model.get_roi_posterior() is roi_samples
+        
+        roi_df = model.get_roi_estimates(quantiles=[0.5]).set_index('Channel')
+        expected = mock_beta.reshape(-1, 2) / np.array([2000.0, 600.0])
+        
+        for i, channel in enumerate(model.channels):
+            assert np.isclose(roi_df.loc[channel, 'ROI'], expected[:, i].mean())
+            assert np.isclose(roi_df.loc[channel, 'Lower_CI'], np.percentile(expected[:, i], 2.5))
+            assert np.isclose(roi_df.loc[channel, 'Upper_CI'], np.percentile(expected[:, i], 97.5))
+            assert np.isclose(roi_df.loc[channel, 'Q0.5'], np.median(expected[:, i]))
+        
+        # A new trace invalidates the cached ROI posterior
+        model.trace = az.from_dict(
+            posterior={"beta": mock_beta * 2},
+            coords={"channel": model.channels},
+            dims={"beta": ["channel"]}
+        )
+        assert np.allclose(model.get_roi_posterior(), roi_samples * 2)
+    
+    def test_update_warm_start(self, sample_mmm_data, monkeypatch):
+        """Test that update refits on the extended data from the current posterior"""
+        import arviz as az
+        import pymc as pm
+        from marketing_models.config import SAMPLING_CONFIG
+        
+        model = MediaMixModel()
+        channels = ['tv', 'radio', 'social', 'search', 'email']
+        
+        def mock_build_model(X, y):
+            with pm.Model() as model.model:
+                pm.Normal('alpha', 0, 1)
+                pm.Normal('beta', 0, 1, shape=len(channels))
+                pm.HalfNormal('sigma', 1)
+        
+        calls = []
+        
+        def mock_sample(**kwargs):
+            calls.append(kwargs)
+            rng = np.random.default_rng(len(calls))
+            return az.from_dict(posterior={
+                "alpha": rng.normal(1, 0.1, size=(2, 10)),
+                "beta": rng.normal(0.5, 0.1, size=(2, 10, 5)),
+                "sigma": rng.gamma(2, 0.1, size=(2, 10))
+            })
+        
+        monkeypatch.setattr(model, "build_model", mock_build_model)
+        monkeypatch.setattr(pm, "sample", mock_sample)
+        
+        model.fit(sample_mmm_data.iloc[:23], channels, 'sales', method='nuts')
+        previous_beta = model.trace.posterior['beta'].values.mean(axis=(0, 1))
+        model.update(sample_mmm_data.iloc[23:], method='nuts')
+        
+        # The refit covers all periods and starts from the previous posterior
+        assert len(model.data) == len(sample_mmm_data)
+        assert calls[0]['initvals'] is None
+        assert calls[1]['tune'] == SAMPLING_CONFIG['update_tune']
+        assert set(calls[1]['initvals']) == {'alpha', 'beta', 'sigma'}
+        assert np.allclose(calls[1]['initvals']['beta'], previous_beta)
+    
+    def test_update_informed_priors_history(self, sample_mmm_data, monkeypatch):
+        """Test that informed updates keep the full history and cold priors for later fits"""
+        import arviz as az
+        import pymc as pm
+        
+        model = MediaMixModel()
+        channels = ['tv', 'radio', 'social', 'search', 'email']
+        calls = []
+        
+        def mock_build_model(X, y, posterior=None, start=0):
+            calls.append({'X': X, 'posterior': posterior, 'start': start})
+            with pm.Model() as model.model:
+                pm.Normal('alpha', 0, 1)
+        
+        def mock_sample(**kwargs):
+            rng = np.random.default_rng(len(calls))
+            return az.from_dict(posterior={
+                "alpha": rng.normal(1, 0.1, size=(2, 10)),
+                "beta": rng.normal(0.5, 0.1, size=(2, 10, 5)),
+                "sigma": rng.gamma(2, 0.1, size=(2, 10)),
+                "gamma_fourier": rng.normal(0, 1, size=(2, 10, model.seasonality.shape[1]))
+            })
+        
+        monkeypatch.setattr(model, "build_model", mock_build_model)
+        monkeypatch.setattr(pm, "sample", mock_sample)
+        
+        model.fit(sample_mmm_data.iloc[:20], channels, 'sales', 'date', method='nuts')
+        columns = list(model.seasonality.columns)
+        spend_scale = model.spend_scale
+        
+        # Two updates in a row, each centred on the posterior before it
+        for stop in (25, 30):
+            previous = model._posterior_moments()
+            history = len(model.data)
+            model.update(sample_mmm_data.iloc[history:stop], informed_priors=True, method='nuts')
+            
+            assert calls[-1]['start'] == history
+            assert len(calls[-1]['X']) == stop
+            assert calls[-1]['posterior'] == previous
+            assert 'posterior' not in model.priors
+            assert len(model.data) == stop
+            assert list(model.seasonality.columns) == columns
+            assert np.array_equal(model.spend_scale, spend_scale)
+            assert len(model.predict()) == stop
+        
+        pd.testing.assert_frame_equal(model.data, sample_mmm_data)
+        
+        # A later fit starts from the cold priors again
+        model.fit(sample_mmm_data, channels, 'sales', 'date', method='nuts')
+        assert calls[-1]['posterior'] is None
+        assert calls[-1]['start'] == 0
+    
+    @pytest.mark.slow
+    def test_update_informed_priors(self, sample_mmm_data, monkeypatch):
+        """Test that an informed update carries the history into the priors"""
+        monkeypatch.setitem(SAMPLING_CONFIG, 'draws', 200)
+        monkeypatch.setitem(SAMPLING_CONFIG, 'tune', 200)
+        channels = ['tv', 'radio', 'social', 'search', 'email']
+        history, new = sample_mmm_data.iloc[:20], sample_mmm_data.iloc[20:]
+        
+        model = MediaMixModel().fit(history, channels, 'sales', method='nuts')
+        previous = model.trace.posterior['beta'].values.mean(axis=(0, 1))
+        
+        build_model = model.build_model
+        posteriors = []
+        
+        def recording_build_model(X, y, posterior=None, start=0):
+            posteriors.append(posterior)
+            build_model(X, y, posterior=posterior, start=start)
+        
+        monkeypatch.setattr(model, "build_model", recording_build_model)
+        model.update(new, informed_priors=True, method='nuts', tune=200)
+        cold = MediaMixModel().fit(new, channels, 'sales', method='nuts')
+        
+        # The priors are centred on the history posterior
+        assert set(posteriors[0]) == {
+            'alpha', 'beta', 'sigma', 'adstock_alpha', 'saturation_half_saturation', 'saturation_slope'
+        }
+        assert np.allclose(posteriors[0]['beta']['mu'], previous)
+        assert len(model.data) == len(sample_mmm_data)
+        
+        # ...so the same periods give a tighter posterior than a cold fit
+        informed_beta = model.trace.posterior['beta'].values.reshape(-1, len(channels))
+        cold_beta = cold.trace.posterior['beta'].values.reshape(-1, len(channels))
+        assert not np.allclose(informed_beta.mean(axis=0), cold_beta.mean(axis=0))
+        assert np.all(informed_beta.std(axis=0) < cold_beta.std(axis=0))
@@ -0,0 +1,108 @@
+"""
+Unit tests for the MongoDB media mix data feed
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+from marketing_models.mongo_feed import pivot_dense, load_mmm_data, build_channel_spend_pipeline
+from marketing_models.media_mix import MediaMixModel
+
+class FakeCampaigns:
+    """Minimal stand-in for the campaigns collection"""
+
+    def __init__(self, spend_rows, outcome_rows):
+        self.spend_rows = spend_rows
+        self.outcome_rows = outcome_rows
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        # The spend pipeline is the only one that unwinds channels
+        if any("$unwind" in stage for stage in pipeline):
+            return iter(self.spend_rows)
+        return iter(self.outcome_rows)
+
+class FakeDatabase:
+    def __init__(self, campaigns):
+        self.campaigns = campaigns
+
+@pytest.fixture
+def fake_db():
+    """Database returning pre-aggregated spend and outcome rows"""
+    spend_rows = [
+        {"_id": {"date": "2024-01-01", "channel": "tv"}, "spend": 100.0},
+        {"_id": {"date": "2024-01-01", "channel": "email"}, "spend": 20.0},
+        {"_id": {"date": "2024-01-03", "channel": "tv"}, "spend": 50.0},
+    ]
+    outcome_rows = [
+        {"_id": "2024-01-01", "outcome": 7},
+        {"_id": "2024-01-04", "outcome": 3},
+    ]
+    return FakeDatabase(FakeCampaigns(spend_rows, outcome_rows))
+
+class TestMongoFeed:
+    """Tests for the MongoDB to DataFrame feed"""
+
+    def test_pivot_dense(self):
+        """Test that duplicate cells are summed into the dense matrix"""
+        matrix = pivot_dense([0, 1, 1, 0], [1, 0, 0, 1], [1.0, 2.0, 3.0, 4.0], 2, 2)
+
+        assert matrix.shape == (2, 2)
+        assert np.array_equal(matrix, np.array([[0.0, 5.0], [5.0, 0.0]]))
+
+    def test_spend_pipeline_matches_client(self):
+        """Test that the pipeline filters on the client reference"""
+        client_id = str(ObjectId())
+        pipeline = build_channel_spend_pipeline(client_id)
+
+        assert pipeline[0]["$match"]["client.$id"] == ObjectId(client_id)
+        assert pipeline[0]["$match"]["isActive"] is True
+
+    def test_load_mmm_data(self, fake_db):
+        """Test that spend and outcome are pivoted onto a dense calendar"""
+        data = load_mmm_data(fake_db, str(ObjectId()))
+
+        # Calendar covers every day between the first and last record
+        assert list(data['date']) == list(pd.date_range('2024-01-01', '2024-01-04'))
+        assert list(data.columns) == ['date', 'email', 'tv', 'conversions']
+
+        assert np.array_equal(data['tv'].values, [100.0, 0.0, 50.0, 0.0])
+        assert np.array_equal(data['email'].values, [20.0, 0.0, 0.0, 0.0])
+        assert np.array_equal(data['conversions'].values, [7.0, 0.0, 0.0, 3.0])
+
+    def test_load_mmm_data_resampled(self, fake_db):
+        """Test weekly aggregation of the daily matrix"""
+        data = load_mmm_data(fake_db, str(ObjectId()), freq='W')
+
+        assert data['tv'].sum() == 150.0
+        assert data['conversions'].sum() == 10.0
+
+    def test_load_mmm_data_empty(self):
+        """Test that a client without campaigns raises an error"""
+        db = FakeDatabase(FakeCampaigns([], []))
+
+        with pytest.raises(ValueError):
+            load_mmm_data(db, str(ObjectId()))
+
+    def test_fit_from_mongo(self, fake_db, monkeypatch):
+        """Test that the loaded frame is passed to fit with the channel columns"""
+        model = MediaMixModel()
+        calls = {}
+
+        def mock_fit(data, channels, target, date_col=None):
+            calls['data'] = data
+            calls['date_col'] = date_col
+            calls['channels'] = channels
+            calls['target'] = target
+            return model
+
+        monkeypatch.setattr(model, "fit", mock_fit)
+
+        model.fit_from_mongo(fake_db, str(ObjectId()))
+
+        assert calls['channels'] == ['email', 'tv']
+        assert calls['target'] == 'conversions'
+        assert calls['date_col'] == 'date'
+        assert len(calls['data']) == 4
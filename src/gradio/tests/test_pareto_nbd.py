@@ -0,0 +1,74 @@
+"""
+Unit tests for the Pareto/NBD customer-level expressions
+"""
+import numpy as np
+from scipy.special import hyp2f1
+
+from marketing_models.pareto_nbd import (
+    log_hyp2f1, probability_alive, log_probability_alive, expected_purchases
+)
+
+def direct_probability_alive(r, alpha, s, beta, x, t_x, T):
+    """P(alive) evaluated term by term as in Fader, Hardie and Lee (2005)"""
+    rsx = r + s + x
+    if alpha >= beta:
+        z = lambda t: (alpha - beta) / (alpha + t)
+        b, base = s + 1, alpha
+    else:
+        z = lambda t: (beta - alpha) / (beta + t)
+        b, base = r + x, beta
+    a0 = (hyp2f1(rsx, b, rsx + 1, z(t_x)) / (base + t_x) ** rsx
+          - hyp2f1(rsx, b, rsx + 1, z(T)) / (base + T) ** rsx)
+    return 1 / (1 + s / rsx * (alpha + T) ** (r + x) * (beta + T) ** s * a0)
+
+class TestParetoNBD:
+    """Tests for the log-space Pareto/NBD expressions"""
+    
+    def test_log_hyp2f1(self):
+        """Test the series against scipy"""
+        a = np.array([3.0, 10.0, 50.0, 5.5, 2.0])
+        b = np.array([1.5, 4.0, 20.0, 6.0, 2.5])
+        z = np.array([0.2, 0.7, 0.95, 0.0, 0.5])
+        assert np.allclose(np.exp(log_hyp2f1(a, b, z)), hyp2f1(a, b, a + 1, z), rtol=1e-10)
+    
+    def test_probability_alive(self):
+        """Test against the direct formula on both branches of A0"""
+        rng = np.random.default_rng(0)
+        for alpha, beta in [(12.0, 4.0), (4.0, 12.0), (6.0, 6.0)]:
+            x = rng.poisson(3, size=20).astype(float)
+            T = 20 + rng.gamma(2, 10, size=20)
+            t_x = rng.uniform(0, 1, size=20) * T
+            
+            expected = [direct_probability_alive(0.8, alpha, 1.5, beta, *customer) for customer in zip(x, t_x, T)]
+            assert np.allclose(probability_alive(0.8, alpha, 1.5, beta, x, t_x, T), expected)
+        
+        # A purchase at the end of the observation period means still alive
+        assert np.isclose(probability_alive(0.8, 12.0, 1.5, 4.0, 5.0, 40.0, 40.0), 1.0)
+    
+    def test_large_histories(self):
+        """Test that frequent, long-lived customers stay finite"""
+        x = np.array([0.0, 50.0, 500.0, 5000.0])
+        T = np.array([3650.0, 3650.0, 3650.0, 3650.0])
+        
+        # The direct formula overflows here: (alpha + T)^(r + x) is inf
+        recent = log_probability_alive(0.8, 12.0, 1.5, 4.0, x, T - 1, T)
+        lapsed = log_probability_alive(0.8, 12.0, 1.5, 4.0, x, T / 2, T)
+        assert np.all(np.isfinite(recent)) and np.all(np.isfinite(lapsed))
+        assert np.all(lapsed <= recent)
+        # Frequent buyers who went quiet for half their tenure are gone
+        assert np.exp(lapsed[-1]) < 1e-6
+        
+        purchases = expected_purchases(30, 0.8, 12.0, 1.5, 4.0, x, T - 1, T)
+        assert np.all(np.isfinite(purchases)) and np.all(np.diff(purchases) > 0)
+    
+    def test_expected_purchases(self):
+        """Test the closed form, including its limit at s = 1"""
+        r, alpha, s, beta, x, t_x, T, t = 0.8, 12.0, 1.5, 4.0, 3.0, 15.0, 40.0, 30.0
+        
+        p_alive = direct_probability_alive(r, alpha, s, beta, x, t_x, T)
+        expected = ((r + x) * (beta + T) / ((alpha + T) * (s - 1))
+                    * (1 - ((beta + T) / (beta + T + t)) ** (s - 1)) * p_alive)
+        assert np.isclose(expected_purchases(t, r, alpha, s, beta, x, t_x, T), expected)
+        
+        near = expected_purchases(t, r, alpha, [1 - 1e-6, 1.0, 1 + 1e-6], beta, x, t_x, T)
+        assert np.allclose(near, near[1], rtol=1e-5)
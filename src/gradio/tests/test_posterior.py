@@ -0,0 +1,96 @@
+"""
+Unit tests for the posterior helper functions
+"""
+import pytest
+import numpy as np
+import arviz as az
+
+from marketing_models.posterior import (
+    stack_draws, hdi, summarize_samples, compact_trace, thinning_step, trace_nbytes
+)
+
+class TestPosterior:
+    """Tests for posterior draw utilities"""
+
+    def test_stack_draws(self):
+        """Test that chains and draws are merged in order"""
+        values = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+        stacked = stack_draws(values)
+
+        assert stacked.shape == (6, 4)
+        assert np.array_equal(stacked[3], values[1, 0])
+
+    def test_hdi_matches_arviz(self):
+        """Test the vectorized HDI against ArviZ"""
+        rng = np.random.default_rng(1)
+        samples = rng.gamma(2.0, 1.0, size=(1000, 3))
+
+        lower, upper = hdi(samples, prob=0.9)
+        expected = az.hdi(samples[np.newaxis], hdi_prob=0.9)
+
+        assert np.allclose(lower, expected[:, 0])
+        assert np.allclose(upper, expected[:, 1])
+
+    def test_hdi_axis(self):
+        """Test computing intervals along a non-leading axis"""
+        rng = np.random.default_rng(2)
+        samples = rng.normal(size=(4, 500))
+
+        lower, upper = hdi(samples, prob=0.8, axis=1)
+        expected_lower, expected_upper = hdi(samples.T, prob=0.8, axis=0)
+
+        assert np.array_equal(lower, expected_lower)
+        assert np.array_equal(upper, expected_upper)
+
+    def test_hdi_invalid_prob(self):
+        """Test that probabilities outside (0, 1) are rejected"""
+        with pytest.raises(ValueError):
+            hdi(np.zeros(10), prob=1.5)
+
+    def test_summarize_samples_matches_numpy(self):
+        """Test one-pass quantiles against numpy.quantile"""
+        rng = np.random.default_rng(4)
+        samples = rng.lognormal(size=(999, 5))
+        quantiles = [0.0, 0.025, 0.5, 0.975, 1.0]
+
+        mean, values = summarize_samples(samples, quantiles)
+
+        assert np.allclose(mean, samples.mean(axis=0))
+        assert np.allclose(values, np.quantile(samples, quantiles, axis=0))
+
+    def test_compact_trace(self):
+        """Test downcasting, dropping groups and thinning to a target ESS"""
+        rng = np.random.default_rng(0)
+
+        # Strongly autocorrelated AR(1) chains around known means
+        noise = rng.normal(size=(4, 2000, 3))
+        draws = np.empty_like(noise)
+        draws[:, 0] = noise[:, 0]
+        for t in range(1, draws.shape[1]):
+            draws[:, t] = 0.9 * draws[:, t - 1] + np.sqrt(1 - 0.81) * noise[:, t]
+        trace = az.from_dict(
+            posterior={'beta': draws + [1.0, 2.0, 3.0], 'sigma': np.exp(draws[..., 0])},
+            sample_stats={'energy': rng.normal(size=(4, 2000)), 'tree_depth': np.ones((4, 2000), dtype=int)},
+            dims={'beta': ['channel']}
+        )
+
+        compact = compact_trace(trace)
+        assert compact.groups() == ['posterior']
+        assert compact.posterior['beta'].dtype == np.float32
+        assert trace_nbytes(trace) / trace_nbytes(compact) > 2.5
+
+        thinned = compact_trace(trace, target_ess=200)
+        step = thinned.posterior.attrs['thinning_step']
+        assert step == thinning_step(trace.posterior, 200) > 1
+        assert thinned.posterior.sizes['draw'] == 2000 // step
+        assert float(az.ess(thinned.posterior)['beta'].min()) > 150
+        assert trace_nbytes(trace) / trace_nbytes(thinned) > 2.5 * step
+
+        # Posterior means stay within a fraction of the posterior sd
+        error = np.abs(thinned.posterior['beta'].mean(('chain', 'draw')) - trace.posterior['beta'].mean(('chain', 'draw')))
+        assert (error < 0.1).all()
+
+    def test_thinning_step_short_posterior(self):
+        """Test that single-draw posteriors such as MAP are never thinned"""
+        trace = az.from_dict(posterior={'alpha': np.ones((1, 1))})
+        assert thinning_step(trace.posterior, 100) == 1
@@ -0,0 +1,164 @@
+"""
+Unit tests for the RFM summary builder
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from marketing_models.rfm import summarize_transactions, summarize_transactions_chunked
+from marketing_models.clv import CustomerLifetimeValue
+
+@pytest.fixture
+def sample_transactions():
+    """Small transaction log with repeat and same-day purchases"""
+    return pd.DataFrame({
+        'customer': ['a', 'a', 'a', 'b', 'c', 'c', 'a'],
+        'date': pd.to_datetime([
+            '2024-01-01', '2024-01-05', '2024-01-05',
+            '2024-01-03', '2024-01-02', '2024-01-10', '2024-01-08'
+        ]),
+        'amount': [10.0, 20.0, 5.0, 30.0, 40.0, 60.0, 15.0]
+    })
+
+class TestRFM:
+    """Tests for building frequency/recency/T/monetary summaries"""
+
+    def test_summarize_transactions(self, sample_transactions):
+        """Test the in-memory summary against hand-computed values"""
+        summary = summarize_transactions(
+            sample_transactions, 'customer', 'date', 'amount'
+        ).set_index('customer_id')
+
+        # Customer a: purchases on days 1, 5 (two orders) and 8
+        assert summary.loc['a', 'frequency'] == 2
+        assert summary.loc['a', 'recency'] == 7
+        assert summary.loc['a', 'T'] == 9
+        assert np.isclose(summary.loc['a', 'monetary_value'], (25.0 + 15.0) / 2)
+
+        # Customer b: single purchase
+        assert summary.loc['b', 'frequency'] == 0
+        assert summary.loc['b', 'recency'] == 0
+        assert summary.loc['b', 'monetary_value'] == 0
+
+        # Customer c: first purchase on day 2, repeat on day 10
+        assert summary.loc['c', 'frequency'] == 1
+        assert summary.loc['c', 'recency'] == 8
+        assert summary.loc['c', 'T'] == 8
+        assert np.isclose(summary.loc['c', 'monetary_value'], 60.0)
+
+    def test_observation_end(self, sample_transactions):
+        """Test that T is measured to the given observation end"""
+        summary = summarize_transactions(
+            sample_transactions, 'customer', 'date', observation_end='2024-01-31'
+        ).set_index('customer_id')
+
+        assert summary.loc['a', 'T'] == 30
+        assert (summary['monetary_value'] == 0).all()
+
+    def test_transactions_after_observation_end(self, sample_transactions):
+        """Test that transactions after the observation end are dropped on every path"""
+        end = '2024-01-06'
+        expected = summarize_transactions(
+            sample_transactions[sample_transactions['date'] <= end], 'customer', 'date', 'amount',
+            observation_end=end
+        )
+        summary = summarize_transactions(
+            sample_transactions, 'customer', 'date', 'amount', observation_end=end
+        )
+        pd.testing.assert_frame_equal(summary, expected)
+        assert (summary['recency'] <= summary['T']).all()
+
+        # Customer a's day-8 purchase and c's day-10 repeat fall outside the window
+        summary = summary.set_index('customer_id')
+        assert summary.loc['a', 'frequency'] == 1
+        assert summary.loc['c', 'frequency'] == 0
+        assert summary.loc['c', 'T'] == 4
+
+        ordered = sample_transactions.sort_values('date', kind='stable')
+        chunks = [ordered.iloc[i:i + 2] for i in range(0, len(ordered), 2)]
+        for is_ordered in [False, True]:
+            result = summarize_transactions_chunked(
+                chunks, 'customer', 'date', 'amount', observation_end=end, ordered=is_ordered
+            )
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_chunked_matches_in_memory(self, sample_transactions):
+        """Test that chunked processing reproduces the in-memory summary"""
+        expected = summarize_transactions(sample_transactions, 'customer', 'date', 'amount')
+
+        # Split so that customer a's same-day orders land in different chunks
+        shuffled = sample_transactions.sample(frac=1, random_state=0)
+        chunks = [shuffled.iloc[i:i + 2] for i in range(0, len(shuffled), 2)]
+        result = summarize_transactions_chunked(chunks, 'customer', 'date', 'amount')
+
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_chunked_ordered(self, sample_transactions):
+        """Test the per-customer state path on a log ordered by date"""
+        expected = summarize_transactions(sample_transactions, 'customer', 'date', 'amount')
+
+        # Customer a's two orders on 2024-01-05 are split across chunks
+        ordered = sample_transactions.sort_values('date', kind='stable')
+        chunks = [ordered.iloc[i:i + 4] for i in range(0, len(ordered), 4)]
+        result = summarize_transactions_chunked(chunks, 'customer', 'date', 'amount', ordered=True)
+
+        pd.testing.assert_frame_equal(result, expected)
+
+        shuffled = sample_transactions.sample(frac=1, random_state=0)
+        chunks = [shuffled.iloc[i:i + 2] for i in range(0, len(shuffled), 2)]
+        with pytest.raises(ValueError):
+            summarize_transactions_chunked(chunks, 'customer', 'date', 'amount', ordered=True)
+
+    def test_chunked_from_csv(self, sample_transactions, tmp_path):
+        """Test reading a transaction CSV in chunks"""
+        path = tmp_path / 'transactions.csv'
+        sample_transactions.to_csv(path, index=False)
+
+        expected = summarize_transactions(sample_transactions, 'customer', 'date', 'amount')
+        result = summarize_transactions_chunked(
+            str(path), 'customer', 'date', 'amount', chunksize=3
+        )
+
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_weekly_periods(self, sample_transactions):
+        """Test that purchases within the same week count once"""
+        summary = summarize_transactions(
+            sample_transactions, 'customer', 'date', freq='W'
+        ).set_index('customer_id')
+
+        assert summary['frequency'].max() <= 1
+
+    def test_invalid_frequency(self, sample_transactions):
+        """Test that unsupported period lengths are rejected"""
+        with pytest.raises(ValueError):
+            summarize_transactions(sample_transactions, 'customer', 'date', freq='H')
+
+    def test_fit_from_transactions(self, sample_transactions, monkeypatch):
+        """Test that the summary is passed to the CLV fit"""
+        model = CustomerLifetimeValue()
+        calls = {}
+
+        def mock_fit(data, frequency_col, recency_col, T_col, monetary_col=None):
+            calls['data'] = data
+            calls['monetary_col'] = monetary_col
+            return model
+
+        monkeypatch.setattr(model, "fit", mock_fit)
+
+        model.fit_from_transactions(sample_transactions, 'customer', 'date', 'amount', chunksize=2)
+
+        assert len(calls['data']) == 3
+        assert calls['monetary_col'] == 'monetary_value'
+
+        # Ordered logs use the per-customer state path
+        ordered = sample_transactions.sort_values('date', kind='stable')
+        model.fit_from_transactions(ordered, 'customer', 'date', 'amount', chunksize=2, ordered=True)
+        pd.testing.assert_frame_equal(
+            calls['data'], summarize_transactions(sample_transactions, 'customer', 'date', 'amount')
+        )
+
+        with pytest.raises(ValueError):
+            model.fit_from_transactions(
+                ordered.iloc[::-1], 'customer', 'date', 'amount', chunksize=2, ordered=True
+            )
@@ -0,0 +1,116 @@
+"""
+Unit tests for the NumPy-only scoring artifacts
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+import numpy as np
+import pandas as pd
+import arviz as az
+
+from marketing_models.media_mix import MediaMixModel
+from marketing_models.clv import CustomerLifetimeValue
+from marketing_models.seasonality import fourier_features
+from marketing_models.scoring import MediaMixScorer, CLVScorer, load_artifact
+
+@pytest.fixture
+def fitted_mmm():
+    """MediaMixModel with a mock seasonal posterior"""
+    rng = np.random.default_rng(0)
+    model = MediaMixModel()
+    model.channels = ['tv', 'radio']
+    model.target = 'sales'
+    model.date_col = 'date'
+    model.model = "dummy_model"
+    model.data = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=20, freq='D'),
+        'tv': rng.gamma(5, 1000, size=20),
+        'radio': rng.gamma(2, 800, size=20)
+    })
+    model.seasonality = fourier_features(model.data['date'])
+    n_fourier = model.seasonality.shape[1]
+    model.trace = az.from_dict(
+        posterior={
+            'alpha': rng.normal(100, 5, size=(2, 50)),
+            'beta': rng.normal([0.5, 0.3], 0.05, size=(2, 50, 2)),
+            'gamma_fourier': rng.normal(0, 10, size=(2, 50, n_fourier))
+        },
+        coords={'channel': model.channels, 'fourier': list(model.seasonality.columns)},
+        dims={'beta': ['channel'], 'gamma_fourier': ['fourier']}
+    )
+    return model
+
+class TestScoring:
+    """Tests for exporting models and scoring with the artifacts"""
+
+    def test_mmm_scorer(self, fitted_mmm, tmp_path):
+        """Test that the scorer reproduces predictions and ROI"""
+        path = tmp_path / 'mmm.npz'
+        fitted_mmm.export_artifact(path, dtype='float64')
+        scorer = MediaMixScorer(path)
+
+        new_data = pd.DataFrame({
+            'date': pd.date_range('2024-02-01', periods=5, freq='D'),
+            'tv': [1000.0, 2000.0, 3000.0, 4000.0, 5000.0],
+            'radio': [500.0, 600.0, 700.0, 800.0, 900.0]
+        })
+        assert np.allclose(scorer.predict(new_data), fitted_mmm.predict(new_data))
+
+        # Plain dicts of arrays work as input, no pandas needed
+        intervals = scorer.predict({col: new_data[col].values for col in new_data}, hdi_prob=0.9)
+        expected = fitted_mmm.predict(new_data, hdi_prob=0.9)
+        for column in ['mean', 'hdi_lower', 'hdi_upper']:
+            assert np.allclose(intervals[column], expected[column])
+
+        roi = pd.DataFrame(scorer.roi_estimates(quantiles=[0.5]))
+        pd.testing.assert_frame_equal(
+            roi, fitted_mmm.get_roi_estimates(quantiles=[0.5]).reset_index(drop=True)
+        )
+
+    def test_float32_artifact(self, fitted_mmm, tmp_path):
+        """Test that default float32 artifacts predict within tolerance"""
+        path = tmp_path / 'mmm.npz'
+        fitted_mmm.export_artifact(path)
+
+        metadata, arrays = load_artifact(path, kind='mmm')
+        assert arrays['beta'].dtype == np.float32
+        assert metadata['channels'] == ['tv', 'radio']
+        assert np.allclose(MediaMixScorer(path).predict(fitted_mmm.data), fitted_mmm.predict(), rtol=1e-5)
+
+        with pytest.raises(ValueError):
+            CLVScorer(path)
+
+    def test_clv_scorer(self, sample_clv_data, tmp_path):
+        """Test that the CLV scorer matches the model predictions"""
+        rng = np.random.default_rng(0)
+        model = CustomerLifetimeValue()
+        model.model = "dummy_model"
+        model.prepare_data(sample_clv_data, 'frequency', 'recency', 'T')
+        model.trace = az.from_dict(posterior={
+            'r': rng.gamma(2, 0.5, size=(2, 30)),
+            'alpha': rng.gamma(10, 1, size=(2, 30)),
+            's': rng.gamma(2, 0.5, size=(2, 30)),
+            'beta': rng.gamma(10, 2, size=(2, 30))
+        })
+
+        path = tmp_path / 'clv.npz'
+        model.export_artifact(path, dtype='float64')
+        scorer = CLVScorer(path)
+
+        inputs = [sample_clv_data[col].values for col in ('frequency', 'recency', 'T')]
+        assert np.allclose(scorer.predict_probability_alive(*inputs), model.predict_probability_alive())
+        assert np.allclose(scorer.predict_expected_purchases(30, *inputs), model.predict_expected_purchases(30))
+
+    def test_no_heavy_imports(self):
+        """Test that scoring does not pull in the modeling stack"""
+        code = (
+            "import sys, marketing_models.scoring; "
+            "print(','.join(m for m in ('pymc', 'pymc_marketing', 'arviz', 'pandas') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+            cwd=os.path.join(os.path.dirname(__file__), '..')
+        ).stdout.strip()
+        assert output == ''
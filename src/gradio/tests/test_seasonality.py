@@ -0,0 +1,72 @@
+"""
+Unit tests for the Fourier seasonality features
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from marketing_models.seasonality import fourier_features, clear_fourier_cache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with an empty feature cache"""
+    clear_fourier_cache()
+    yield
+    clear_fourier_cache()
+
+class TestSeasonality:
+    """Tests for the memoized seasonality design matrix"""
+
+    def test_matches_formula(self):
+        """Test the features against a direct evaluation"""
+        dates = pd.date_range('2023-01-01', periods=60, freq='D')
+        features = fourier_features(dates, order=2, yearly=True, weekly=False)
+
+        days = (dates - pd.Timestamp('1970-01-01')).days.values
+        assert list(features.columns) == ['yearly_sin_1', 'yearly_sin_2', 'yearly_cos_1', 'yearly_cos_2']
+        assert np.allclose(features['yearly_sin_2'], np.sin(2 * np.pi * 2 * days / 365.25))
+        assert np.allclose(features['yearly_cos_1'], np.cos(2 * np.pi * days / 365.25))
+
+    def test_reuses_cached_matrix(self):
+        """Test that repeated calls over the same calendar share the matrix"""
+        dates = pd.date_range('2023-01-01', periods=90, freq='D')
+        first = fourier_features(dates)
+        second = fourier_features(pd.Series(dates))
+        other_order = fourier_features(dates, order=3)
+
+        assert np.shares_memory(first.values, second.values)
+        assert not np.shares_memory(first.values, other_order.values)
+        assert not first.values.flags.writeable
+
+    def test_irregular_dates(self):
+        """Test that calendars without a frequency are cached by their values"""
+        dates = pd.to_datetime(['2023-01-01', '2023-01-03', '2023-01-04', '2023-01-09'])
+        first = fourier_features(dates, order=1, weekly=False)
+        second = fourier_features(list(dates), order=1, weekly=False)
+
+        assert np.shares_memory(first.values, second.values)
+        assert first.shape == (4, 2)
+
+    def test_weekly_terms_respect_frequency(self):
+        """Test that weekly harmonics are limited by the data frequency"""
+        daily = fourier_features(pd.date_range('2023-01-01', periods=30, freq='D'), order=5)
+        weekly = fourier_features(pd.date_range('2023-01-01', periods=30, freq='W'), order=5)
+
+        # Daily data resolves at most 3 weekly harmonics, weekly data none
+        assert sum(col.startswith('weekly') for col in daily.columns) == 6
+        assert not any(col.startswith('weekly') for col in weekly.columns)
+        assert sum(col.startswith('yearly') for col in weekly.columns) == 10
+
+    def test_reuses_enclosing_calendar(self):
+        """Test that sub-ranges of a cached calendar slice its matrix"""
+        dates = pd.date_range('2023-01-01', periods=120, freq='D')
+        full = fourier_features(dates)
+        fold = fourier_features(dates[30:60])
+
+        assert np.shares_memory(full.values, fold.values)
+        pd.testing.assert_frame_equal(fold, full.iloc[30:60])
+
+        # Slices match features computed from scratch
+        clear_fourier_cache()
+        reference = fourier_features(dates[30:60])
+        assert np.allclose(fold.values, reference.values)
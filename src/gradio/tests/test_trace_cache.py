@@ -0,0 +1,101 @@
+"""
+Unit tests for the fitted trace cache
+"""
+import os
+import numpy as np
+import pandas as pd
+import arviz as az
+
+from marketing_models.trace_cache import TraceCache, fingerprint, cached_trace
+
+def make_trace(seed=0):
+    """Small posterior with a channel dimension"""
+    rng = np.random.default_rng(seed)
+    return az.from_dict(
+        posterior={'beta': rng.normal(size=(2, 50, 3))},
+        coords={'channel': ['tv', 'radio', 'social']},
+        dims={'beta': ['channel']}
+    )
+
+class TestTraceCache:
+    """Tests for fingerprinting, storage and eviction"""
+
+    def test_fingerprint_depends_on_content(self):
+        """Test that keys follow the data and settings, not object identity"""
+        data = pd.DataFrame({'tv': [1.0, 2.0], 'radio': [3.0, 4.0]})
+
+        assert fingerprint(data, ['tv'], {'draws': 10}) == fingerprint(data.copy(), ['tv'], {'draws': 10})
+        assert fingerprint(data, ['tv'], {'draws': 10}) != fingerprint(data, ['tv'], {'draws': 20})
+        assert fingerprint(data.values) != fingerprint(data.values.astype(np.float32))
+        assert fingerprint('a', 'bc') != fingerprint('ab', 'c')
+
+    def test_round_trip(self, tmp_path):
+        """Test that a stored trace is read back unchanged"""
+        cache = TraceCache(str(tmp_path))
+        trace = make_trace()
+
+        assert cache.get('key') is None
+        cache.put('key', trace)
+        restored = cache.get('key')
+
+        assert np.array_equal(restored.posterior['beta'].values, trace.posterior['beta'].values)
+        assert list(restored.posterior['channel'].values) == ['tv', 'radio', 'social']
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that the oldest unread traces are evicted first"""
+        cache = TraceCache(str(tmp_path))
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, make_trace(i))
+            os.utime(cache.path(key), (1000 + i, 1000 + i))
+
+        # Reading 'a' makes it the most recently used
+        cache.get('a')
+        cache.max_bytes = os.path.getsize(cache.path('a')) + os.path.getsize(cache.path('c'))
+        cache.evict()
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+
+    def test_cached_trace_samples_once(self):
+        """Test that identical inputs reuse the first sampled trace"""
+        calls = []
+
+        def sample():
+            calls.append(1)
+            return make_trace()
+
+        first = cached_trace(['mmm', np.arange(5.0)], sample)
+        second = cached_trace(['mmm', np.arange(5.0)], sample)
+        cached_trace(['mmm', np.arange(6.0)], sample)
+
+        assert len(calls) == 2
+        assert np.array_equal(first.posterior['beta'].values, second.posterior['beta'].values)
+
+    def test_model_version_in_key(self, sample_mmm_data, monkeypatch):
+        """Test that bumping the model version invalidates cached traces"""
+        import pymc as pm
+        from marketing_models import media_mix
+
+        model = media_mix.MediaMixModel()
+        channels = ['tv', 'radio']
+        calls = []
+
+        def mock_build_model(X, y):
+            with pm.Model() as model.model:
+                pm.Normal('alpha', 0, 1)
+
+        def mock_sample(**kwargs):
+            calls.append(1)
+            return make_trace(len(calls))
+
+        monkeypatch.setattr(model, "build_model", mock_build_model)
+        monkeypatch.setattr(pm, "sample", mock_sample)
+
+        model.fit(sample_mmm_data, channels, 'sales', method='nuts')
+        model.fit(sample_mmm_data, channels, 'sales', method='nuts')
+        assert len(calls) == 1
+
+        monkeypatch.setattr(media_mix, "MODEL_VERSION", media_mix.MODEL_VERSION + 1)
+        model.fit(sample_mmm_data, channels, 'sales', method='nuts')
+        assert len(calls) == 2
@@ -0,0 +1,157 @@
+"""
+Unit tests for the adstock and saturation transforms
+"""
+import copy
+import pytest
+import numpy as np
+
+from marketing_models.config import TRANSFORMATIONS
+from marketing_models.transforms import (
+    geometric_adstock,
+    weibull_adstock,
+    hill_saturation,
+    hill_saturation_grad,
+    logistic_saturation,
+    logistic_saturation_grad,
+    power_saturation,
+    power_saturation_grad,
+    apply_media_transforms,
+    lagged_spend,
+    transform_media
+)
+
+@pytest.fixture
+def spend():
+    """Spend history for three channels"""
+    rng = np.random.default_rng(0)
+    return rng.gamma(2.0, 100.0, size=(40, 3))
+
+class TestTransforms:
+    """Tests for the vectorized media transforms"""
+
+    def test_geometric_adstock_matches_loop(self, spend):
+        """Test per-channel geometric adstock against an explicit loop"""
+        alpha = np.array([0.2, 0.5, 0.8])
+        max_lag = 4
+        result = geometric_adstock(spend, alpha, max_lag=max_lag, normalize=False)
+
+        expected = np.zeros_like(spend)
+        for t in range(spend.shape[0]):
+            for lag in range(min(max_lag, t + 1)):
+                expected[t] += alpha ** lag * spend[t - lag]
+
+        assert np.allclose(result, expected)
+
+    def test_geometric_adstock_normalized(self, spend):
+        """Test that normalized adstock preserves total spend away from the edges"""
+        result = geometric_adstock(spend[:, 0], 0.5, max_lag=3, normalize=True)
+        constant = geometric_adstock(np.full(10, 7.0), 0.5, max_lag=3, normalize=True)
+
+        assert result.shape == (40,)
+        assert np.allclose(constant[2:], 7.0)
+
+    def test_weibull_adstock(self, spend):
+        """Test Weibull adstock shapes and weight normalization"""
+        impulse = np.zeros(10)
+        impulse[0] = 1.0
+
+        for kind in ['pdf', 'cdf']:
+            response = weibull_adstock(impulse, shape=2.0, scale=3.0, max_lag=10, kind=kind)
+            assert np.isclose(response.sum(), 1.0)
+            assert (response >= 0).all()
+
+        # A shape above one delays the peak of the pdf response
+        delayed = weibull_adstock(impulse, shape=3.0, scale=4.0, max_lag=10, kind='pdf')
+        assert np.argmax(delayed) > 0
+
+        assert weibull_adstock(spend, [1.0, 2.0, 3.0], 2.0).shape == spend.shape
+
+        with pytest.raises(ValueError):
+            weibull_adstock(spend, 1.0, 1.0, kind='gamma')
+
+    def test_saturation_curves(self):
+        """Test the saturation functions at reference points"""
+        assert np.isclose(hill_saturation(0.5, half_saturation=0.5, slope=2.0), 0.5)
+        assert np.isclose(logistic_saturation(0.0, lam=2.0), 0.0)
+        assert logistic_saturation(50.0, lam=2.0) < 1.0 + 1e-12
+        assert np.isclose(power_saturation(4.0, exponent=0.5), 2.0)
+
+    @pytest.mark.parametrize("func, grad, params", [
+        (hill_saturation, hill_saturation_grad, {'half_saturation': 0.7, 'slope': 1.5}),
+        (logistic_saturation, logistic_saturation_grad, {'lam': 2.5}),
+        (power_saturation, power_saturation_grad, {'exponent': 0.4}),
+    ])
+    def test_saturation_gradients(self, func, grad, params):
+        """Test analytic gradients against central differences"""
+        x = np.linspace(0.1, 3.0, 25)
+        eps = 1e-6
+        numeric = (func(x + eps, **params) - func(x - eps, **params)) / (2 * eps)
+
+        assert np.allclose(grad(x, **params), numeric, rtol=1e-5)
+
+    def test_apply_media_transforms(self, spend):
+        """Test the configured pipeline for every saturation method"""
+        for method in ['hill', 'logistic', 'power']:
+            config = copy.deepcopy(TRANSFORMATIONS)
+            config['diminishing_returns']['method'] = method
+            result = apply_media_transforms(spend, config=config)
+
+            assert result.shape == spend.shape
+            assert (result >= 0).all()
+            assert (result <= 1.0 + 1e-12).all()
+
+    def test_apply_media_transforms_weibull(self, spend):
+        """Test the Weibull adstock config with default and partial parameters"""
+        config = copy.deepcopy(TRANSFORMATIONS)
+        config['adstock']['method'] = 'weibull'
+        config['diminishing_returns']['normalize'] = False
+        max_lag = config['adstock']['max_lag']
+
+        expected = hill_saturation(weibull_adstock(spend, shape=2.0, scale=2.0, max_lag=max_lag))
+        assert np.allclose(apply_media_transforms(spend, config=config), expected)
+
+        expected = hill_saturation(weibull_adstock(spend, shape=2.0, scale=5.0, max_lag=max_lag))
+        result = apply_media_transforms(spend, adstock_params={'scale': 5.0}, config=config)
+        assert np.allclose(result, expected)
+
+    def test_transform_media(self, spend):
+        """Test that fitted, per-draw and symbolic parameters transform alike"""
+        import pytensor.tensor as pt
+
+        for method, params in [('geometric', {'alpha': [0.3, 0.5, 0.7]}),
+                               ('weibull', {'shape': [1.5, 2.0, 3.0], 'scale': [1.0, 2.0, 4.0]})]:
+            config = copy.deepcopy(TRANSFORMATIONS)
+            config['adstock']['method'] = method
+            max_lag = config['adstock']['max_lag']
+            saturation = {'half_saturation': np.array([0.3, 0.5, 0.8]), 'slope': np.array([1.0, 1.5, 2.0])}
+            spend_scale = spend.max(axis=0)
+            lagged = lagged_spend(spend, max_lag)
+
+            adstocked = (geometric_adstock(spend, np.array(params['alpha']), max_lag=max_lag)
+                         if method == 'geometric'
+                         else weibull_adstock(spend, np.array(params['shape']), np.array(params['scale']), max_lag=max_lag))
+            expected = hill_saturation(adstocked / spend_scale + 1e-9, **saturation)
+            result = transform_media(lagged, spend_scale, {k: np.array(v) for k, v in params.items()}, saturation, config)
+            assert np.allclose(result, expected)
+
+            # Two identical draws give the same periods twice
+            draws = transform_media(
+                lagged, spend_scale,
+                {k: np.tile(v, (2, 1))[:, np.newaxis] for k, v in params.items()},
+                {k: np.tile(v, (2, 1))[:, np.newaxis] for k, v in saturation.items()},
+                config
+            )
+            assert draws.shape == (2,) + spend.shape
+            assert np.allclose(draws[1], expected)
+
+            # The same kernels build the PyTensor graph of the fitted model
+            symbolic = {k: pt.as_tensor_variable(np.array(v)) for k, v in params.items()}
+            assert np.allclose(transform_media(lagged, spend_scale, symbolic, saturation, config).eval(), expected)
+
+    def test_apply_media_transforms_unknown_method(self, spend):
+        """Test that unknown methods are rejected"""
+        config = copy.deepcopy(TRANSFORMATIONS)
+        config['diminishing_returns']['method'] = 'exponential'
+
+        with pytest.raises(ValueError):
+            apply_media_transforms(spend, config=config)